@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright:      None - the author (Ron Burkey) declares this software to
+                be in the Public Domain, with no rights reserved.
+Filename:       analysisCache.py
+Purpose:        A persistent, content-addressed cache of intermediate
+                results for disassemblerAGC.py, specifyAGC.py, and
+                pieceworkAGC.py, so that the repeated runs of those
+                programs during a reconstruction session (see workflow.sh)
+                needn't redo work on inputs which haven't changed.
+History:        2026-10-17 RSB  Created.
+
+Each cached item is stored in its own file, whose name is a hash of
+everything the item was computed from:  the kind of item, the contents of
+the input files, the command-line options affecting the computation, and
+the source code of the programs themselves.  Thus there's never any need to
+invalidate anything; a change to any of those simply results in a different
+filename.  Files which are no longer wanted can be deleted at any time,
+and indeed the entire cache directory can be.
+
+The cache is only used if the --cache[=DIR] command-line option is given.
+DIR defaults to ~/.cache/disassemblerAGC.
+"""
+
+import os
+import sys
+import hashlib
+import pickle
+
+defaultCacheDirectory = os.path.join(os.path.expanduser("~"), ".cache",
+                                     "disassemblerAGC")
+cacheDirectory = None
+
+# Process a --cache or --cache=DIR command-line option.  Returns True if
+# param was such an option, False otherwise.
+def cacheOption(param):
+    global cacheDirectory
+    if param == "--cache":
+        cacheDirectory = defaultCacheDirectory
+    elif param[:8] == "--cache=":
+        cacheDirectory = os.path.expanduser(param[8:])
+    else:
+        return False
+    return True
+
+# The source code of all modules in this folder, which any cached item may
+# depend on.
+sourceHash = None
+def getSourceHash():
+    global sourceHash
+    if sourceHash == None:
+        h = hashlib.sha256()
+        folder = os.path.dirname(os.path.abspath(__file__))
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(".py"):
+                f = open(os.path.join(folder, filename), "rb")
+                h.update(filename.encode() + b"\0" + f.read() + b"\0")
+                f.close()
+        sourceHash = h.hexdigest()
+    return sourceHash
+
+# Form the key for a cached item.  The kind is a string ("rope", "specs",
+# etc.), contents is a list of bytes objects (typically the contents of input
+# files), and options is anything with a repr() that uniquely identifies the
+# options affecting the computation.
+def cacheKey(kind, contents, options):
+    h = hashlib.sha256()
+    h.update(kind.encode() + b"\0" + getSourceHash().encode() + b"\0")
+    for content in contents:
+        h.update(b"%d\0" % len(content))
+        h.update(content)
+    h.update(repr(options).encode())
+    return kind + "-" + h.hexdigest()
+
+# Returns a cached item, or None if not cached (or if not using a cache).
+def cacheLoad(key):
+    if cacheDirectory == None:
+        return None
+    try:
+        f = open(os.path.join(cacheDirectory, key + ".pickle"), "rb")
+        item = pickle.load(f)
+        f.close()
+    except:
+        return None
+    return item
+
+# Saves an item in the cache (if using a cache).  The file is written under
+# a temporary name and then renamed, so that simultaneous runs never see a
+# partially-written item.
+def cacheStore(key, item):
+    if cacheDirectory == None:
+        return
+    try:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        filename = os.path.join(cacheDirectory, key + ".pickle")
+        tempname = filename + ".%d" % os.getpid()
+        f = open(tempname, "wb")
+        pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+        f.close()
+        os.replace(tempname, filename)
+    except OSError as e:
+        print("Cannot write cache:", e, file=sys.stderr)
+
+# A stand-in for sys.stdout which also records everything written to it,
+# so that a program's entire output can be cached.
+class OutputRecorder:
+    def __init__(self, stream):
+        self.stream = stream
+        self.recording = []
+    
+    def write(self, text):
+        self.recording.append(text)
+        return self.stream.write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def getvalue(self):
+        return "".join(self.recording)
@@ -27,6 +27,14 @@ History:        2022-09-25 RSB  Created.
                 2022-10-14 RSB  Removed recursive descent entirely.
                 2022-10-20 RSB  Format of erasable references changed to
                                 allow separation of aliased erasables.
+                2026-10-17 RSB  --find now matches via a trie of the
+                                patterns rather than by brute force.
+                2026-10-17 RSB  disassembleRange() no longer deep-copies 
+                                erasable and iochannels on every call, but
+                                journals the writes to them and rolls them
+                                back on return.
+                2026-10-17 RSB  Added --cache.
+                2026-10-17 RSB  Added --jobs.
 """
 
 #=============================================================================
@@ -34,7 +42,11 @@ History:        2022-09-25 RSB  Created.
 
 # Standard modules.
 import sys
-import copy
+import io
+import atexit
+import time
+import os
+import multiprocessing
 
 # Some temporary code useful for debugging.
 from engineering import endOfImplementation
@@ -97,13 +109,15 @@ elif cli.blk2:
 else:
     from disassembleInterpretive import disassembleInterpretive, interpretiveStart
 # Semi-emulation of instruction operations on erasable.
-from semulate import semulate
+from semulate import semulate, JournaledState
 # Search for "special" subroutines like INTPRET and BANKCALL.
 if cli.block1:
     from searchSpecialBlockI import searchPatterns
 else:
     from searchSpecial import searchPatterns
 from searchFunctions import importFlexFile, searchSpecial, specialSubroutines
+# Persistent cache of rope analysis (--cache).
+from analysisCache import cacheKey, cacheLoad, cacheStore
 
 # If necessary, import patterns from a file specified by the --flex
 # command-line switch, and append them to the searchPatterns dictionary
@@ -130,12 +144,77 @@ else: # --bin or binsource.
     bankList = bankListBin
     
 if cli.dloopFilename == "":
-    readCoreRope(sys.stdin, core, cli, numCoreBanks, sizeCoreBank, bankList)
+    ropeData = sys.stdin.buffer.read()
 else:
-    f = open(cli.dloopFilename, "r")
-    readCoreRope(f, core, cli, numCoreBanks, sizeCoreBank, bankList)
+    f = open(cli.dloopFilename, "rb")
+    ropeData = f.read()
     f.close()
 
+# With --cache, the decoded rope, the locations of the special symbols (see
+# below), and the disassembly of individual addresses are reused from any 
+# previous run with the same rope, --flex file, and options affecting them.
+flexData = b""
+if cli.flexFilename != "":
+    f = open(cli.flexFilename, "rb")
+    flexData = f.read()
+    f.close()
+ropeKey = cacheKey("rope", [ropeData, flexData], (cli.binFile, 
+                   cli.hardwareFile, cli.parity, cli.block1, cli.blk2, 
+                   cli.minFlex, bankList))
+ropeAnalysis = cacheLoad(ropeKey)
+ropeAnalysisChanged = ropeAnalysis == None
+if ropeAnalysis == None:
+    # readCoreRope()'s parity-error messages are kept, so that they can be
+    # repeated when the decoded rope is later reused.
+    stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    try:
+        readCoreRope(io.TextIOWrapper(io.BytesIO(ropeData)), core, cli, 
+                     numCoreBanks, sizeCoreBank, bankList)
+    finally:
+        messages = sys.stderr.getvalue()
+        sys.stderr = stderr
+    sys.stderr.write(messages)
+    ropeAnalysis = { "core": core, "messages": messages, "special": None,
+                     "basic": {}, "interpretive": {} }
+else:
+    core[:] = ropeAnalysis["core"]
+    sys.stderr.write(ropeAnalysis["messages"])
+
+def saveRopeAnalysis():
+    if ropeAnalysisChanged:
+        cacheStore(ropeKey, ropeAnalysis)
+atexit.register(saveRopeAnalysis)
+
+# The disassembly of a basic instruction depends only on the word and on 
+# whether it's EXTENDed, and that of interpretive code only on the address and
+# on the state (such as STADR) at that address, so both can be memoized in
+# ropeAnalysis.  Note that the state is modified in place.
+uncachedBasic = disassembleBasic
+def disassembleBasic(word, extended):
+    global ropeAnalysisChanged
+    key = (word, extended)
+    basicCache = ropeAnalysis["basic"]
+    if key not in basicCache:
+        basicCache[key] = uncachedBasic(word, extended)
+        ropeAnalysisChanged = True
+    return basicCache[key]
+
+uncachedInterpretive = disassembleInterpretive
+def disassembleInterpretive(core, bank, offset, state):
+    global ropeAnalysisChanged
+    key = (bank, offset, tuple(sorted(state.items())))
+    interpretiveCache = ropeAnalysis["interpretive"]
+    if key not in interpretiveCache:
+        disassembly, inBasic = uncachedInterpretive(core, bank, offset, state)
+        interpretiveCache[key] = (disassembly, inBasic, dict(state))
+        ropeAnalysisChanged = True
+        return disassembly, inBasic
+    disassembly, inBasic, newState = interpretiveCache[key]
+    state.clear()
+    state.update(newState)
+    return disassembly, inBasic
+
 #=============================================================================
 # Read the --check file.
 
@@ -186,8 +265,13 @@ if cli.checkFilename != "":
 # Search for special symbols like INTPRET, BANKCALL, ....  Their addresses
 # will be stored as specialSubroutines["INTPRET"] (and so on).
 
-searchSpecial(core, searchPatterns, disassembleBasic, 
-                disassembleInterpretive, interpretiveStart, bankListBin)
+if ropeAnalysis["special"] == None:
+    searchSpecial(core, searchPatterns, disassembleBasic, 
+                    disassembleInterpretive, interpretiveStart, bankListBin)
+    ropeAnalysis["special"] = dict(specialSubroutines)
+    ropeAnalysisChanged = True
+else:
+    specialSubroutines.update(ropeAnalysis["special"])
 
 if cli.intpret != -1:
     INTPRET = cli.intpret
@@ -270,9 +354,10 @@ def getDataWords(core, bank, offset, symbol, dataWords):
 # related the the case of a TC to a special function that requires data
 # word(s) immediately following the TC.  The parameters are:
 #   core, erasable, iochannels are (usually) the global structures of the
-#               same name.  For recursive use of disassembleRange, though,
-#               local copies of erasable and iochannels are used instead.
-#               Basically, they are only used by the response function (see
+#               same name.  The response function sees them only through a
+#               JournaledState (see semulate.py), and any changes it makes 
+#               to them are rolled back before disassembleRange() returns,
+#               so they're effectively local copies.  Basically, they are only used by the response function (see
 #               below), and then only if the response function calls 
 #               semulate().  In other words, if the response function does 
 #               not use semulate(), then erasable and iochannels could be 
@@ -329,10 +414,20 @@ msgDisassembleRange = ""
 def disassembleRange(core, erasableOnEntry, iochannelsOnEntry, bank, start, 
                      end, response, inBasic=True, autoQuit=False,
                      autoCCS=False):
+    scratch = JournaledState(erasableOnEntry, iochannelsOnEntry)
+    try:
+        return disassembleRangeScratch(core, scratch.erasable, 
+                                       scratch.iochannels, bank, start, end, 
+                                       response, inBasic, autoQuit, autoCCS)
+    finally:
+        scratch.rollback()
+
+# The workhorse for disassembleRange(), which operates directly on erasable
+# and iochannels.
+def disassembleRangeScratch(core, erasable, iochannels, bank, start, end, 
+                            response, inBasic, autoQuit, autoCCS):
     global msgDisassembleRange
     msgDisassembleRange = ""
-    erasable = copy.deepcopy(erasableOnEntry)
-    iochannels = copy.deepcopy(iochannelsOnEntry)
     dataWords = 0
     extended = 0
     state = interpretiveStart()
@@ -890,60 +985,187 @@ if cli.findFilename != "":
     print("│ baseline but that immediately succeeds data.                    │")
     print("└─────────────────────────────────────────────────────────────────┘")
 
-    # Next, try to find these patterns in core.  This is entirely a
-    # brute-force procedure which does not rely on recursive disassembly.
-    # We simply go to each location in every memory bank, and start 
-    # disassembling until we either find one of the patterns or else 
-    # can eliminate all of them, at which point we move on to the next
-    # location.
+    # Next, try to find these patterns in core.  This does not rely on 
+    # recursive disassembly.  We simply go to each location in every memory
+    # bank, and start disassembling until we either find one of the patterns
+    # or else can eliminate all of them, at which point we move on to the 
+    # next location.
+    #
+    # Formerly, we did that by brute force, keeping a list of all candidate
+    # symbols and comparing each newly-disassembled location against every
+    # one of them, and the disassembler made a copy of erasable and the i/o
+    # channels for every starting location.  Instead, the patterns are now
+    # compiled into a trie (one for basic, one for interpretive), in which
+    # each node is a dictionary with the keys:
+    #   "next"      A dictionary relating the next pattern to the next node.
+    #   "symbols"   The symbols whose patterns end at this node, in the order
+    #               they appeared in the specs file.
+    #   "live"      The number of symbols at or below this node which have 
+    #               not yet been found.
+    # The disassembly from each starting location then merely walks down 
+    # the trie, until it either finds a match or runs out of live branches.
+    # (The trie can't be collapsed into an Aho-Corasick automaton spanning
+    # all of the starting locations, because the disassembly of any given 
+    # location depends on where the disassembly started; e.g., on whether or
+    # not the prior location was an EXTEND or an INTPRET.)
     
     coreUsed = []
     for bank in range(numCoreBanks):
         coreUsed.append([False]*sizeCoreBank)
     
-    # Response function for disassembleRange().
+    def newTrieNode():
+        return { "next": {}, "symbols": [], "live": 0 }
+    
+    tries = {}
+    for basicOrInterpretive in ["basic", "interpretive"]:
+        root = newTrieNode()
+        for symbol in desiredOrdering[basicOrInterpretive]:
+            node = root
+            node["live"] += 1
+            for pattern in desiredMatches[basicOrInterpretive][symbol]:
+                if pattern not in node["next"]:
+                    node["next"][pattern] = newTrieNode()
+                node = node["next"][pattern]
+                node["live"] += 1
+            node["symbols"].append(symbol)
+        tries[basicOrInterpretive] = root
+    
+    # Remove a found symbol from the live counts of its trie.  Must be done
+    # before the symbol is removed from desiredMatches.
+    def retire(basicOrInterpretive, symbol):
+        node = tries[basicOrInterpretive]
+        node["live"] -= 1
+        for pattern in desiredMatches[basicOrInterpretive][symbol]:
+            node = node["next"][pattern]
+            node["live"] -= 1
+    
+    # A symbol isn't eligible for matching until all of the symbols it's 
+    # been hinted to follow (--hint) have been found.
+    def hinted(symbol):
+        if symbol in cli.hintAfter:
+            for before in cli.hintAfter[symbol]:
+                if before in desiredMatches["basic"] or \
+                        before in desiredMatches["interpretive"]:
+                    return False
+        return True
+    
+    # Response function for disassembleRange().  On a match, symbols is
+    # set to the single symbol matched.
     symbols = []
-    indexIntoPatterns = 0
+    node = None
     basicOrInterpretive = "basic"
     def match(core, erasable, iochannels,
                   occasion, bank, address, opcode, operand):
-        global symbols, indexIntoPatterns, cli
-          
-        # Turn current disassembled location into a pattern.
-        pattern = patternize(occasion, opcode, operand)
+        global symbols, node, cli
         
-        # Now try to match the pattern with those read from the specs file.
         if cli.disjoint and coreUsed[bank][address % sizeCoreBank]:
-            symbols = []
-        if len(symbols) == 0:
             return True
-        forElimination = []
-        for symbol in symbols:
-            desiredPatterns = desiredMatches[basicOrInterpretive][symbol]
-            if len(desiredPatterns) <= indexIntoPatterns:
-                print("Implementation error A", "%02o" % bank, 
-                    "%04o" % address, symbol, indexIntoPatterns, 
-                    len(desiredPatterns), desiredPatterns)
-                sys.exit(1)
-            desiredPattern = desiredPatterns[indexIntoPatterns]
-            if desiredPattern != pattern:
-                forElimination.append(symbol)
-            elif indexIntoPatterns == len(desiredPatterns) - 1:
-                # Match!  However, if it's one of those symbols we're
-                # supposed to skip the initial matches for, then let's do
-                # that instead.
-                if symbol not in cli.skips \
-                        or cli.skips[symbol] == 0:
-                    symbols = [symbol]
-                    return True
-                else:
-                    cli.skips[symbol] -= 1
-                    forElimination.append(symbol)
-        for symbol in forElimination:
-            symbols.remove(symbol)
-        indexIntoPatterns += 1
+        
+        # Turn current disassembled location into a pattern, and advance
+        # through the trie with it.
+        node = node["next"].get(patternize(occasion, opcode, operand))
+        if node == None or node["live"] == 0:
+            return True
+        for symbol in node["symbols"]:
+            if symbol not in desiredMatches[basicOrInterpretive] \
+                    or not hinted(symbol):
+                continue
+            # Match!  However, if it's one of those symbols we're
+            # supposed to skip the initial matches for, then let's do
+            # that instead.
+            if symbol not in cli.skips or cli.skips[symbol] == 0:
+                symbols = [symbol]
+                return True
+            cli.skips[symbol] -= 1
         return False
     
+    # Is bank,address in one of the --avoid ranges?
+    def avoided(bank, address):
+        for avoid in cli.avoid:
+            if bank == avoid[0] and address >= avoid[1] \
+                    and address < avoid[2]:
+                return True
+        return False
+    
+    # Bookkeeping for a symbol matched at bank,address.
+    def recordMatch(basicOrInterpretive, symbol, bank, address):
+        global symbolsSought
+        symbolsFound[basicOrInterpretive][symbol] \
+            = (bank, address)
+        endAddress = address + \
+            len(desiredMatches[basicOrInterpretive][symbol])
+        for a in range(address, endAddress):
+            coreUsed[bank][a % sizeCoreBank] = True
+        retire(basicOrInterpretive, symbol)
+        del desiredMatches[basicOrInterpretive][symbol]
+        desiredOrdering[basicOrInterpretive].remove(symbol)
+        symbolsSought = { 
+            "basic": desiredMatches["basic"].keys(),
+            "interpretive": desiredMatches["interpretive"].keys()
+            }
+        nSymbol = norm(symbol)
+        addressString, fAddress = getAddressString(bank, address)
+        msg = "%-8s = %s" % (nSymbol, addressString)
+        print(msg)
+        if "?" not in msg:
+            #print(msg, file=symbolFile)
+            print("%-8s = %02o,%04o" % (nSymbol, bank, address), 
+                file=symbolFile)
+        if nSymbol in programLabelAliasSpecs:
+            for spec in programLabelAliasSpecs[nSymbol]:
+                addressString, fAddress = \
+                    getAddressString(bank, address + spec[0])
+                msg = "%-8s = %s" % (spec[1], addressString)
+                print(msg)
+                if "?" not in msg:
+                    #print(msg, file=symbolFile)
+                    print("%-8s = %02o,%04o" % \
+                        (spec[1], bank, address+spec[0]), file=symbolFile)
+                symbolsFound[basicOrInterpretive][spec[1]] = \
+                    (bank, address + spec[0])
+    
+    # For --jobs.  Response function for disassembleRange() which, rather than
+    # stopping at the first eligible match, collects every symbol whose 
+    # pattern matches, as (depth, symbol) in candidates, where depth is the
+    # length of the pattern.  They're in the same order match() would 
+    # encounter them.
+    candidates = []
+    def collect(core, erasable, iochannels,
+                  occasion, bank, address, opcode, operand):
+        global node
+        node = node["next"].get(patternize(occasion, opcode, operand))
+        if node == None:
+            return True
+        depth = address + 1 - candidateStart
+        for symbol in node["symbols"]:
+            candidates.append((depth, symbol))
+        return False
+    
+    # For --jobs.  Find all candidate matches in a single bank, regardless of 
+    # which symbols have already been found, --hint, --skip, or overlap of 
+    # matches.  Returns a list of (address, basicOrInterpretive, candidates)
+    # for the starting addresses having any candidates, in order.
+    def findCandidates(bank):
+        global node, candidates, candidateStart
+        found = []
+        for address in range(coreOffset, coreOffset + sizeCoreBank):
+            if avoided(bank, address):
+                continue
+            for basicOrInterpretive in ["basic", "interpretive"]:
+                if tries[basicOrInterpretive]["live"] == 0:
+                    continue
+                node = tries[basicOrInterpretive]
+                candidates = []
+                candidateStart = address
+                end = address + maxPatternLength[basicOrInterpretive]
+                if end > sizeCoreBank + coreOffset:
+                    end = sizeCoreBank + coreOffset
+                disassembleRange(core, None, None, bank, address, end, 
+                                 collect, basicOrInterpretive == "basic")
+                if len(candidates) > 0:
+                    found.append((address, basicOrInterpretive, candidates))
+        return found
+    
     if len(cli.oBanks) > 0:
         findBanks = cli.oBanks.split(",")
         for i in range(len(findBanks)):
@@ -956,39 +1178,29 @@ if cli.findFilename != "":
             dummy[i] = int(dummy[i], 8)
             findBanks.remove(dummy[i])
         findBanks = dummy + findBanks
-    for bank in findBanks:
+    
+    # The serial search of a single bank.
+    def findBank(bank):
+        global node, symbols, basicOrInterpretive
         #print("# Match bank %02o." % bank)
         for address in range(coreOffset, coreOffset + sizeCoreBank):
-            avoiding = False
-            for avoid in cli.avoid:
-                if bank == avoid[0] and address >= avoid[1] \
-                        and address < avoid[2]:
-                    avoiding = True
-                    break
-            if avoiding:
+            if avoided(bank, address):
                 continue
             for basicOrInterpretive in ["basic", "interpretive"]:
                 inBasic = (basicOrInterpretive == "basic")
-                if len(symbolsSought[basicOrInterpretive]) == 0:
+                if tries[basicOrInterpretive]["live"] == 0:
                     continue
                 if cli.disjoint and coreUsed[bank][address % sizeCoreBank]:
                     continue
                 symbols = []
-                for symbol in desiredOrdering[basicOrInterpretive]:
-                    ok = True
-                    if symbol in cli.hintAfter:
-                        for before in cli.hintAfter[symbol]:
-                            if before in desiredOrdering["basic"] or \
-                                    before in desiredOrdering["interpretive"]:
-                                ok = False
-                                break
-                    if ok:
-                        symbols.append(symbol)
-                indexIntoPatterns = 0
+                node = tries[basicOrInterpretive]
                 end = address + maxPatternLength[basicOrInterpretive]
                 if end > sizeCoreBank + coreOffset:
                     end = sizeCoreBank + coreOffset
-                if disassembleRange(core, erasable, iochannels,
+                # Note that match() doesn't look at erasable or the i/o
+                # channels, so there's no point in having disassembleRange()
+                # make copies of them for every starting address.
+                if disassembleRange(core, None, None,
                                  bank, address, end, match, 
                                  inBasic)[0]:
                     # If a match has been found at this address,
@@ -1001,41 +1213,57 @@ if cli.findFilename != "":
                         sys.exit(1)
                     elif len(symbols) == 0:
                         continue
-                    symbol = symbols[0]
-                    symbolsFound[basicOrInterpretive][symbol] \
-                        = (bank, address)
-                    endAddress = address + \
-                        len(desiredMatches[basicOrInterpretive][symbol])
-                    for a in range(address, endAddress):
-                        coreUsed[bank][a % sizeCoreBank] = True
-                    del desiredMatches[basicOrInterpretive][symbol]
-                    desiredOrdering[basicOrInterpretive].remove(symbol)
-                    symbolsSought = { 
-                        "basic": desiredMatches["basic"].keys(),
-                        "interpretive": desiredMatches["interpretive"].keys()
-                        }
-                    nSymbol = norm(symbol)
-                    addressString, fAddress = getAddressString(bank, address)
-                    msg = "%-8s = %s" % (nSymbol, addressString)
-                    print(msg)
-                    if "?" not in msg:
-                        #print(msg, file=symbolFile)
-                        print("%-8s = %02o,%04o" % (nSymbol, bank, address), 
-                            file=symbolFile)
-                    if nSymbol in programLabelAliasSpecs:
-                        for spec in programLabelAliasSpecs[nSymbol]:
-                            addressString, fAddress = \
-                                getAddressString(bank, address + spec[0])
-                            msg = "%-8s = %s" % (spec[1], addressString)
-                            print(msg)
-                            if "?" not in msg:
-                                #print(msg, file=symbolFile)
-                                print("%-8s = %02o,%04o" % \
-                                    (spec[1], bank, address+spec[0]), file=symbolFile)
-                            symbolsFound[basicOrInterpretive][spec[1]] = \
-                                (bank, address + spec[0])
+                    recordMatch(basicOrInterpretive, symbols[0], bank, 
+                                address)
                 else:
                     pass
+    
+    # With --jobs, the candidate matches for each bank are found by a pool of
+    # worker processes, each of which inherits (by forking) everything set up
+    # so far.  Then the candidates are replayed, bank by bank and address by
+    # address, applying the same rules match() does (found symbols, --hint,
+    # --skip, and overlap) in the same order, so that the results are exactly
+    # those of the serial search, findBank().
+    #
+    # The trie makes the serial search fast enough, though, that the pool
+    # often isn't worth its overhead, particularly since the workers do about
+    # twice the work of the serial search, which can stop at the first 
+    # eligible match.  So the first bank is searched serially, and the pool 
+    # is used for the rest only if that looks likely to pay off.
+    poolOverhead = 0.5 # Seconds, roughly.
+    if cli.jobs > 1 and len(findBanks) > 1 and \
+            "fork" in multiprocessing.get_all_start_methods():
+        startTime = time.time()
+        findBank(findBanks[0])
+        findBanks = findBanks[1:]
+        serialTime = (time.time() - startTime) * len(findBanks)
+        jobs = min(cli.jobs, os.cpu_count() or 1)
+        if serialTime * (1 - 2.0 / jobs) > poolOverhead:
+            pool = multiprocessing.get_context("fork").Pool(jobs)
+            bankCandidates = pool.map(findCandidates, findBanks, chunksize=1)
+            pool.close()
+            pool.join()
+            for bank, found in zip(findBanks, bankCandidates):
+                for address, basicOrInterpretive, candidates in found:
+                    if cli.disjoint and coreUsed[bank][address % sizeCoreBank]:
+                        continue
+                    for depth, symbol in candidates:
+                        if cli.disjoint and True in \
+                                coreUsed[bank][address % sizeCoreBank:
+                                               address % sizeCoreBank + depth]:
+                            break
+                        if symbol not in desiredMatches[basicOrInterpretive] \
+                                or not hinted(symbol):
+                            continue
+                        if symbol in cli.skips and cli.skips[symbol] > 0:
+                            cli.skips[symbol] -= 1
+                            continue
+                        recordMatch(basicOrInterpretive, symbol, bank, address)
+                        break
+            findBanks = []
+    
+    for bank in findBanks:
+        findBank(bank)
                             
     #print("symbolsFound =", symbolsFound)
     #print("symbolsSought =", symbolsSought)
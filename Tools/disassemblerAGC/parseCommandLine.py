@@ -19,9 +19,13 @@ History:        2022-09-28 RSB  Split off from disassemblerAGC.py.
                 2022-10-19 RSB  Added --dsymbols, --dloop
                 2022-10-20 RSB  Added --know.
                 2022-10-26 RSB  Added --module.
+                2026-10-17 RSB  Added --cache.
+                2026-10-17 RSB  Added --jobs.
 """
 
 import sys
+import os
+from analysisCache import cacheOption
 
 #=============================================================================
 # Parse command line.
@@ -82,6 +86,7 @@ intpret = -1
 symbolFilename = ""
 dloopFilename = ""
 know = {}
+jobs = 1
 
 entryCount = 0
 pBanks = ""
@@ -122,6 +127,12 @@ for param in sys.argv[1:]:
             Miscellaneous options:          
                 --help      Display the descriptive information you're now
                             reading.       
+                --cache[=DIR]  Keep the decoded ROPE, the locations of the
+                            special symbols, and the disassembly of each
+                            address in a cache in folder DIR (by default
+                            ~/.cache/disassemblerAGC), and reuse them in 
+                            later runs with the same ROPE and options.  
+                            See analysisCache.py.
                 --dump      Output an octal dump of the ROPE. Don't forget
                             to add any appropriate AGC-architecture options
                             (see above), since those affect the selection of
@@ -270,6 +281,14 @@ for param in sys.argv[1:]:
                             43.
                 --only=B,... (Rare.) A list of banks (octal) for --find.  If
                             present, only the listed banks are searched.
+                --jobs=N    Search the banks for --find in parallel, with N
+                            processes (or one per CPU core if N is 0).  The
+                            results are identical to those of the default,
+                            a single process.  Only pays off for large 
+                            pattern sets and several CPU cores, so if a
+                            timing of the first bank suggests otherwise,
+                            the search remains serial.  Not available on
+                            Windows.
                         
             Options related to "special subroutines":                            
                 --special   Just print the "special subroutines" found, 
@@ -379,6 +398,10 @@ for param in sys.argv[1:]:
             know[symbol] = (bank, address, int(fields[2],8))
     elif param == "--overlap":
         disjoint = False
+    elif param[:7] == "--jobs=":
+        jobs = int(param[7:])
+        if jobs == 0:
+            jobs = os.cpu_count()
     elif param[:9] == "--ignore=":
         ignore.append(param[9:])
     elif param[:8] == "--avoid=":
@@ -388,6 +411,8 @@ for param in sys.argv[1:]:
                         int(fields[1], 8)))
     elif param == "--parity":
         parity = True
+    elif cacheOption(param):
+        pass
     else:
         print("Unrecognized option", param)
         sys.exit(1)
@@ -11,9 +11,11 @@ History:        2022-10-10 RSB  Created.
                 2022-10-27 RSB  Fully corrected now to proper mapping of banks
                                 and modules.
                 2022-11-17 RSB  Added --bin option.
+                2026-10-17 RSB  Added --cache option.
 """
 
 import sys
+from analysisCache import cacheOption, cacheKey, cacheLoad, cacheStore
 
 additions = []
 block1 = False
@@ -62,6 +64,13 @@ for param in sys.argv[1:]:
         that of disassemblerAGC.py --bin --parity:
         
             --bin
+        
+        Finally, the following option reuses the output of any previous run
+        with the same input files and options, caching it in folder DIR (by
+        default ~/.cache/disassemblerAGC) if there hasn't been one.  See
+        analysisCache.py.
+        
+            --cache[=DIR]
         ''')
         sys.exit(0)
     elif param[:6] == "--add=":
@@ -77,6 +86,8 @@ for param in sys.argv[1:]:
         blk2 = False
     elif param == "--bin":
         binary = True
+    elif cacheOption(param):
+        pass
     else:
         print("Unrecognized switch: ", param, file=sys.stderr)
         sys.exit(1)
@@ -88,12 +99,26 @@ elif blk2:
 else:
     from auxiliary import *
         
+# With --cache, if the same input files have been combined before with the
+# same options, just repeat the output from then.
+inputFiles = []
+for addition in additions:
+    f = open(addition.split(",")[0], "rb")
+    inputFiles.append(f.read())
+    f.close()
+pieceworkKey = cacheKey("piecework", inputFiles, (additions, block1, blk2, 
+                        binary))
+output = cacheLoad(pieceworkKey)
+if output != None:
+    sys.stdout.buffer.write(output)
+    sys.exit(0)
+
 # Create core with all "unused".
 core = []
 for bank in range(numCoreBanks):
     core.append([0]*0o2000)
 
-for addition in additions:
+for addition, data in zip(additions, inputFiles):
     fields = addition.split(",")
     F = fields[0]
     P = (fields[1] != "0")
@@ -120,9 +145,6 @@ for addition in additions:
     else:
         for i in range(len(B)):
             B[i] = int(B[i], 8)
-    f = open(F, "r")
-    data = f.buffer.read()
-    f.close()
     for destBank in B:
         if destBank not in bankList:
             continue
@@ -163,5 +185,7 @@ for bank in bankListOutput:
                         | ((value & 0o40000) >> 14)
         data.append((value >> 8) & 0xFF)
         data.append(value & 0xFF)
-sys.stdout.buffer.write(bytes(data))
+output = bytes(data)
+cacheStore(pieceworkKey, output)
+sys.stdout.buffer.write(output)
 
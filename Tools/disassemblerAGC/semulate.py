@@ -8,6 +8,9 @@ Purpose:        Track what effects of on erasable and in particular on
                 memory-bank settings which can be easily tracked at 
                 assembly time.
 History:        2022-09-28 RSB  Split off from disassemblerAGC.py.
+                2026-10-17 RSB  Added JournaledState, so that semulate() can 
+                                work on a scratch state without copying all
+                                of erasable and iochannels first.
 
 I've invented the term "semulate" to embody the idea of semi-emulation.
 The idea is this:  erasable (and register) locations for which we don't
@@ -28,6 +31,52 @@ semulate() itself, however.
 
 from registers import *
 
+# A journaled (copy-on-write) view of erasable and iochannels, in which 
+# semulate() can work on scratch copies of them without their having to be
+# copied first.  Reads pass through to the underlying lists, while each write
+# records the value it overwrote, so that rollback() can afterward restore 
+# the underlying lists exactly as they were.  Thus the cost is proportional 
+# to the number of locations actually written, rather than to the sizes of 
+# erasable and iochannels.  Views can be nested, in the sense that the
+# erasable and iochannels of a JournaledState can in turn be the underlying
+# lists of another JournaledState.  Anything other than a list (such as None
+# or an integer, used when semulate() won't be called) is passed through 
+# as-is.
+class JournaledList:
+    def __init__(self, values, journal):
+        self.values = values
+        self.journal = journal
+    
+    def __getitem__(self, index):
+        return self.values[index]
+    
+    def __setitem__(self, index, value):
+        self.journal.append((self.values, index, self.values[index]))
+        self.values[index] = value
+    
+    def __len__(self):
+        return len(self.values)
+
+class JournaledState:
+    def __init__(self, erasable, iochannels):
+        self.journal = []
+        if isinstance(erasable, list):
+            self.erasable = [JournaledList(bank, self.journal) \
+                             for bank in erasable]
+        else:
+            self.erasable = erasable
+        if isinstance(iochannels, (list, JournaledList)):
+            self.iochannels = JournaledList(iochannels, self.journal)
+        else:
+            self.iochannels = iochannels
+    
+    # Undo all writes, most-recent first.
+    def rollback(self):
+        journal = self.journal
+        while len(journal) > 0:
+            values, index, value = journal.pop()
+            values[index] = value
+
 # Get the value stored at a 12-bit address, if possible.  If impossible
 # at assembly-time, -1 is returned.  The addresses are as follows:
 #   0000-0377   erasable bank 0
@@ -22,10 +22,14 @@ History:        2022-10-05 RSB  Wrote.  This version seems to work
                                 symbols like Rbb,aaaa.  A new switch,
                                 --invent, restores that functionality.
                 2022-10-22 RSB  Added --qrhack
+                2026-10-17 RSB  Added --cache.
 """
 
 import sys
+import io
 import copy
+from analysisCache import cacheOption, cacheKey, cacheLoad, cacheStore, \
+                          OutputRecorder
 
 debug = False
 minLength = 12
@@ -46,6 +50,8 @@ for param in sys.argv[1:]:
         invent = True
     elif param[:8] == "--qrhack":
         qrhack = True
+    elif cacheOption(param):
+        pass
     elif param == "--help":
         print("""
         Usage:
@@ -94,6 +100,10 @@ for param in sys.argv[1:]:
                     in erasable of QPLACE and RETAA in the ROPE may be specified
                     for compatibility with disassemblerAGC.py's command-line
                     switches, but are ignored.
+        --cache[=DIR]  Reuse the output of any previous run with the same
+                    assembly listing and OPTIONS, caching it in folder DIR
+                    (by default ~/.cache/disassemblerAGC) if there hasn't 
+                    been one.  See analysisCache.py.
         """)
     else:
         print("Unknown parameter:", param)
@@ -148,8 +158,20 @@ for address in range(sizeErasableBank):
 # those which accept a data argument immediately following their invocation
 # via TC -- and hence characterizes those locations as data rather than as
 # basic.
+# With --cache, if this listing has been analyzed before with the same
+# options, just repeat the output from then.
+listing = sys.stdin.buffer.read()
+specsKey = cacheKey("specs", [listing], (debug, minLength, block1, blk2, 
+                    invent, qrhack))
+specs = cacheLoad(specsKey)
+if specs != None:
+    sys.stdout.write(specs)
+    sys.exit(0)
+stdout = sys.stdout
+sys.stdout = OutputRecorder(stdout)
+
 lineNumber = 0
-for line in sys.stdin:
+for line in io.TextIOWrapper(io.BytesIO(listing)):
     lineNumber += 1
     field = line[:6]
     if len(field) != 6 or not field.isdigit():
@@ -485,6 +507,7 @@ if debug:
             data = erasable[i][bank]
             if len(data["symbols"]) > 0:
                 print("E%o,%04o" % (bank, i + 0o1400), data)
-    sys.exit(0)
-
 
+# Save the output for reuse (see --cache).
+cacheStore(specsKey, sys.stdout.getvalue())
+sys.stdout = stdout
@@ -12,7 +12,9 @@ then
 	echo ""
 	echo "Both specifyAGC.py and disassemblerAGC.py must be in the PATH."
 	echo "Any OPTIONS relevant to specifyAGC.py or to disassemblerAGC.py's"
-	echo "--specs or --find functionality can be used."
+	echo "--specs or --find functionality can be used.  In particular,"
+	echo "with --cache, work on an unchanged BASELINE is reused from the"
+	echo "previous run."
 	exit 0
 fi
 
@@ -37,6 +39,11 @@ do
 		ext="bin"
 		specs="$specs $1"
 		find="$find $1"
+	elif [[ "$1" == "--cache" || "$1" == "--cache="* ]]
+	then
+		specify="$specify $1"
+		specs="$specs $1"
+		find="$find $1"
 	elif [[ "$1" == "--min="* || "$1" == "--invent" ]]
 	then
 		specify="$specify $1"
@@ -12,7 +12,7 @@ Mods:       2024-03-07 RSB  Began experimenting with this concept.
 
 import copy
 import re
-from auxiliary import error, expandAllMacrosInString, mtokenize, globiterals
+from auxiliary import error, expandAllMacrosInString, mtokenize, addMacro
 from parseCommandLine import ifdefs, replacementSpace, replacementQuote
 from xtokenize import xtokenize
 from parseExpression import parseExpression
@@ -392,12 +392,11 @@ def DECLARE(pseudoStatement, scope, library, inRecord = False):
                         p["FIXED"] = True
                         p["dirWidth"] = 4
                     if "LITERALLY" in properties:
-                        globiterals.add(symbol)
                         if passCount == 1 or \
                                 symbol not in scope["literals"] or \
                                 scope["literals"][symbol] != p:
                             keepGoing = True
-                        scope["literals"][symbol] = p
+                        addMacro(scope, symbol, p)
                         if keepGoing and n + 1 < len(fields):
                             pseudoStatement = ' '.join(fields[:n+1]) + \
                                 expandAllMacrosInString(scope, \
@@ -12,6 +12,9 @@ Purpose:    This is an attempt to create a program that can translate
 Requires:   Python 3.6 or later.
 Reference:  http://www.ibibio.org/apollo/Shuttle.html
 Mods:       2024-03-07 RSB  Began experimenting with this concept.
+            2026-10-17 RSB  Moved the source-code scanner to scanSource.py.
+                            Added incremental recompilation (incremental.py).
+                            Added --profile-expressions.
 
 This particular file is just the top level of the program, tasked with
 reading in the XPL source code and gently massaging it to remove 
@@ -25,8 +28,12 @@ import os
 import shutil
 from parseCommandLine import *
 from auxiliary import error, setErrorRef, expandAllMacrosInString, printModel, \
-                      getAttributes, walkModel, scopeDelimiter
-from xtokenize import xtokenize, digits
+                      getAttributes, walkModel, scopeDelimiter, addMacro, \
+                      globiterals, resetMacroCaches
+from xtokenize import xtokenize
+from scanSource import scanSource, benchmarkScanner
+from parseExpression import printCounters
+import DECLARE as declareModule
 from DECLARE import DECLARE
 from LABEL import LABEL
 from PROCEDURE import PROCEDURE
@@ -37,9 +44,9 @@ from RETURN import RETURN
 from CALL import CALL
 from ESCAPEorREPEAT import ESCAPEorREPEAT
 from generateC import generateC, ppFiles, reservedMemory, physicalMemoryLimit
-
-logicalNot = '¬'
-usCent = '¢'
+from incremental import snapshotKeys, sourceBoundaries, loadSnapshot, \
+                        saveSnapshot, pruneSnapshots, prepareOutputFolder, \
+                        copyIfChanged, rewrittenFiles, finishOutputs
 
 # Create the global scope (symbol,parent=None,None) or a new child scope of an 
 # existing parent scope (symbol,parent not None,None).
@@ -141,248 +148,101 @@ scope = globalScope # The current scope
 globalScope["variables"]["userMemory"] = { "BASED": True, "BIT": 8, "dirWidth": 28 }
 
 for adhoc in adhocs:   
-    globalScope["literals"][adhoc] = { "LITERALLY": adhocs[adhoc] }
+    addMacro(globalScope, adhoc, { "LITERALLY": adhocs[adhoc] })
 
 # Now let's turn the massaged lines[] array into one gigantic string
 # representing the entire source.
 sourceLibraryCutoff = 0 # Index in `source` of change from library to main.
 source = "".join(lines)
 sourcePos = 0
-sourceRefs = { }
+lineStarts = [] # Index in `source` at which each entry of `lines` begins.
 for i in range(len(lines)):
     if sourceLibraryCutoff == 0 and i >= libraryCutoff:
         sourceLibraryCutoff = sourcePos
-    sourceRefs[sourcePos] = i
+    lineStarts.append(sourcePos)
     sourcePos += len(lines[i])
 
-lastC = ''
-lastLastC = ''
-inQuote = False
-inComment = False
-inHex = False
-inBase = False
-inStartedRef = None
-baseRadix = ''
-baseStart = 0
-#inPfs = False
-#inBfs = False
-inConditional = ''
-conditionalTrue = False
-pseudoStatement = ''
-skipQuote = 0
-inRecord = False # Tracks whether continuation of "BASED RECORD:".
-psLibraryCutoff = 0 # Pseudo-statement index of change from library to main source.
-    
-i = -1 # Position in the source.
-lineRef = None
-while True:
-    i += 1
-    if i in sourceRefs:
-        lineRef = sourceRefs[i]
-        setErrorRef(lineRef)
-    if i >= len(source):
+if benchmarkScan:
+    sys.exit(benchmarkScanner(source, lineStarts, sourceLibraryCutoff))
+
+# Split the source into pseudo-statements, removing comments and processing
+# quoted strings, hexadecimal constants, and /?c conditionals along the way.
+# Look for the most-complete snapshot of the model cached by a prior run
+# whose preceding source code is unchanged.  See incremental.py.  If there's
+# one for the entire source, there's no need to scan or parse at all.
+snapshotBoundaries = snapshotKeys(sourceBoundaries())
+snapshot = None
+nextSnapshot = 0 # Index in `snapshotBoundaries` of the next snapshot to save.
+for nextSnapshot in range(len(snapshotBoundaries) - 1, -1, -1):
+    snapshot = loadSnapshot(snapshotBoundaries[nextSnapshot][1])
+    if snapshot != None:
+        nextSnapshot += 1
         break
-    if skipQuote > 0:
-        skipQuote -= 1
-        continue
-    c = source[i]
-    
-    if not inQuote:
-        # Take care of /?c conditionals.  Note that embedded conditionals
-        # aren't supported or detected.  However, because I've found some
-        # of these inside of quoted strings, I do evaluate them within such
-        # strings.
-        if inConditional == '' and len(c) == 1 and c.isupper() \
-                and lastC == '?' and lastLastC == '/':
-            inConditional = c
-            conditionalTrue = (c in ifdefs)
-            inStartedRef = lineRef
-            pseudoStatement = pseudoStatement[:-2]
-            lastLastC = lastC
-            lastC = c
-            continue
-        elif inConditional != '' and c == '/' and lastC == '?':
-            if conditionalTrue: # Remove the ?
-                pseudoStatement = pseudoStatement[:-1]
-            inConditional = ''
-            conditionalTrue = False
-            lastLastC = lastC
-            lastC = c
-            continue
-        elif inConditional != "" and not conditionalTrue:
-            lastLastC = lastC
-            lastC = c
-            continue
-        
-    # Just count the number of single-quotes in succession.  
-    quoteCount = 0
-    if c == "'":
-        for j in range(i, len(source)):
-            if source[j] != "'":
-                endOfQuotes = True
-                break
-            quoteCount += 1
-    endOfStatement = False
-    if inComment:
-        if c == "/" and lastC == "*":
-            inComment = False
-            c = ' '
-    elif inQuote:
-        if c == usCent:
-            c = '`'
-        if quoteCount > 0:
-            skipQuote = quoteCount - 1
-            if 1 == (quoteCount & 1):
-                inQuote = False
-                quoteCount -= 1
-            for j in range(0, quoteCount, 2):
-                pseudoStatement = pseudoStatement + replacementQuote
-            if not inQuote:
-                pseudoStatement = pseudoStatement + "'"
-            lastLastC = lastC
-            lastC = c
-            continue
-    elif inHex:
-        if c == ' ':
-            continue
-        if c == '(':
-            inBase = True
-            baseRadix = ''
-            baseStart = len(pseudoStatement) - 1
-            cBase = ''
-            inHex = False
-            continue
-        if c == '"':
-            inHex = False
-            for ih in hexAccumulator:
-                if ih not in digits["x"]:
-                    error("Non-digit (%s) in double-quoted string" % \
-                          ih, None)
-                    sys.exit(1)
-            # The leading space before the %d below relates to the fact
-            # that " cannot be a character in an identifier, but digits
-            # can be.  Thus if you have a construct like XSET"..." (which
-            # actually appears in HAL/S-FC source code), it's the difference
-            # between the number being appended to XSET vs being a separate
-            # token.  Neither choice is guaranteed to be safe, however, and
-            # the one I've made is the one that preserves the purpose of
-            # XSET.  Other XPL code might expect something different, and it
-            # *is* possible to process it such that both choices are ok.  My
-            # problem is that XCOM-I currently processes the hex strings 
-            # prior to processing the macros, whereas Intermetrics's XCOM
-            # must have done it in the reverse order; and I'm too far down  
-            # the development path to want to try fixing that.
-            pseudoStatement = pseudoStatement + " %d" % int(hexAccumulator, 16)
-            c = ''
-    elif inBase:
-        if c == ")":
-            if baseRadix == "1":
-                cBase = 'b'
-                baseRadix = 2
-            elif baseRadix == "2":
-                cBase = 'q'
-                baseRadix = 4
-            elif baseRadix == "8":
-                cBase = 'o'
-                baseRadix = 8
-            elif baseRadix == "16":
-                cBase = 'x'
-                baseRadix = 16
-            else:
-                error("%s-bit not supported in literals" % baseRadix, \
-                      None)
-            continue
-        if cBase == '':
-            baseRadix = baseRadix + c
-            continue
-        if c == " ":
-            continue
-        if c == '"':
-            inBase = False
-            pseudoStatement = pseudoStatement + \
-                                    " %d" % int(hexAccumulator, baseRadix)
-            c = ''
-    elif c == '"':
-        inHex = True
-        inStartedRef = lineRef
-        hexAccumulator = ''
-        hexStart = len(pseudoStatement)
-        c = ''
-    elif c == "'":
-        skipQuote = quoteCount - 1
-        if 1 == (quoteCount & 1):
-            inQuote = True
-            inStartedRef = lineRef
-            quoteCount -= 1
+else:
+    nextSnapshot = 0
+if snapshot != None and nextSnapshot == len(snapshotBoundaries):
+    pseudoStatements.extend(snapshot["pseudoStatements"])
+    psRefs.extend(snapshot["psRefs"])
+    psLibraryCutoff = snapshot["psLibraryCutoff"]
+else:
+    ps, refs, psLibraryCutoff = scanSource(source, lineStarts, 
+                                           sourceLibraryCutoff)
+    if snapshot != None:
+        # Replace the pseudo-statements already processed in the snapshot
+        # by their (possibly macro-split) versions from the snapshot.
+        boundary = snapshotBoundaries[nextSnapshot - 1][0]
+        consumed = 0
+        while consumed < len(refs) and refs[consumed] < boundary - 1:
+            consumed += 1
+        if psLibraryCutoff >= consumed:
+            psLibraryCutoff += snapshot["lineNumber"] - consumed
         else:
-            quoteCount -= 2
-        pseudoStatement = pseudoStatement + "'"
-        for j in range(0, quoteCount, 2):
-            pseudoStatement = pseudoStatement + replacementQuote
-        if not inQuote:
-            pseudoStatement = pseudoStatement + "'"
-        lastLastC = lastC
-        lastC = c
-        continue
-    elif c == "*" and lastC == "/":
-        inComment = True
-        inStartedRef = lineRef
-        c = ' '
-        pseudoStatement = pseudoStatement[:-1]
-    elif c in [";", ":"]:
-        endOfStatement = True
-    elif c == "/" and lastC == "%":
-        endOfStatement = True
-    elif c in ["N", "n"] and source[max(0,i-3):i+1].upper() == "THEN" and \
-            None != re.search("\\bTHEN\\b", source[max(0,i-4):i+2], \
-                              flags = re.IGNORECASE):
-        endOfStatement = True
-    elif c in ["E", "e"] and source[max(0,i-3):i+1].upper() == "ELSE" and \
-            None != re.search("\\bELSE\\b", source[max(0,i-4):i+2], \
-                              flags = re.IGNORECASE):
-        endOfStatement = True
-    elif c in ["F", "f"] and source[max(0,i-2):i+1].upper() == "EOF" and \
-            None != re.search("\\bEOF\\b", source[max(0,i-3):i+2], \
-                              flags = re.IGNORECASE):
-        endOfStatement = True
-    elif c == "^" or c == logicalNot:
-        c = '~'
-    if inHex or inBase:
-        hexAccumulator = hexAccumulator + c
-    elif not inComment:
-        if not (c == ' ' and lastC == ' ') or inQuote:
-            pseudoStatement = pseudoStatement + c
-    if endOfStatement:
-        if psLibraryCutoff == 0 and i >= sourceLibraryCutoff:
-            psLibraryCutoff = len(pseudoStatements)
-        pseudoStatements.append(pseudoStatement.lstrip())
-        psRefs.append(lineRef)
-        pseudoStatement = ''
-    lastLastC = lastC
-    lastC = c
+            psLibraryCutoff = snapshot["psLibraryCutoff"]
+        ps = snapshot["pseudoStatements"] + ps[consumed:]
+        refs = snapshot["psRefs"] + refs[consumed:]
+    pseudoStatements.extend(ps)
+    psRefs.extend(refs)
+inRecord = False # Tracks whether continuation of "BASED RECORD:".
+if snapshot != None:
+    globalScope = snapshot["globalScope"]
+    scope = snapshot["scope"]
+    inRecord = snapshot["inRecord"]
+    declareModule.offsetInRecord = snapshot["offsetInRecord"]
+    resetMacroCaches(snapshot["globiterals"])
 
-setErrorRef(inStartedRef)
-if inQuote:
-    error("Unterminated quoted string", None)
-if inComment:
-    error("Unterminated inline comment", None)
-if inHex:
-    error("Unterminated hexadecimal number", None)
-if inBase:
-    error("Unterminated base %s number" % baseRadix, None)
-if inConditional:
-    error("Unterminated conditional directive", None)
-if inRecord:
-    error("Unterminated BASED RECORD", None)
+# Take a snapshot of the model prior to processing pseudo-statement 
+# `lineNumber`, for all boundaries that have now been reached.
+def takeSnapshots(lineNumber, final = False):
+    global nextSnapshot
+    while nextSnapshot < len(snapshotBoundaries):
+        boundary, key = snapshotBoundaries[nextSnapshot]
+        if not final and psRefs[lineNumber] < boundary - 1:
+            break
+        saveSnapshot(key, {
+            "globalScope": globalScope,
+            "scope": scope,
+            "inRecord": inRecord,
+            "lineNumber": lineNumber,
+            "psLibraryCutoff": psLibraryCutoff,
+            "pseudoStatements": pseudoStatements[:lineNumber],
+            "psRefs": psRefs[:lineNumber],
+            "offsetInRecord": declareModule.offsetInRecord,
+            "globiterals": set(globiterals)
+            })
+        nextSnapshot += 1
 
 # Tokenize and parse, on a pseudo-statement by pseudo-statement basis.
 # Note that because of macro expansion, the number of pseudo-statments
 # can increase during the loop.
 lineNumber = -1
+if snapshot != None:
+    lineNumber = snapshot["lineNumber"] - 1
 while True:
     lineNumber += 1
     if lineNumber >= len(pseudoStatements):
+        takeSnapshots(lineNumber, True)
         break
+    takeSnapshots(lineNumber)
     setErrorRef(psRefs[lineNumber])
     #code = {} # The dictionary generated for a parsed pseudo-statement.
     #print(lineNumber, pseudoStatements[lineNumber], scope)
@@ -644,27 +504,31 @@ if False: # Print out a hierarchical tree of procedures.
 # code.
 if targetLanguage == "C":
     try:
-        try:
-            shutil.rmtree(outputFolder, True)
-        except:
-            pass
-        os.mkdir(outputFolder)
-        shutil.copy2(basePath + "runtimeC.c", outputFolder)
-        shutil.copy2(basePath + "runtimeC.h", outputFolder)
-        shutil.copy2(basePath + "inline360.c", outputFolder)
-        shutil.copy2(basePath + "inline360.h", outputFolder)
-        shutil.copy2(basePath + "debuggingAid.c", outputFolder)
-        shutil.copy2(basePath + "Makefile.template", outputFolder + "/Makefile")
+        prepareOutputFolder()
+        copyIfChanged(basePath + "runtimeC.c", outputFolder)
+        copyIfChanged(basePath + "runtimeC.h", outputFolder)
+        copyIfChanged(basePath + "inline360.c", outputFolder)
+        copyIfChanged(basePath + "inline360.h", outputFolder)
+        copyIfChanged(basePath + "debuggingAid.c", outputFolder)
+        copyIfChanged(basePath + "Makefile.template", outputFolder + "/Makefile")
     except:
         error("Failed to create files runtimeC.c etc. in %s/" % outputFolder, \
               scope)
     generateC(globalScope)
+    finishOutputs()
+    pruneSnapshots(snapshotBoundaries)
     if prettyPrint:
-        #print("Pretty-printing " + ppFiles["filenames"], file=sys.stderr)
-        os.system("cd " + outputFolder + " && clang-format --style=gnu -i " + \
-                  ppFiles["filenames"])
+        # Only the files which have actually been rewritten need it.
+        ppNames = [name for name in ppFiles["filenames"].split() \
+                   if name in rewrittenFiles]
+        #print("Pretty-printing " + " ".join(ppNames), file=sys.stderr)
+        if len(ppNames) > 0:
+            os.system("cd " + outputFolder + " && clang-format --style=gnu -i " + \
+                      " ".join(ppNames))
 
 if not quiet and reservedMemory["numReserved"] > 0:
     print("Reserved count: %d" % reservedMemory["numReserved"])
     print("Reserved space: %d" % (0x1000000 - reservedMemory["nextReserved"]))
 
+if profileExpressions:
+    printCounters()
@@ -8,6 +8,10 @@ Purpose:    This is the code generator for XCOM-I.py which targets the
             language C.
 Reference:  http://www.ibibio.org/apollo/Shuttle.html
 Mods:       2024-03-27 RSB  Began.
+            2026-10-17 RSB  Generated files are now rewritten only if changed,
+                            and the start time/date moved from 
+                            configuration.h to generationTime.c.
+                            Added the --memory-image option.
 '''
 
 import sys
@@ -23,6 +27,7 @@ from parseExpression import parseExpression
 from asciiToEbcdic import asciiToEbcdic
 from callTree import callTree
 from guessINLINE import guessINLINE, guessFiles
+from incremental import openOutput, closeOutput
 
 stdoutOld = sys.stdout
 
@@ -203,6 +208,28 @@ values are themselves dictionaries with the keys:
 '''
 memoryMap = {}
 
+# Run-length encoding of the initialized memory image for --memory-image=rle.
+# The encoded image is a sequence of records, each consisting of a 4-byte
+# count of literal bytes, a 4-byte count of zero bytes, and then the literal
+# bytes themselves.  (Counts are little-endian.)  Only runs of zeroes are
+# encoded, since those are almost all of the redundancy there is.  The
+# matching decoder is `expandMemoryImage` in runtimeC.c.
+zeroRun = re.compile(b"\x00{16,}")
+def encodeMemoryImage(image):
+    encoded = bytearray()
+    position = 0
+    for match in zeroRun.finditer(image):
+        literals = image[position:match.start()]
+        encoded += len(literals).to_bytes(4, "little")
+        encoded += (match.end() - match.start()).to_bytes(4, "little")
+        encoded += literals
+        position = match.end()
+    if position < len(image):
+        encoded += (len(image) - position).to_bytes(4, "little")
+        encoded += (0).to_bytes(4, "little")
+        encoded += image[position:]
+    return bytes(encoded)
+
 # The following functions are the Python equivalents of the functions
 # with the same names in runtimeC.c, and behave identically except that 
 # they are used at compile-time for initialization rather than run-time.
@@ -2456,7 +2483,7 @@ def generateCodeForScope(scope, extra = { "of": None, "indent": "" }):
     topLevel = False
     if of == None:
         ppFiles["filenames"] = ppFiles["filenames"] + " " + functionName + ".c"
-        of = open(outputFolder + "/" + functionName + ".c", "w")
+        of = openOutput(functionName + ".c")
         topLevel = True
         stdoutOld = sys.stdout
         sys.stdout = of # Redirect all `print` to this file.
@@ -2682,12 +2709,13 @@ def generateCodeForScope(scope, extra = { "of": None, "indent": "" }):
         print()
     if topLevel:
         sys.stdout = stdoutOld # Restore previous stdout.
+        closeOutput(of)
 
 def generateC(globalScope):
     global pf, nonCommonBase, freeBase, freePoint, freeLimit, \
             variableAddress, regions, baseRestriction
     
-    pf = open(outputFolder + "/procedures.h", "w")
+    pf = openOutput("procedures.h")
     print("/*", file=pf)
     print("  File procedures.h generated by XCOM-I, " + \
           datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + ".", 
@@ -2813,7 +2841,7 @@ def generateC(globalScope):
         i += 1
 
     # Write out the initialized memory as a file called memory.c.
-    f = open(outputFolder + "/memory.c", "w")
+    f = openOutput("memory.c")
     print("// Memory data generated by XCOM-i\n", file=f)
     print("#include \"runtimeC.h\"", file=f)
     print("", file=f)
@@ -2855,6 +2883,44 @@ def generateC(globalScope):
                 break
         numInitialized = (i + 8) & ~7 
         print("uint8_t memory[MEMORY_SIZE];", file=f)
+    if sizeReducer and memoryImage != None:
+        # Rather than a C initializer, put the initialized memory into a 
+        # separate binary file that's pulled into the executable at 
+        # compile-time.  It's optionally run-length encoded, in which case
+        # `parseCommandLine` in runtimeC.c expands it.
+        image = bytes(memory[:numInitialized])
+        if memoryImage == "rle":
+            image = encodeMemoryImage(image)
+            symbol = "memoryImage"
+        else:
+            symbol = "memoryInitializer"
+        bf = openOutput("memory.bin", True)
+        bf.write(image)
+        closeOutput(bf)
+        print("// The %d-byte file memory.bin is embedded here." % len(image), 
+              file=f)
+        print("#ifdef __has_embed", file=f)
+        print("uint8_t %s[] = {" % symbol, file=f)
+        print("#embed \"memory.bin\"", file=f)
+        print("};", file=f)
+        print("#else", file=f)
+        print("#define XSTR(s) STR(s)", file=f)
+        print("#define STR(s) #s", file=f)
+        print("#ifdef __APPLE__", file=f)
+        print("#define IMAGE_SECTION \".const_data\"", file=f)
+        print("#else", file=f)
+        print("#define IMAGE_SECTION \".section .rodata\"", file=f)
+        print("#endif", file=f)
+        print("__asm__(IMAGE_SECTION \"\\n\"", file=f)
+        print("        \".globl \" XSTR(__USER_LABEL_PREFIX__) \"%s\\n\"" % \
+              symbol, file=f)
+        print("        \".balign 8\\n\"", file=f)
+        print("        XSTR(__USER_LABEL_PREFIX__) \"%s:\\n\"" % symbol, 
+              file=f)
+        print("        \".incbin \\\"memory.bin\\\"\\n\"", file=f)
+        print("        \".text\\n\");", file=f)
+        print("#endif", file=f)
+    elif sizeReducer:
         print("uint8_t memoryInitializer[NUM_INITIALIZED] = {", file=f)
         for i in range(numInitialized):
             if 0 == i % 8:
@@ -3009,11 +3075,11 @@ def generateC(globalScope):
         print("  { %d, %d }" % tuple(regions[i]), end="", file=f)
         print(" /* (0x%06X, 0x%06X) */" % tuple(regions[i]), end="", file=f)
     print("\n};", file=f)
-    f.close()
+    closeOutput(f)
     
     # Write out any special configuration settings, for use by
     # runtimeC.c.
-    f = open(outputFolder + "/configuration.h", "w")
+    f = openOutput("configuration.h")
     print("// Configuration settings, inferred from the XPL/I source.", file=f)
     fields = outputFolder.split("/\\")
     appName = fields[-1]
@@ -3025,8 +3091,6 @@ def generateC(globalScope):
     else:
         print("#define resetAllReentryGuards()", file=f)
     print("#define APP_NAME \"%s\"" % appName, file=f)
-    print("#define XCOM_I_START_TIME %d" % TIME_OF_GENERATION, file=f)
-    print("#define XCOM_I_START_DATE %d" % DATE_OF_GENERATION, file=f)
     print("#define MAJOR_VERSION %d" % majorVersionXCOMI, file=f)
     print("#define MINOR_VERSION %d" % minorVersionXCOMI, file=f)
     if "P" in ifdefs:
@@ -3059,6 +3123,8 @@ def generateC(globalScope):
     print("#define USER_MEMORY %d" % USER_MEMORY, file=f)
     if sizeReducer:
         print("#define NUM_INITIALIZED %d" % numInitialized, file=f)
+        if memoryImage == "rle":
+            print("#define MEMORY_IMAGE_RLE", file=f)
     print("", file=f)
     print("extern char *mangledLabels[NUM_MANGLED];", file=f)
     print("typedef char symbol_t[MAX_SYMBOL_LENGTH + 1];", file=f)
@@ -3096,7 +3162,21 @@ def generateC(globalScope):
     print("} memoryRegion_t;", file=f)
     print("extern memoryRegion_t memoryRegions[%d];" % len(regions), file=f)
     print("", file=f)
-    f.close()
+    closeOutput(f)
+    
+    # The time and date at which XCOM-I was started, for the XPL built-ins 
+    # TIME_OF_GENERATION and DATE_OF_GENERATION.  These change on every run,
+    # so they're kept separate from configuration.h to avoid forcing
+    # recompilation of everything else.
+    f = openOutput("generationTime.c")
+    print("// Start time and date of XCOM-I, generated by XCOM-I.\n", file=f)
+    print("#include \"runtimeC.h\"", file=f)
+    print("", file=f)
+    print("uint32_t\nDATE_OF_GENERATION(void) {", file=f)
+    print("  return %d;\n}\n" % DATE_OF_GENERATION, file=f)
+    print("uint32_t\nTIME_OF_GENERATION(void) {", file=f)
+    print("  return %d;\n}" % TIME_OF_GENERATION, file=f)
+    closeOutput(f)
     
     if debugSink != None:
         print('', file=debugSink)
@@ -3105,11 +3185,11 @@ def generateC(globalScope):
     # Generate some code.
     walkModel(globalScope, generateCodeForScope, { "of": None, "indent": ""})
     
-    pf.close()
+    closeOutput(pf)
     
     # Create resetAllReentryGuards.c
     if reentryGuard:
-        rf = open(outputFolder + "/resetAllReentryGuards.c", "w")
+        rf = openOutput("resetAllReentryGuards.c")
         print("/*", file=rf)
         print("  File resetAllReentryGuards.c was generated by XCOM-I, " + \
               datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + ".", 
@@ -3128,7 +3208,7 @@ def generateC(globalScope):
                           file=rf)
         walkModel(globalScope, resetGuardsInScope, None)
         print("}", file=rf)
-        rf.close()    
+        closeOutput(rf)
     
     # Output the approximated patches.
     if len(guessFiles) > 0:
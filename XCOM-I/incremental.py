@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+'''
+License:    The author (Ronald S. Burkey) declares that this program
+            is in the Public Domain (U.S. law) and may be used or
+            modified for any purpose whatever without licensing.
+Filename:   incremental.py
+Purpose:    Support for incremental recompilation by XCOM-I.py, namely
+            a persistent on-disk cache of the parsed scope model, and
+            output of generated C files only when their contents actually
+            change.
+Reference:  http://www.ibibio.org/apollo/Shuttle.html
+Mods:       2026-10-17 RSB  Began.
+
+Compiling HAL/S-FC's PASS1 or PASS2 takes several seconds in XCOM-I, and the
+resulting C takes much longer to compile than that, even though between
+successive runs typically only a line or two of the XPL/I source has been
+edited.  There are two separate things done here to cut down on that.
+
+Firstly, the model of the program (i.e., the tree of scope dictionaries rooted
+at the global scope, plus a few odds and ends) is pickled into the `.cache/`
+subfolder of the output folder.  Rather than just doing this once, a
+"snapshot" of the model is pickled each time the parse crosses from one of
+the top-level source files (the library file, or any of the files given on the
+command line) into the next, as well as at the very end.  Each snapshot is
+named by a hash of the XCOM-I version, of XCOM-I's own Python source code, of
+the command-line options affecting the parse, and of all source lines
+preceding that boundary.  Thus if nothing at all has changed, the final
+snapshot is found and neither scanning nor parsing is done at all; while if
+(say) only the main program has changed, the snapshot at the end of the
+library file is found and parsing resumes from there.
+
+Secondly, generated files are written by way of `openOutput` and
+`closeOutput`, which simply discard the new contents if they're the same as
+what was written the last time (apart from timestamps).  A manifest of hashes
+of the files as generated (i.e., prior to any pretty-printing) is kept in
+the `.cache/` folder for the purpose.  Since the existing files are left
+untouched, `make` needn't recompile their object files.  Previously-generated
+files which are no longer produced (for example, for a PROCEDURE which has
+been deleted) are removed, along with their object files.
+'''
+
+import sys
+import os
+import io
+import re
+import glob
+import json
+import pickle
+import shutil
+import hashlib
+import filecmp
+from parseCommandLine import *
+
+cacheFolder = outputFolder + "/.cache"
+manifestFilename = cacheFolder + "/outputs.json"
+
+#-----------------------------------------------------------------------------
+# Persistent snapshots of the scope model.
+
+# Returns the hash of the parts of XCOM-I itself and of its command line
+# which can affect the model.
+def baseHash():
+    h = hashlib.sha256()
+    h.update(("%d.%d" % (majorVersionXCOMI, minorVersionXCOMI)).encode())
+    for filename in sorted(glob.glob(basePath + "*.py")):
+        f = open(filename, "rb")
+        h.update(f.read())
+        f.close()
+    h.update(repr((sorted(ifdefs), standardXPL, sorted(adhocs.items()),
+                   replacementQuote, replacementSpace)).encode())
+    return h
+
+# Returns a list of (boundary, key) pairs, one for each of the line-number
+# `boundaries` (which must be in increasing order), where `key` identifies a
+# snapshot of the model taken just prior to the first pseudo-statement ending
+# on or after the line preceding `boundary`.
+def snapshotKeys(boundaries):
+    keys = []
+    h = baseHash()
+    start = 0
+    for boundary in boundaries:
+        for i in range(start, boundary):
+            h.update(lineRefs[i].encode())
+            h.update(lines[i].encode())
+        start = boundary
+        keys.append((boundary, h.copy().hexdigest()))
+    return keys
+
+# Returns the list of all line numbers (indices in `lines`) at which a
+# top-level source file begins, other than the first, plus the end of the
+# source.
+def sourceBoundaries():
+    boundaries = [b for b in fileCutoffs if b > 0]
+    boundaries.append(len(lines))
+    return sorted(set(boundaries))
+
+def loadSnapshot(key):
+    if noCache:
+        return None
+    filename = cacheFolder + "/" + key + ".pickle"
+    try:
+        f = open(filename, "rb")
+        snapshot = pickle.load(f)
+        f.close()
+    except:
+        return None
+    return snapshot
+
+def saveSnapshot(key, snapshot):
+    if noCache:
+        return
+    filename = cacheFolder + "/" + key + ".pickle"
+    try:
+        os.makedirs(cacheFolder, exist_ok = True)
+        data = pickle.dumps(snapshot, protocol = pickle.HIGHEST_PROTOCOL)
+        f = open(filename, "wb")
+        f.write(data)
+        f.close()
+    except (RecursionError, pickle.PicklingError, OSError):
+        # Not fatal, of course; there will simply be no cache hit next time.
+        return
+
+# Remove all snapshots not involved in the current run, i.e., other than those
+# for the `keys` returned by `snapshotKeys`.
+def pruneSnapshots(keys):
+    if noCache:
+        return
+    current = { key + ".pickle" for boundary, key in keys }
+    for filename in glob.glob(cacheFolder + "/*.pickle"):
+        if os.path.basename(filename) not in current:
+            try:
+                os.remove(filename)
+            except:
+                pass
+
+#-----------------------------------------------------------------------------
+# Output of generated files only when changed.
+
+# `outputDigests` is the manifest, as read at startup and updated as files are
+# written.  `generatedFiles` is the set of files generated during this run,
+# while `rewrittenFiles` lists the subset of those which were actually written.
+outputDigests = {}
+if not noCache:
+    try:
+        f = open(manifestFilename, "r")
+        outputDigests = json.load(f)
+        f.close()
+    except:
+        outputDigests = {}
+previousOutputs = set(outputDigests)
+generatedFiles = set()
+rewrittenFiles = []
+
+# Timestamps embedded in the headers of generated files.
+timestampPattern = \
+    re.compile("generated by XCOM-I, [0-9]{4}-[0-9]{2}-[0-9]{2} " + \
+               "[0-9]{2}:[0-9]{2}:[0-9]{2}")
+
+# Prepare the output folder.  If it has no manifest, then it wasn't written
+# by this incremental scheme (or caching is disabled), so we start from
+# scratch, as XCOM-I always did formerly, except for any snapshots just
+# saved.
+def prepareOutputFolder():
+    if len(outputDigests) == 0 and os.path.isdir(outputFolder):
+        for name in os.listdir(outputFolder):
+            pathname = outputFolder + "/" + name
+            if name == ".cache" and not noCache:
+                continue
+            if os.path.isdir(pathname):
+                shutil.rmtree(pathname, True)
+            else:
+                os.remove(pathname)
+    os.makedirs(outputFolder, exist_ok = True)
+
+# Copy a file, but only if the destination doesn't already have the same
+# contents.
+def copyIfChanged(source, destination):
+    if os.path.isdir(destination):
+        destination = destination + "/" + os.path.basename(source)
+    if os.path.exists(destination) and \
+            filecmp.cmp(source, destination, shallow = False):
+        return
+    shutil.copy2(source, destination)
+
+# Returns a file-like object for generating the file `filename` (relative to
+# the output folder), which is a text file unless `binary` is True.  Use 
+# `closeOutput` rather than its `close` method.
+def openOutput(filename, binary = False):
+    if binary:
+        f = io.BytesIO()
+    else:
+        f = io.StringIO()
+    f.filename = filename
+    return f
+
+def closeOutput(f):
+    filename = f.filename
+    contents = f.getvalue()
+    f.close()
+    generatedFiles.add(filename)
+    h = hashlib.sha256()
+    h.update(repr(prettyPrint).encode())
+    if isinstance(contents, bytes):
+        h.update(contents)
+        mode = "wb"
+    else:
+        h.update(timestampPattern.sub("", contents).encode())
+        mode = "w"
+    digest = h.hexdigest()
+    pathname = outputFolder + "/" + filename
+    if outputDigests.get(filename) == digest and os.path.exists(pathname):
+        return
+    f = open(pathname, mode)
+    f.write(contents)
+    f.close()
+    outputDigests[filename] = digest
+    rewrittenFiles.append(filename)
+
+# Called after all generated files have been closed.  Removes those produced
+# by a prior run but not by this one, and saves the manifest.
+def finishOutputs():
+    for filename in previousOutputs - generatedFiles:
+        outputDigests.pop(filename)
+        base, ext = os.path.splitext(filename)
+        for stale in [filename, base + ".o"]:
+            try:
+                os.remove(outputFolder + "/" + stale)
+            except:
+                pass
+    if noCache:
+        return
+    try:
+        os.makedirs(cacheFolder, exist_ok = True)
+        f = open(manifestFilename, "w")
+        json.dump(outputDigests, f, indent = 0, sort_keys = True)
+        f.close()
+    except:
+        pass
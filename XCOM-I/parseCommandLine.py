@@ -85,6 +85,12 @@ reentryGuard = True # Do not change this.
 #autoInline = False
 guessInlines = []
 traceInlines = False
+benchmarkScan = False
+noCache = False
+memoryImage = None # None, "raw", or "rle".
+profileExpressions = False
+packrat = True
+fileCutoffs = [] # Index in `lines` at which each top-level source file begins.
 
 # The characters used internally to replace spaces and duplicated single-quotes
 # within quoted strings.  The exact values aren't important, except insofar as
@@ -277,6 +283,37 @@ The available OPTIONS are:
                 XPL memory space for its own internal use.  If you get an 
                 out-of-reserved-memory error message from XCOM-I, you can use
                 this option to enlarge the amount of reserved memory.
+--benchmark-scan Rather than compiling, time the scanning of the source code
+                into pseudo-statements, comparing the original character-by-
+                character method against the current table-driven method,
+                check that the two produce identical results, and then exit.
+--no-cache      By default, XCOM-I saves the parsed model of the program in the
+                subfolder .cache/ of the output folder, and reuses it (in
+                whole or in part) on subsequent runs for which the library
+                file and/or other source-code files are unchanged.  Besides
+                that, generated C files whose contents haven't changed are
+                not rewritten, so that `make` need not recompile them.  This
+                option disables the former and causes the output folder to be
+                recreated from scratch.  Note that informational messages or
+                warnings from the parsing phase are not repeated when a cached
+                model is used.
+--memory-image  By default, the initial contents of memory are written into 
+--memory-image=rle
+                memory.c as a C array initializer, which is slow both to 
+                generate and to compile.  With --memory-image, they're instead
+                written as a binary file, memory.bin, which the C compiler
+                embeds directly into the executable via `#embed` (if 
+                supported) or else the assembler's `.incbin` directive.  With
+                --memory-image=rle, memory.bin is also run-length encoded,
+                and is expanded at runtime.
+--profile-expressions
+                At the end of processing, print counts of how often each of
+                the recognizer functions in parseExpression.py was requested
+                and how often it actually had to be evaluated.  Use with
+                --no-cache, since cached models aren't reparsed.
+--no-packrat    Disable the memoization of parseExpression.py's recognizer
+                functions, which is useful only to measure its effect with
+                --profile-expressions.
 '''
 
 for parm in sys.argv[1:]:
@@ -284,6 +321,18 @@ for parm in sys.argv[1:]:
         break
     #elif parm == "--auto-inline":
     #    autoInline = True
+    elif parm == "--benchmark-scan":
+        benchmarkScan = True
+    elif parm == "--no-cache":
+        noCache = True
+    elif parm == "--memory-image":
+        memoryImage = "raw"
+    elif parm == "--memory-image=rle":
+        memoryImage = "rle"
+    elif parm == "--profile-expressions":
+        profileExpressions = True
+    elif parm == "--no-packrat":
+        packrat = False
     elif parm == "--trace-inlines":
         traceInlines = True
     elif parm.startswith("--guess="):
@@ -387,9 +436,11 @@ for parm in sys.argv[1:]:
             else:
                 dirHALINCL = includeFolder
             if libFile != None:
+                fileCutoffs.append(len(lines))
                 readFileIntoLines(libFile)
                 libraryCutoff = len(lines)
         firstFile = False
+        fileCutoffs.append(len(lines))
         readFileIntoLines(parm)
         if outputFolder == None:
             head, tail = os.path.split(parm)
@@ -9,10 +9,12 @@ Purpose:    This parses an expression for XCOM-I.py, given a tokenized form
 Requires:   Python 3.6 or later.
 Reference:  http://www.ibibio.org/apollo/Shuttle.html
 Mods:       2024-03-22 RSB  Began
+            2026-10-17 RSB  Added packrat memoization of the recognizers.
 '''
 
 import sys
 from asciiToEbcdic import asciiToEbcdic
+from parseCommandLine import packrat
 
 '''
 Expressions are treated as Python dictionaries representing a tree structure 
@@ -57,6 +59,90 @@ def createNode(tokenized, index, parent = None):
         attachChild(parent, node)
     return node
 
+#-----------------------------------------------------------------------------
+'''
+The recognizer functions described below call each other recursively, and
+in doing so frequently find themselves re-parsing exactly the same thing they
+(or some other recognizer) already parsed a moment earlier.  For example, 
+`isSubscriptHead` parses the final subscript of an array reference before 
+discovering that it's not followed by a comma, after which `isUnbasedVariable`
+parses that same subscript again; if that subscript itself contains a 
+subscripted variable, the same thing happens again inside of it, and so on, 
+so the work doubles with each level of nesting.
+
+To avoid that, the recognizers can be "packrat" memoized, by decorating them
+with `@memoize`:  The first time a given recognizer is applied at a given 
+token index, its list of matching trees is saved in `memo`, and any 
+subsequent requests for the same recognizer at the same index simply reuse 
+them.  In practice, all of the repeated work begins with a re-entry into
+`isExpression` (for a subscript or argument), so that's the only recognizer
+which is presently decorated; decorating all of them just adds overhead.  
+The memo lasts only as long as the outermost recognizer call, such as the one 
+made by `parseExpression`, so it never outlives the list of tokens it refers 
+to.
+
+There's a catch, namely that the recognizers modify the trees returned to 
+them by other recognizers, by attaching them to new parent nodes or by 
+extending their "end" fields.  However, it's only ever the root nodes of 
+those trees which are modified, so the memo hands out copies of the root
+nodes (see `shareNode`) while sharing all of the nodes below them.
+
+For profiling, `counters` relates each recognizer's name to a pair of 
+counts:  the number of requests for that recognizer, and the number of those 
+requests that actually had to be evaluated rather than taken from the memo.
+Memoization can be disabled with the --no-packrat command-line option, in
+which case the two counts are the same, but are larger overall.  The 
+--profile-expressions option prints the counts (see `printCounters`).
+'''
+memo = {}
+memoDepth = 0 # Depth of nesting of memoized recognizer calls.
+counters = {}
+
+# Returns a copy of a tree's root node, sharing its descendants.
+def shareNode(node):
+    root = dict(node)
+    root["children"] = list(node["children"])
+    for child in root["children"]:
+        child["parent"] = root
+    return root
+
+# Converts a recognizer function into a memoized recognizer function.
+def memoize(recognizer):
+    name = recognizer.__name__
+    counter = [0, 0]
+    counters[name] = counter
+    def memoizedRecognizer(tokenized, start):
+        global memo, memoDepth
+        counter[0] += 1
+        if not packrat:
+            counter[1] += 1
+            return recognizer(tokenized, start)
+        if memoDepth == 0:
+            memo = {}
+        key = (name, start)
+        if key not in memo:
+            counter[1] += 1
+            memoDepth += 1
+            try:
+                memo[key] = recognizer(tokenized, start)
+            finally:
+                memoDepth -= 1
+        return [shareNode(node) for node in memo[key]]
+    return memoizedRecognizer
+
+# Prints the profiling counters.
+def printCounters(file = sys.stdout):
+    print("Expression recognizer      Requests  Evaluations", file = file)
+    totalRequests = 0
+    totalEvaluations = 0
+    for name in counters:
+        requests, evaluations = counters[name]
+        totalRequests += requests
+        totalEvaluations += evaluations
+        print("%-24s %10d %12d" % (name, requests, evaluations), file = file)
+    print("%-24s %10d %12d" % ("(total)", totalRequests, totalEvaluations), \
+          file = file)
+
 #-----------------------------------------------------------------------------
 '''
 I don't really know anything about parsing expressions of the complexity 
@@ -172,6 +258,7 @@ since it would be rather pointless to have ambiguity in how to
 compute the values of the expressions.  So `isExpression` is only
 going to return 0 or 1 matches if there's no implementation error. 
 '''
+@memoize
 def isExpression(tokenized, start):
     return isType(tokenized, start, isLogicalFactor, {"|"})
 
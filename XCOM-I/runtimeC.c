@@ -11,6 +11,9 @@
  *                              bit_t, and lots of char*.
  *              2024-06-19 RSB  Split off some functions not used in "production"
  *                              into debuggingAid.c.
+ *              2026-10-17 RSB  DATE_OF_GENERATION and TIME_OF_GENERATION
+ *                              moved to the generated generationTime.c.
+ *                              Added expansion of --memory-image=rle images.
  *
  * The functions herein are documented in runtimeC.h.
  *
@@ -632,6 +635,31 @@ parseParmField(int print) {
     putCHARACTER(address + 4 * i, &type1Actual[i]);
 }
 
+#ifdef MEMORY_IMAGE_RLE
+// Expands the run-length encoded memory image embedded by XCOM-I's 
+// --memory-image=rle option.  The image is a sequence of records, each 
+// consisting of a 4-byte count of literal bytes, a 4-byte count of zero bytes,
+// and then the literal bytes.  The counts are little-endian.
+static void
+expandMemoryImage(const uint8_t *image, uint8_t *destination, uint32_t size)
+{
+  uint32_t position = 0, literals, zeroes;
+  while (position < size)
+    {
+      literals = image[0] | (image[1] << 8) | (image[2] << 16)
+          | ((uint32_t) image[3] << 24);
+      zeroes = image[4] | (image[5] << 8) | (image[6] << 16)
+          | ((uint32_t) image[7] << 24);
+      image += 8;
+      memcpy(destination + position, image, literals);
+      image += literals;
+      position += literals;
+      memset(destination + position, 0, zeroes);
+      position += zeroes;
+    }
+}
+#endif
+
 // Doesn't just parse the command line, but also performs some other
 // initialization.
 int
@@ -642,7 +670,10 @@ parseCommandLine(int argc, char **argv)
   FILE *COMMON_IN = NULL;
   gettimeofday(&startTime, NULL);
 
-#ifdef NUM_INITIALIZED
+#if defined(MEMORY_IMAGE_RLE)
+  extern uint8_t memoryImage[];
+  expandMemoryImage(memoryImage, memory, NUM_INITIALIZED);
+#elif defined(NUM_INITIALIZED)
   extern uint8_t memoryInitializer[NUM_INITIALIZED];
   memcpy(memory, memoryInitializer, NUM_INITIALIZED);
 #endif
@@ -2820,15 +2851,9 @@ DATE(void) {
     return 360000 * h + 6000 * m + 100 * s;
   }
 #else
-  uint32_t
-  DATE_OF_GENERATION(void) {
-    return XCOM_I_START_DATE;
-  }
-
-  uint32_t
-  TIME_OF_GENERATION(void) {
-    return XCOM_I_START_TIME;
-  }
+  // DATE_OF_GENERATION() and TIME_OF_GENERATION() are instead in the file 
+  // generationTime.c generated by XCOM-I, so that they can change from run to
+  // run without requiring recompilation of anything else.
 #endif
 
 uint32_t
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+'''
+License:    The author (Ronald S. Burkey) declares that this program
+            is in the Public Domain (U.S. law) and may be used or
+            modified for any purpose whatever without licensing.
+Filename:   scanSource.py
+Purpose:    This is the scanner that converts the concatenated XPL source
+            code into a list of pseudo-statements for XCOM-I.py.
+Requires:   Python 3.6 or later.
+Reference:  http://www.ibibio.org/apollo/Shuttle.html
+Mods:       2026-10-17 RSB  Split off from XCOM-I.py, and added the
+                            table-driven fast path.
+
+The scanner is a character-by-character state machine, tracking whether we're
+inside of a quoted string, an inline comment, a double-quoted hexadecimal (or
+other radix) number, or a /?c ... ?/ conditional.  Originally, every single
+character of the source was pushed through the entire state machine, which
+for HAL/S-FC (where the majority of the source consists of comments and of
+blank padding out to column 80) was by far the slowest part of XCOM-I prior
+to parsing.
+
+What's done now is that for each of the commonly-occurring states (ordinary
+code, inside a comment, inside a quoted string, inside of an unselected
+conditional), there's a precompiled regular expression matching the only
+characters which could possibly change the state or otherwise require
+individual attention.  Everything between the current position and the next
+such character is an inert run that can be processed in bulk.  Only the
+"interesting" characters (and the rarer states, such as hexadecimal
+literals) fall through to the original character-by-character logic, which
+has been left intact.  Since the only context the character-by-character
+logic depends on is the preceding one or two characters, a bulk run is never
+started immediately after a character that could combine with the next one
+(like the '/' of "/*", the '*' of "*/", or the '?' of "/?c" or "?/").
+
+The function `scanSource` can still be told to use only the original
+character-by-character logic, which is what `benchmarkScanner` does to
+compare the two methods.
+'''
+
+import sys
+import time
+from bisect import bisect_right
+import re
+from parseCommandLine import ifdefs, replacementQuote
+from auxiliary import error, setErrorRef
+from xtokenize import digits
+
+logicalNot = '¬'
+usCent = '¢'
+
+# Regular expressions for locating the next "interesting" character in each of
+# the states for which bulk processing is possible.  In ordinary code, the
+# final characters of THEN, ELSE, and EOF are interesting only if they
+# actually complete those words; the character-by-character logic then makes
+# the final determination of whether it's a full word or not.  Similarly,
+# a '/' is only interesting if it begins a comment, a '*' only if it ends
+# one, and so on.
+nextInCode = re.compile("[\"';:?^" + logicalNot + "]|/\\*|%/|" + \
+                        "(?<=[Tt][Hh][Ee])[Nn]|(?<=[Ee][Ll][Ss])[Ee]|" + \
+                        "(?<=[Ee][Oo])[Ff]")
+nextInComment = re.compile("\\*/|[?]")
+nextInQuote = re.compile("['" + usCent + "]")
+nextInConditional = re.compile("[?]/")
+multipleSpaces = re.compile("  +")
+# Values of `lastC` after which a bulk run can't begin, for each state.
+sensitiveInCode = ('/', '?', '%')
+sensitiveInComment = ('*', '?')
+
+# `source` is the entire XPL source code as a single string, and `lineStarts`
+# is a sorted list of the indices in `source` at which each line of source
+# code begins.  `sourceLibraryCutoff` is the index in `source` at which the
+# library code ends and the main source code begins.  The return value is
+# a triple consisting of the list of pseudo-statements, the list of indices
+# into `lines` for each of the pseudo-statements, and the index in the list
+# of pseudo-statements at which the main (vs library) code begins.
+def scanSource(source, lineStarts, sourceLibraryCutoff, fast = True):
+    pseudoStatements = []
+    psRefs = []
+    lastC = ''
+    lastLastC = ''
+    inQuote = False
+    inComment = False
+    inHex = False
+    inBase = False
+    inStartedRef = None
+    baseRadix = ''
+    baseStart = 0
+    inConditional = ''
+    conditionalTrue = False
+    pseudoStatement = ''
+    skipQuote = 0
+    psLibraryCutoff = 0 # Pseudo-statement index of change from library to main source.
+    sourceLength = len(source)
+    nextLine = 0 # Index into `lineStarts` of the next line to begin.
+    numLines = len(lineStarts)
+
+    i = -1 # Position in the source.
+    lineRef = None
+    while True:
+        i += 1
+        if nextLine < numLines and lineStarts[nextLine] <= i:
+            nextLine = bisect_right(lineStarts, i, nextLine)
+            lineRef = nextLine - 1
+            setErrorRef(lineRef)
+        if i >= sourceLength:
+            break
+        if skipQuote > 0:
+            skipQuote -= 1
+            continue
+
+        # The fast path: Find the next interesting character for the current
+        # state, and process everything prior to it in bulk.
+        if fast:
+            if inQuote:
+                nextInState = nextInQuote
+            elif inConditional != '' and not conditionalTrue:
+                nextInState = None if lastC == '?' else nextInConditional
+            elif inHex or inBase:
+                nextInState = None
+            elif inComment:
+                nextInState = None if lastC in sensitiveInComment \
+                              else nextInComment
+            else:
+                nextInState = None if lastC in sensitiveInCode \
+                              else nextInCode
+            end = i
+            if nextInState != None:
+                match = nextInState.search(source, i)
+                if match == None:
+                    end = sourceLength
+                else:
+                    end = match.start()
+            if end > i:
+                run = source[i:end]
+                if inQuote:
+                    pseudoStatement = pseudoStatement + run
+                elif inConditional != '' and not conditionalTrue:
+                    pass
+                elif inComment:
+                    pass
+                else:
+                    run2 = multipleSpaces.sub(' ', run)
+                    if lastC == ' ' and run2[:1] == ' ':
+                        run2 = run2[1:]
+                    pseudoStatement = pseudoStatement + run2
+                if len(run) > 1:
+                    lastLastC = run[-2]
+                else:
+                    lastLastC = lastC
+                lastC = run[-1]
+                i = end - 1
+                if nextLine < numLines and lineStarts[nextLine] <= i:
+                    nextLine = bisect_right(lineStarts, i, nextLine)
+                    lineRef = nextLine - 1
+                    setErrorRef(lineRef)
+                continue
+
+        c = source[i]
+
+        if not inQuote:
+            # Take care of /?c conditionals.  Note that embedded conditionals
+            # aren't supported or detected.  However, because I've found some
+            # of these inside of quoted strings, I do evaluate them within such
+            # strings.
+            if inConditional == '' and len(c) == 1 and c.isupper() \
+                    and lastC == '?' and lastLastC == '/':
+                inConditional = c
+                conditionalTrue = (c in ifdefs)
+                inStartedRef = lineRef
+                pseudoStatement = pseudoStatement[:-2]
+                lastLastC = lastC
+                lastC = c
+                continue
+            elif inConditional != '' and c == '/' and lastC == '?':
+                if conditionalTrue: # Remove the ?
+                    pseudoStatement = pseudoStatement[:-1]
+                inConditional = ''
+                conditionalTrue = False
+                lastLastC = lastC
+                lastC = c
+                continue
+            elif inConditional != "" and not conditionalTrue:
+                lastLastC = lastC
+                lastC = c
+                continue
+
+        # Just count the number of single-quotes in succession.
+        quoteCount = 0
+        if c == "'":
+            for j in range(i, sourceLength):
+                if source[j] != "'":
+                    break
+                quoteCount += 1
+        endOfStatement = False
+        if inComment:
+            if c == "/" and lastC == "*":
+                inComment = False
+                c = ' '
+        elif inQuote:
+            if c == usCent:
+                c = '`'
+            if quoteCount > 0:
+                skipQuote = quoteCount - 1
+                if 1 == (quoteCount & 1):
+                    inQuote = False
+                    quoteCount -= 1
+                for j in range(0, quoteCount, 2):
+                    pseudoStatement = pseudoStatement + replacementQuote
+                if not inQuote:
+                    pseudoStatement = pseudoStatement + "'"
+                lastLastC = lastC
+                lastC = c
+                continue
+        elif inHex:
+            if c == ' ':
+                continue
+            if c == '(':
+                inBase = True
+                baseRadix = ''
+                baseStart = len(pseudoStatement) - 1
+                cBase = ''
+                inHex = False
+                continue
+            if c == '"':
+                inHex = False
+                for ih in hexAccumulator:
+                    if ih not in digits["x"]:
+                        error("Non-digit (%s) in double-quoted string" % \
+                              ih, None)
+                        sys.exit(1)
+                # The leading space before the %d below relates to the fact
+                # that " cannot be a character in an identifier, but digits
+                # can be.  Thus if you have a construct like XSET"..." (which
+                # actually appears in HAL/S-FC source code), it's the
+                # difference between the number being appended to XSET vs
+                # being a separate token.  Neither choice is guaranteed to be
+                # safe, however, and the one I've made is the one that
+                # preserves the purpose of XSET.  Other XPL code might expect
+                # something different, and it *is* possible to process it
+                # such that both choices are ok.  My problem is that XCOM-I
+                # currently processes the hex strings prior to processing the
+                # macros, whereas Intermetrics's XCOM must have done it in the
+                # reverse order; and I'm too far down the development path to
+                # want to try fixing that.
+                pseudoStatement = pseudoStatement + " %d" % int(hexAccumulator, 16)
+                c = ''
+        elif inBase:
+            if c == ")":
+                if baseRadix == "1":
+                    cBase = 'b'
+                    baseRadix = 2
+                elif baseRadix == "2":
+                    cBase = 'q'
+                    baseRadix = 4
+                elif baseRadix == "8":
+                    cBase = 'o'
+                    baseRadix = 8
+                elif baseRadix == "16":
+                    cBase = 'x'
+                    baseRadix = 16
+                else:
+                    error("%s-bit not supported in literals" % baseRadix, \
+                          None)
+                continue
+            if cBase == '':
+                baseRadix = baseRadix + c
+                continue
+            if c == " ":
+                continue
+            if c == '"':
+                inBase = False
+                pseudoStatement = pseudoStatement + \
+                                        " %d" % int(hexAccumulator, baseRadix)
+                c = ''
+        elif c == '"':
+            inHex = True
+            inStartedRef = lineRef
+            hexAccumulator = ''
+            hexStart = len(pseudoStatement)
+            c = ''
+        elif c == "'":
+            skipQuote = quoteCount - 1
+            if 1 == (quoteCount & 1):
+                inQuote = True
+                inStartedRef = lineRef
+                quoteCount -= 1
+            else:
+                quoteCount -= 2
+            pseudoStatement = pseudoStatement + "'"
+            for j in range(0, quoteCount, 2):
+                pseudoStatement = pseudoStatement + replacementQuote
+            if not inQuote:
+                pseudoStatement = pseudoStatement + "'"
+            lastLastC = lastC
+            lastC = c
+            continue
+        elif c == "*" and lastC == "/":
+            inComment = True
+            inStartedRef = lineRef
+            c = ' '
+            pseudoStatement = pseudoStatement[:-1]
+        elif c in [";", ":"]:
+            endOfStatement = True
+        elif c == "/" and lastC == "%":
+            endOfStatement = True
+        elif c in ["N", "n"] and source[max(0,i-3):i+1].upper() == "THEN" and \
+                None != re.search("\\bTHEN\\b", source[max(0,i-4):i+2], \
+                                  flags = re.IGNORECASE):
+            endOfStatement = True
+        elif c in ["E", "e"] and source[max(0,i-3):i+1].upper() == "ELSE" and \
+                None != re.search("\\bELSE\\b", source[max(0,i-4):i+2], \
+                                  flags = re.IGNORECASE):
+            endOfStatement = True
+        elif c in ["F", "f"] and source[max(0,i-2):i+1].upper() == "EOF" and \
+                None != re.search("\\bEOF\\b", source[max(0,i-3):i+2], \
+                                  flags = re.IGNORECASE):
+            endOfStatement = True
+        elif c == "^" or c == logicalNot:
+            c = '~'
+        if inHex or inBase:
+            hexAccumulator = hexAccumulator + c
+        elif not inComment:
+            if not (c == ' ' and lastC == ' ') or inQuote:
+                pseudoStatement = pseudoStatement + c
+        if endOfStatement:
+            if psLibraryCutoff == 0 and i >= sourceLibraryCutoff:
+                psLibraryCutoff = len(pseudoStatements)
+            pseudoStatements.append(pseudoStatement.lstrip())
+            psRefs.append(lineRef)
+            pseudoStatement = ''
+        lastLastC = lastC
+        lastC = c
+
+    setErrorRef(inStartedRef)
+    if inQuote:
+        error("Unterminated quoted string", None)
+    if inComment:
+        error("Unterminated inline comment", None)
+    if inHex:
+        error("Unterminated hexadecimal number", None)
+    if inBase:
+        error("Unterminated base %s number" % baseRadix, None)
+    if inConditional:
+        error("Unterminated conditional directive", None)
+
+    return pseudoStatements, psRefs, psLibraryCutoff
+
+# Compares the time taken by the character-by-character scan vs the
+# table-driven scan of the same source code, and checks that the two produce
+# identical results.  Used by the --benchmark-scan command-line option.
+def benchmarkScanner(source, lineStarts, sourceLibraryCutoff, repetitions = 3):
+    print("Scanning %d characters in %d lines of source code, best of %d:" % \
+          (len(source), len(lineStarts), repetitions))
+    results = {}
+    times = {}
+    for fast in [False, True]:
+        best = None
+        for n in range(repetitions):
+            start = time.perf_counter()
+            results[fast] = scanSource(source, lineStarts, sourceLibraryCutoff,
+                                       fast)
+            elapsed = time.perf_counter() - start
+            if best == None or elapsed < best:
+                best = elapsed
+        times[fast] = best
+    print("\tCharacter-by-character:  %.3f seconds" % times[False])
+    print("\tTable-driven:            %.3f seconds" % times[True])
+    if times[True] > 0:
+        print("\tSpeedup:                 %.1fx" % (times[False] / times[True]))
+    print("\tPseudo-statements:       %d" % len(results[True][0]))
+    if results[False] == results[True]:
+        print("Results are identical.")
+        return 0
+    print("Results differ!")
+    return 1
@@ -28,6 +28,7 @@
 #		Flight Program 6 (Apollo 11) or Flight Program 8 (Apollo 15-17). 
 # Reference:	http://www.ibiblio.org/apollo/developer.html
 # Mod history:	2017-12-04 RSB	Began.
+#		2026-10-17 RSB	Now uses virtualWire.py for the socket handling.
 #
 # This program is intended to be run using the runPiDEDA.sh script, so look
 # at that script for details as to how to start up the program. 
@@ -88,8 +89,7 @@
 #
 # and then use the Interfacing / SPI option to enable the hardware SPI device.
 
-import time
-import socket
+from virtualWire import VirtualWire
 import argparse
 from pynput import keyboard
 import sys
@@ -330,118 +330,35 @@ def outputFromAGS(channel, value):
 # Generic initialization (TCP socket setup).  Has no target-specific code, and 
 # shouldn't need to be modified unless there are bugs.
 
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.setblocking(0)
+wire = VirtualWire("ags", TCP_IP, TCP_PORT)
 
 def connectToAGS():
-	while True:
-		try:
-			s.connect((TCP_IP, TCP_PORT))
-			print("Connected to yaAGS (" + TCP_IP + ":" + str(TCP_PORT) + ")")
-			break
-		except socket.error as msg:
-			print("Could not connect to yaAGS (" + TCP_IP + ":" + str(TCP_PORT) + "), exiting: " + str(msg))
-			time.sleep(1)
+	wire.connect(None)
+	print("Connected to yaAGS (" + TCP_IP + ":" + str(TCP_PORT) + ")")
 
 connectToAGS()
 
 ###################################################################################
-# Event loop.  Just check periodically for output from yaAGS (in which case the
-# user-defined callback function outputFromAGS is executed) or data in the 
-# user-defined function inputsForAGS (in which case a message is sent to yaAGS).
-# But this section has no target-specific code, and shouldn't need to be modified
-# unless there are bugs.
+# Event loop.  Output from yaAGS is processed as soon as it arrives (by the 
+# user-defined callback function outputFromAGS), and the user-defined function 
+# inputsForAGS is checked periodically for data to be sent to yaAGS.  (See 
+# virtualWire.py.)  But this section has no target-specific code, and shouldn't
+# need to be modified unless there are bugs.
 
 # Given a 2-tuple (channel,value) for yaAGS, creates packet data and sends it to yaAGS.
 def packetize(tuple):
 	print("Sending " + oct(tuple[0]) + " " + oct(tuple[1]))
-	outputBuffer = bytearray(4)
-	outputBuffer[0] = 0x00 | (tuple[0] & 0x3F)
-	outputBuffer[1] = 0xC0 | ((tuple[0] >> 12) & 0x3F)
-	outputBuffer[2] = 0x80 | ((tuple[1] >> 6) & 0x3F)
-	outputBuffer[3] = 0x40 | (tuple[1] & 0x3F)
-	s.send(outputBuffer)
+	wire.send(tuple)
+
+def pollInputs():
+	# Has the user requested termination via hitting CLR a bunch of times?
+	if resetCount >= 5:
+		os._exit(0)
+	return inputsForAGS()
 
 def eventLoop():
-	# Buffer for a packet received from yaAGS.
-	packetSize = 4
-	inputBuffer = bytearray(packetSize)
-	leftToRead = packetSize
-	view = memoryview(inputBuffer)
-	didSomething = False
-	while True:
-		if not didSomething:
-			time.sleep(PULSE)
-		didSomething = False
-		
-		# Check for packet data received from yaAGS and process it.
-		# While these packets are always exactly 4
-		# bytes long, since the socket is non-blocking, any individual read
-		# operation may yield less bytes than that, so the buffer may accumulate data
-		# over time until it fills.	
-		try:
-			numNewBytes = s.recv_into(view, leftToRead)
-		except:
-			numNewBytes = 0
-		if numNewBytes > 0:
-			view = view[numNewBytes:]
-			leftToRead -= numNewBytes
-			# print("Left to read: " + str(leftToRead))
-			if leftToRead == 0:
-				# Prepare for next read attempt.
-				view = memoryview(inputBuffer)
-				leftToRead = packetSize
-				# Parse the packet just read, and call outputFromAGS().
-				# Start with a sanity check.
-				ok = 1
-				if (inputBuffer[0] & 0xC0) != 0x00:
-					ok = 0
-				elif (inputBuffer[1] & 0xC0) != 0xC0:
-					ok = 0
-				elif (inputBuffer[2] & 0xC0) != 0x80:
-					ok = 0
-				elif (inputBuffer[3] & 0xC0) != 0x40:
-					ok = 0
-				# Packet has the various signatures we expect.
-				if ok == 0:
-					# Note that, depending on the yaAGS version, it occasionally
-					# sends either a 1-byte packet (just 0xFF, older versions)
-					# or a 4-byte packet (0xFF 0xFF 0xFF 0xFF, newer versions)
-					# just for pinging the client.  These packets hold no
-					# data and need to be ignored, but for other corrupted packets
-					# we print a message. And try to realign past the corrupted
-					# bytes.
-					if inputBuffer[0] != 0xff or inputBuffer[1] != 0xff or inputBuffer[2] != 0xff or inputBuffer[2] != 0xff:
-						if inputBuffer[0] != 0xff:
-							print("Illegal packet: " + hex(inputBuffer[0]) + " " + hex(inputBuffer[1]) + " " + hex(inputBuffer[2]) + " " + hex(inputBuffer[3]))
-						for i in range(1,packetSize):
-							if (inputBuffer[i] & 0xC0) == 0:
-								j = 0
-								for k in range(i,4):
-									inputBuffer[j] = inputBuffer[k]
-									j += 1
-								view = view[j:]
-								leftToRead = packetSize - j
-				else:
-					channel = (inputBuffer[0] & 0x3F)
-					value = (inputBuffer[1] & 0x3F) << 12
-					value |= (inputBuffer[2] & 0x3F) << 6
-					value |= (inputBuffer[3] & 0x3F)
-					outputFromAGS(channel, value)
-				didSomething = True
-		
-		# Check for locally-generated data for which we must generate messages
-		# to yaAGS over the socket.  In theory, the externalData list could contain
-		# any number of channel operations, but in practice (at least for something
-		# like a DEDA implementation) it will actually contain only 0 or 1 operations.
-		externalData = inputsForAGS()
-		for i in range(0, len(externalData)):
-			packetize(externalData[i])
-			didSomething = True
-		
-		# Has the user requested termination via hitting CLR a bunch of times?
-		if resetCount >= 5:
-			os._exit(0)
+	wire.subscribe(outputFromAGS)
+	wire.run(pollInputs, PULSE, None)
 
 eventLoopThread = threading.Thread(target=eventLoop)
 eventLoopThread.start()
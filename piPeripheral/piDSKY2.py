@@ -134,6 +134,14 @@
 #		2018-01-06 MAS	Switched the TEMP light to use channel 163 instead
 #				of channel 11.
 #		2018-03-10 RSB	Added --gunmetal option.
+#		2026-10-17 RSB	Now uses virtualWire.py for the socket handling.
+#		2026-10-17 RSB	The display is now a single Canvas whose images
+#				are swapped once per frame, rather than Label
+#				widgets created anew for every change.  Added
+#				--frametime.
+#		2026-10-17 RSB	led-panel is now fed by a single resident
+#				helper, rather than by a new sudo for every
+#				change to the lamps.
 #
 # About the design of this program ... yes, a real Python developer would 
 # objectify it and have lots and lots of individual modules defining the objects.
@@ -201,12 +209,14 @@ import signal
 import sys
 import argparse
 import threading
-from tkinter import Tk, Label, PhotoImage
+import traceback
+from tkinter import Tk, Canvas, PhotoImage, NW
 import termios
 import fcntl
 from pyscreenshot import grab
 import psutil
-import socket
+import subprocess
+from virtualWire import VirtualWire
 
 homeDir = os.path.expanduser("~")
 #print("Home = " + homeDir)
@@ -224,6 +234,7 @@ cli.add_argument("--lamptest", help="Perform a lamp test and then exit.")
 cli.add_argument("--manual", help="Manually control the display.")
 cli.add_argument("--gunmetal", help="Use gunmetal versions of mounting posts and horizontal separator.")
 cli.add_argument("--backlights", help="Turn on key backlights at startup.")
+cli.add_argument("--frametime", help="Print display-repaint statistics every FRAMETIME seconds.", type=float)
 args = cli.parse_args()
 
 if args.backlights:
@@ -383,21 +394,73 @@ else:
 	imageSeparatorOn = PhotoImage(file="piDSKY2-images/SeparatorOn-gunmetal.gif")
 	imageSeparatorOff = PhotoImage(file="piDSKY2-images/SeparatorOff-gunmetal.gif")
 	imageDot = PhotoImage(file="piDSKY2-images/Dot-gunmetal.gif")
-# Initial placement of all graphical objects on LCD panel.
+# All of the graphical objects on the LCD panel are image items on a single
+# Canvas, created the first time something is displayed at their positions, 
+# and thereafter merely switched from one image to another.  (Formerly, each
+# change destroyed a Label widget and created a new one.)  displayGraphic() 
+# merely records what's supposed to be displayed, and the Canvas is updated
+# just once per frame, so that however many changes are made to a position
+# in a frame, only the last of them is drawn.  Since displayGraphic() is 
+# called from the event-loop thread, this also keeps tkinter calls in the
+# main thread.
+canvas = Canvas(root, width=272, height=480, background='black', 
+		borderwidth=0, highlightthickness=0)
+canvas.place(x=0, y=0)
+frameInterval = round(1000 * PULSE)
+canvasItems = {}
+# widgetStates (what's on the Canvas) and pendingGraphics (what's still to
+# be drawn) are shared between the two threads, and are always accessed with
+# displayLock held.
 widgetStates = {}
-widgetLabels = {}
+pendingGraphics = {}
+displayLock = threading.Lock()
+displayStats = { "frames": 0, "changes": 0, "coalesced": 0, "drawn": 0,
+		"frameTime": 0.0, "maxFrameTime": 0.0 }
 def displayGraphic(x, y, img):
-	global widgetStates, widgetLabels
-	key = str(x) + "," + str(y)
-	if key in widgetStates:
-		if widgetStates[key] is img:
-			#print("skipping " + key)
+	key = (x, y)
+	with displayLock:
+		if key in pendingGraphics:
+			displayStats["coalesced"] += 1
+		elif key in widgetStates and widgetStates[key] is img:
 			return
-	widgetStates[key] = img
-	if key in widgetLabels:
-		widgetLabels[key].destroy()
-	widgetLabels[key] = Label(root, image=img, borderwidth=0, highlightthickness=0)
-	widgetLabels[key].place(x=x, y=y)
+		displayStats["changes"] += 1
+		pendingGraphics[key] = img
+def repaintDisplay():
+	changes = []
+	with displayLock:
+		for key in pendingGraphics:
+			img = pendingGraphics[key]
+			if key in widgetStates and widgetStates[key] is img:
+				continue
+			widgetStates[key] = img
+			changes.append((key, img))
+		pendingGraphics.clear()
+	if len(changes) > 0:
+		start = time.perf_counter()
+		for key, img in changes:
+			if key in canvasItems:
+				canvas.itemconfigure(canvasItems[key], image=img)
+			else:
+				canvasItems[key] = canvas.create_image(key[0], key[1], 
+						image=img, anchor=NW)
+			displayStats["drawn"] += 1
+		frameTime = time.perf_counter() - start
+		displayStats["frames"] += 1
+		displayStats["frameTime"] += frameTime
+		if frameTime > displayStats["maxFrameTime"]:
+			displayStats["maxFrameTime"] = frameTime
+	root.after(frameInterval, repaintDisplay)
+root.after(frameInterval, repaintDisplay)
+def printDisplayStats():
+	frames = max(displayStats["frames"], 1)
+	print("Display: %d changes, %d coalesced, %d drawn in %d frames, %.3f ms/frame average, %.3f ms maximum" % \
+		(displayStats["changes"], displayStats["coalesced"], 
+		displayStats["drawn"], displayStats["frames"], 
+		1000 * displayStats["frameTime"] / frames, 
+		1000 * displayStats["maxFrameTime"]))
+	root.after(int(1000 * args.frametime), printDisplayStats)
+if args.frametime:
+	root.after(int(1000 * args.frametime), printDisplayStats)
 topDot = 15
 dotSpacing = 92
 topProg = 36
@@ -503,19 +566,7 @@ if args.pigpio:
 def packetize(tuple):
 	if args.playback:
 		return
-	outputBuffer = bytearray(4)
-	# First, create and output the mask command.
-	outputBuffer[0] = 0x20 | ((tuple[0] >> 3) & 0x0F)
-	outputBuffer[1] = 0x40 | ((tuple[0] << 3) & 0x38) | ((tuple[2] >> 12) & 0x07)
-	outputBuffer[2] = 0x80 | ((tuple[2] >> 6) & 0x3F)
-	outputBuffer[3] = 0xC0 | (tuple[2] & 0x3F)
-	s.send(outputBuffer)
-	# Now, the actual data for the channel.
-	outputBuffer[0] = 0x00 | ((tuple[0] >> 3) & 0x0F)
-	outputBuffer[1] = 0x40 | ((tuple[0] << 3) & 0x38) | ((tuple[1] >> 12) & 0x07)
-	outputBuffer[2] = 0x80 | ((tuple[1] >> 6) & 0x3F)
-	outputBuffer[3] = 0xC0 | (tuple[1] & 0x3F)
-	s.send(outputBuffer)
+	wire.send(tuple)
 	if args.record:
 		global lastRecordedTime, recordingFile, lastInputChannels
 		currentTime = time.time()
@@ -637,6 +688,8 @@ echoOn(False)
 def screenshot(name):
 	global args
 	print("Creating screenshot ...")
+	# Let the display catch up with any pending changes first.
+	time.sleep(2 * PULSE)
 	img = grab(bbox=(0, 0, 272, 480))
 	img.save(name)
 	print("Screenshot saved as " + name);
@@ -860,25 +913,25 @@ lampStatuses = {
 	"ALT" : { "isLit" : False, "cliParameter" : "C", "spiParameters" : [ { "register":6, "mask":0x07 } ] },
 	"NO DAP" : { "isLit" : False, "cliParameter" : "F", "spiParameters" : [ { "register":7, "mask":0x70 } ] },
 	"VEL" : { "isLit" : False, "cliParameter" : "E", "spiParameters" : [ { "register":7, "mask":0x07 } ] },
-	"VERB KEY" : { "isLit" : !useBacklights, "cliParameter" : "G", "spiParameters" : [ { "register":1, "mask":0x08 } ] },
-	"NOUN KEY" : { "isLit" : !useBacklights, "cliParameter" : "H", "spiParameters" : [ { "register":1, "mask":0x80 } ] },
-	"+ KEY" : { "isLit" : !useBacklights, "cliParameter" : "I", "spiParameters" : [ { "register":2, "mask":0x08 } ] },
-	"- KEY" : { "isLit" : !useBacklights, "cliParameter" : "J", "spiParameters" : [ { "register":2, "mask":0x80 } ] },
-	"0 KEY" : { "isLit" : !useBacklights, "cliParameter" : "K", "spiParameters" : [ { "register":3, "mask":0x08 } ] },
-	"7 KEY" : { "isLit" : !useBacklights, "cliParameter" : "L", "spiParameters" : [ { "register":3, "mask":0x80 } ] },
-	"4 KEY" : { "isLit" : !useBacklights, "cliParameter" : "M", "spiParameters" : [ { "register":4, "mask":0x08 } ] },
-	"1 KEY" : { "isLit" : !useBacklights, "cliParameter" : "N", "spiParameters" : [ { "register":4, "mask":0x80 } ] },
-	"8 KEY" : { "isLit" : !useBacklights, "cliParameter" : "O", "spiParameters" : [ { "register":5, "mask":0x08 } ] },
-	"5 KEY" : { "isLit" : !useBacklights, "cliParameter" : "P", "spiParameters" : [ { "register":5, "mask":0x80 } ] },
-	"2 KEY" : { "isLit" : !useBacklights, "cliParameter" : "Q", "spiParameters" : [ { "register":6, "mask":0x08 } ] },
-	"9 KEY" : { "isLit" : !useBacklights, "cliParameter" : "R", "spiParameters" : [ { "register":6, "mask":0x80 } ] },
-	"6 KEY" : { "isLit" : !useBacklights, "cliParameter" : "S", "spiParameters" : [ { "register":7, "mask":0x08 } ] },
-	"3 KEY" : { "isLit" : !useBacklights, "cliParameter" : "T", "spiParameters" : [ { "register":7, "mask":0x80 } ] },
-	"CLR KEY" : { "isLit" : !useBacklights, "cliParameter" : "U", "spiParameters" : [ { "register":8, "mask":0x40 } ] },
-	"PRO KEY" : { "isLit" : !useBacklights, "cliParameter" : "V", "spiParameters" : [ { "register":8, "mask":0x20 } ] },
-	"KEY REL KEY" : { "isLit" : !useBacklights, "cliParameter" : "W", "spiParameters" : [ { "register":8, "mask":0x10 } ] },
-	"ENTR KEY" : { "isLit" : !useBacklights, "cliParameter" : "X", "spiParameters" : [ { "register":8, "mask":0x08 } ] },
-	"RSET KEY" : { "isLit" : !useBacklights, "cliParameter" : "Y", "spiParameters" : [ { "register":8, "mask":0x04 } ] },
+	"VERB KEY" : { "isLit" : not useBacklights, "cliParameter" : "G", "spiParameters" : [ { "register":1, "mask":0x08 } ] },
+	"NOUN KEY" : { "isLit" : not useBacklights, "cliParameter" : "H", "spiParameters" : [ { "register":1, "mask":0x80 } ] },
+	"+ KEY" : { "isLit" : not useBacklights, "cliParameter" : "I", "spiParameters" : [ { "register":2, "mask":0x08 } ] },
+	"- KEY" : { "isLit" : not useBacklights, "cliParameter" : "J", "spiParameters" : [ { "register":2, "mask":0x80 } ] },
+	"0 KEY" : { "isLit" : not useBacklights, "cliParameter" : "K", "spiParameters" : [ { "register":3, "mask":0x08 } ] },
+	"7 KEY" : { "isLit" : not useBacklights, "cliParameter" : "L", "spiParameters" : [ { "register":3, "mask":0x80 } ] },
+	"4 KEY" : { "isLit" : not useBacklights, "cliParameter" : "M", "spiParameters" : [ { "register":4, "mask":0x08 } ] },
+	"1 KEY" : { "isLit" : not useBacklights, "cliParameter" : "N", "spiParameters" : [ { "register":4, "mask":0x80 } ] },
+	"8 KEY" : { "isLit" : not useBacklights, "cliParameter" : "O", "spiParameters" : [ { "register":5, "mask":0x08 } ] },
+	"5 KEY" : { "isLit" : not useBacklights, "cliParameter" : "P", "spiParameters" : [ { "register":5, "mask":0x80 } ] },
+	"2 KEY" : { "isLit" : not useBacklights, "cliParameter" : "Q", "spiParameters" : [ { "register":6, "mask":0x08 } ] },
+	"9 KEY" : { "isLit" : not useBacklights, "cliParameter" : "R", "spiParameters" : [ { "register":6, "mask":0x80 } ] },
+	"6 KEY" : { "isLit" : not useBacklights, "cliParameter" : "S", "spiParameters" : [ { "register":7, "mask":0x08 } ] },
+	"3 KEY" : { "isLit" : not useBacklights, "cliParameter" : "T", "spiParameters" : [ { "register":7, "mask":0x80 } ] },
+	"CLR KEY" : { "isLit" : not useBacklights, "cliParameter" : "U", "spiParameters" : [ { "register":8, "mask":0x40 } ] },
+	"PRO KEY" : { "isLit" : not useBacklights, "cliParameter" : "V", "spiParameters" : [ { "register":8, "mask":0x20 } ] },
+	"KEY REL KEY" : { "isLit" : not useBacklights, "cliParameter" : "W", "spiParameters" : [ { "register":8, "mask":0x10 } ] },
+	"ENTR KEY" : { "isLit" : not useBacklights, "cliParameter" : "X", "spiParameters" : [ { "register":8, "mask":0x08 } ] },
+	"RSET KEY" : { "isLit" : not useBacklights, "cliParameter" : "Y", "spiParameters" : [ { "register":8, "mask":0x04 } ] },
 	"VNCSERVERUI" : { "isLit" : False, "cliParameter" : "Z", "spiParameters" : [ { "register":8, "mask":0x02 } ] },
 	"TBD1" : { "isLit" : False, "cliParameter" : "a", "spiParameters" : [ { "register":8, "mask":0x01 } ] },
 	"TBD2" : { "isLit" : False, "cliParameter" : "b", "spiParameters" : [ { "register":8, "mask":0x80 } ] }
@@ -890,79 +943,92 @@ def updateLampStatuses(key, value):
 	global lampStatuses
 	if key in lampStatuses:
 		lampStatuses[key]["isLit"] = value
+# Without --pigpio, the lamps are controlled by the external program 
+# 'led-panel', whose command line is the full set of lamps that are lit.  
+# Rather than shelling out to "sudo ./led-panel ..." for every change, a 
+# single resident (sudo) shell is started the first time it's needed, and 
+# fed one led-panel command line per change over a pipe.  Since it runs 
+# led-panel for them one after the other, they can't overlap.
+ledPanelProcess = None
 def flushLampUpdates(lampCliString):
-	global lastLampCliString
+	global lastLampCliString, ledPanelProcess
 	lastLampCliString = lampCliString
-	os.system("sudo ./led-panel '" + lampCliString + "' &")
-lampExecCheckCount = 0
-lampUpdateTimer = threading.Timer(lampDeadtime, flushLampUpdates)
-lastLedArray = [ 0, 0, 0, 0, 0, 0, 0, 0 ]
+	if ledPanelProcess == None or ledPanelProcess.poll() != None:
+		ledPanelProcess = subprocess.Popen(["sudo", "sh", "-c", 
+			'while read -r lamps; do ./led-panel "$lamps"; done'],
+			stdin=subprocess.PIPE, universal_newlines=True, bufsize=1)
+	try:
+		ledPanelProcess.stdin.write(lampCliString + "\n")
+	except (BrokenPipeError, OSError):
+		ledPanelProcess = None
+def stopLedPanel():
+	if ledPanelProcess != None:
+		try:
+			ledPanelProcess.stdin.close()
+		except (BrokenPipeError, OSError):
+			pass
+atexit.register(stopLedPanel)
+
+# Determine what all bits need to be set in the LED-driver chip's digit
+# registers.  Every lamp has its own bit, so this also tells us whether any
+# lamps have changed, whether or not --pigpio is used.
+def lampRegisters():
+	ledArray = [ 0, 0, 0, 0, 0, 0, 0, 0 ]
+	for key in lampStatuses:
+		if lampStatuses[key]["isLit"]:
+			parameters = lampStatuses[key]["spiParameters"]
+			for i in range(0, len(parameters)):
+				# Note that all the address fields should be 1..8.
+				ledArray[parameters[i]["register"] - 1] |= parameters[i]["mask"]
+	return ledArray
+
+# For led-panel, changes are sent at most once per lampDeadtime, so that
+# a lamp blinking (or several lamps changing in quick succession) can't 
+# swamp it.  lampUpdatePending is True from the time an update is scheduled
+# until flushLamps() is about to look at the lamps, so any change after
+# that point schedules a new update rather than being lost.
+lampUpdateLock = threading.Lock()
+lampUpdatePending = False
+lampFlushLock = threading.Lock()
+def flushLamps():
+	global lastLedArray, lampUpdatePending
+	with lampUpdateLock:
+		lampUpdatePending = False
+	with lampFlushLock:
+		ledArray = lampRegisters()
+		if ledArray == lastLedArray:
+			return
+		lastLedArray = ledArray
+		lampCliString = ""
+		for key in lampStatuses:
+			if lampStatuses[key]["isLit"]:
+				lampCliString += lampStatuses[key]["cliParameter"]
+		lampCliString += lampCliStringDefault
+		flushLampUpdates(lampCliString)
+lampUpdateTimer = threading.Timer(lampDeadtime, flushLamps)
+# Initially, all lamps are considered to be in an unknown state.
+lastLedArray = [ -1, -1, -1, -1, -1, -1, -1, -1 ]
 def updateLamps():
-	global lastLedArray
+	global lastLedArray, lampUpdateTimer, lampUpdatePending
 	if args.pigpio:
 		# For directly accessing LED-controller chip via
-		# SPI bus using PIGPIO library.
-		
-		# First step, determine what all bits need to be set in the chip's
-		# digit registers.
-		ledArray = [ 0, 0, 0, 0, 0, 0, 0, 0 ]
-		for key in lampStatuses:
-			if lampStatuses[key]["isLit"]:
-				parameters = lampStatuses[key]["spiParameters"]
-				for i in range(0, len(parameters)):
-					# Note that all the address fields should be 1..8.
-					ledArray[parameters[i]["register"] - 1] |= parameters[i]["mask"]
-		
-		# Write out the registers that have changed.
+		# SPI bus using PIGPIO library.  Write out the registers that 
+		# have changed.
+		ledArray = lampRegisters()
 		for i in range(0,8):
 			if ledArray[i] != lastLedArray[i]:
 				#print("write SPI " + str(1 + i) + " <- " + hex(ledArray[i]))
 				writeSpi(i + 1, ledArray[i])
 				lastLedArray[i] = ledArray[i]
-	else:
-		# For shelling out to 'led-panel' program.
-		
-		global lampUpdateTimer, lampExecCheckCount
-		global lastLampCliString
-		
-		# First step, determine what led-panel's CLI parameter string will be.
-		lampCliString = ""
-		for key in lampStatuses:
-			if lampStatuses[key]["isLit"]:
-				lampCliString += lampStatuses[key]["cliParameter"]
-		lampCliString += lampCliStringDefault
-		
-		# If unchanged, do nothing.
-		if lampCliString == lastLampCliString:
-			return
-		
-		# Have to determine if led-panel is still running from before, in
-		# which case we can't start it again and have to retry later.			
-		lampExecCheckCount += 1
-		lampUpdateTimer.cancel()
-		ledPanelRunning = False
-		for proc in psutil.process_iter():
-			try:
-				info = proc.as_dict(attrs=['name'])
-				if "led-panel" in info['name']:
-					ledPanelRunning = True
-					break
-			except psutil.NoSuchProcess:
-				pass
-		if ledPanelRunning:
-			print("Delaying lamp flush to avoid overlap ...")
-			lampExecCheckCount = 0
-			lampUpdateTimer = threading.Timer(lampDeadtime, updateLamps)
-			lampUpdateTimer.start()
+		return
+	# For 'led-panel'.  If an update is already pending, it will pick up
+	# this change as well.
+	with lampUpdateLock:
+		if lampUpdatePending:
 			return
-		if lampExecCheckCount < 2:
-				lampUpdateTimer = threading.Timer(lampDeadtime, updateLamps)
-				lampUpdateTimer.start()
-				return
-		lampExecCheckCount = 0
-		
-		# Everything is swell, so run 'led-panel'.
-		flushLampUpdates(lampCliString)
+		lampUpdatePending = True
+		lampUpdateTimer = threading.Timer(lampDeadtime, flushLamps)
+		lampUpdateTimer.start()
 def updateLampStatusesAndLamps(key, value):
 	#sys.stderr.write("BL " + key + " " + oct(value) + "\n")
 	updateLampStatuses(key, value)
@@ -1581,35 +1647,24 @@ if args.manual:
 # Generic initialization (TCP socket setup).  Has no target-specific code, and 
 # shouldn't need to be modified unless there are bugs.
 
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.setblocking(0)
+wire = VirtualWire("agc", TCP_IP, TCP_PORT)
 
 def connectToAGC():
-	count = 0
-	sys.stderr.write("Connecting to AGC " + TCP_IP + ":" + str(TCP_PORT) + "\n")
-	while True:
-		try:
-			s.connect((TCP_IP, TCP_PORT))
-			sys.stderr.write("Connected.\n")
-			break
-		except socket.error as msg:
-			sys.stderr.write(str(msg) + "\n")
-			count += 1
-			if count >= 10:
-				sys.stderr.write("Too many retries ...\n")
-				time.sleep(3)
-				echoOn(True)
-				os._exit(1)
-			time.sleep(1)
-			# The following provides a clean exit from the program by simply 
-			# hitting any key.  However if get_char_keyboard_nonblock isn't
-			# defined, just delete the next 4 lines and use Ctrl-C to exit instead.
-			ch = get_char_keyboard_nonblock()
-			if ch != "":
-				sys.sderr.write("Exiting ...")
-				echoOn(True)
-				shutdownGPIO()
-				os._exit(1)
+	# The following provides a clean exit from the program by simply 
+	# hitting any key while waiting to connect.  However if 
+	# get_char_keyboard_nonblock isn't defined, just get rid of
+	# checkForExit and use Ctrl-C to exit instead.
+	def checkForExit():
+		ch = get_char_keyboard_nonblock()
+		if ch != "":
+			sys.stderr.write("Exiting ...")
+			echoOn(True)
+			shutdownGPIO()
+			os._exit(1)
+	if not wire.connect(10, checkForExit):
+		time.sleep(3)
+		echoOn(True)
+		os._exit(1)
 
 if args.playback:
 	pass
@@ -1620,9 +1675,10 @@ if useBacklights:
 	backlightOn()
 
 ###################################################################################
-# Event loop.  Just check periodically for output from yaAGC (in which case the
-# user-defined callback function outputFromAGC is executed) or data in the 
-# user-defined function inputsForAGC (in which case a message is sent to yaAGC).
+# Event loop.  Output from yaAGC is processed as soon as it arrives (by the 
+# user-defined callback function outputFromAGC), and the user-defined function 
+# inputsForAGC is checked periodically for data to be sent to yaAGC.  (See 
+# virtualWire.py.)  In playback mode, the playback file is used instead of yaAGC.
 # But this section has no target-specific code, and shouldn't need to be modified
 # unless there are bugs.
 keyNames = [ 
@@ -1634,145 +1690,109 @@ keyNames = [
 	"KEY REL KEY", "+ KEY", "- KEY", "ENTR KEY", "none",
 	"CLR KEY", "NOUN KEY"
 ]
-def eventLoop():
+
+# Check for locally-generated data for which we must generate messages
+# to yaAGC over the socket.  In theory, the externalData list could contain
+# any number of channel operations, but in practice (at least for something
+# like a DSKY implementation) it will actually contain only 0 or 1 operations.
+# Returns False if the program is to terminate.
+def pollInputs():
 	global debugKey
-	# Buffer for a packet received from yaAGC.
-	packetSize = 4
-	inputBuffer = bytearray(packetSize)
-	leftToRead = packetSize
-	view = memoryview(inputBuffer)
-	cannedRsetCount = 0
+	externalData = inputsForAGC()
+	if externalData == "":
+		echoOn(True)
+		timersStop()
+		screenshot(homeDir + "/lastscrn.png")
+		root.destroy()
+		shutdownGPIO()
+		os.system("xset r on &")
+		return False
+	for i in range(0, len(externalData)):
+		packetize(externalData[i])
+	if debugKey != "":
+		print("GUI key = " + debugKey)
+		debugKey = ""
+	return True
+
+# pollInputs() for use by wire.run().
+def inputsForWire():
+	if not pollInputs():
+		wire.stop()
+	return []
+
+def eventLoop():
+	if not args.playback:
+		wire.subscribe(outputFromAGC)
+		# Like the old socket loop, keep trying to reconnect to yaAGC for as
+		# long as the GUI is up.  But if the loop dies some other way, don't
+		# leave the GUI running with nothing behind it.
+		try:
+			wire.run(inputsForWire, PULSE, None)
+		except Exception:
+			traceback.print_exc()
+			sys.stderr.write("Event loop failed, exiting ...\n")
+			echoOn(True)
+			timersStop()
+			shutdownGPIO()
+			os._exit(1)
+		return
 	
+	global currentPlaybackIndex, playbackEvents, lastPlaybackTime
+	cannedRsetCount = 0
 	didSomething = False
 	while True:
 		if not didSomething:
 			time.sleep(PULSE)
 		didSomething = False
 		
-		# Check for packet data received from yaAGC and process it.
-		# While these packets are always exactly 4
-		# bytes long, since the socket is non-blocking, any individual read
-		# operation may yield less bytes than that, so the buffer may accumulate data
-		# over time until it fills.
-		if args.playback:
-			global currentPlaybackIndex, playbackEvents, lastPlaybackTime
-			# Get data from playback file.
-			if currentPlaybackIndex < len(playbackEvents):
-				#print(currentPlaybackIndex)
-				timeNow = time.time()
-				desiredTime = lastPlaybackTime + playbackEvents[currentPlaybackIndex][1] / 1000.0
-				if timeNow >= desiredTime:
-					lastPlaybackTime = desiredTime
-					#print(playbackEvents[currentPlaybackIndex])
-					if playbackEvents[currentPlaybackIndex][0]:
-						# Channels 015 and 032 are AGC INPUT channels (hence
-						# are outputs from the DSKY rather than inputs to it).
-						# They indicate keypresses.  We won't do anything with
-						# them other than possibly to flash backlights on the
-						# associated keys.
-						channel = playbackEvents[currentPlaybackIndex][2]
-						value = playbackEvents[currentPlaybackIndex][3]
-						if channel == 0o15:
-							#print("Playback keystroke event " + oct(channel) + " " + oct(value))
-							name = keyNames[value & 0o37]
-							if name == "RSET KEY":
-								cannedRsetCount += 1
-								if cannedRsetCount >= 5:
-									echoOn(True)
-									timersStop()
-									root.destroy()
-									shutdownGPIO()
-									os.system("xset r on &")
-									return	
-							else:
-								cannedRsetCount == 0
-							updateLampStatusesAndLamps(name, False)
-							t = threading.Timer(0.32, updateLampStatusesAndLamps, (name, True))
-							t.start()
-						elif channel == 0o32:
-							if (value & 0o20000) != 0:
-								updateLampStatusesAndLamps("PRO KEY", True)
-							else:
-								updateLampStatusesAndLamps("PRO KEY", False)
+		# Get data from playback file.
+		if currentPlaybackIndex < len(playbackEvents):
+			#print(currentPlaybackIndex)
+			timeNow = time.time()
+			desiredTime = lastPlaybackTime + playbackEvents[currentPlaybackIndex][1] / 1000.0
+			if timeNow >= desiredTime:
+				lastPlaybackTime = desiredTime
+				#print(playbackEvents[currentPlaybackIndex])
+				if playbackEvents[currentPlaybackIndex][0]:
+					# Channels 015 and 032 are AGC INPUT channels (hence
+					# are outputs from the DSKY rather than inputs to it).
+					# They indicate keypresses.  We won't do anything with
+					# them other than possibly to flash backlights on the
+					# associated keys.
+					channel = playbackEvents[currentPlaybackIndex][2]
+					value = playbackEvents[currentPlaybackIndex][3]
+					if channel == 0o15:
+						#print("Playback keystroke event " + oct(channel) + " " + oct(value))
+						name = keyNames[value & 0o37]
+						if name == "RSET KEY":
+							cannedRsetCount += 1
+							if cannedRsetCount >= 5:
+								echoOn(True)
+								timersStop()
+								root.destroy()
+								shutdownGPIO()
+								os.system("xset r on &")
+								return	
 						else:
-							outputFromAGC(channel, value)
-					else:
-						sys.stderr.write("Command = \"" + playbackEvents[currentPlaybackIndex][2] + "\"\n")
-						os.system(playbackEvents[currentPlaybackIndex][2] + ' &')
-					currentPlaybackIndex += 1
-					didSomething = True
-		else:
-			# Get input from socket to AGC.
-			try:
-				numNewBytes = s.recv_into(view, leftToRead)
-			except:
-				numNewBytes = 0
-			if numNewBytes > 0:
-				view = view[numNewBytes:]
-				leftToRead -= numNewBytes
-				if leftToRead == 0:
-					# Prepare for next read attempt.
-					view = memoryview(inputBuffer)
-					leftToRead = packetSize
-					# Parse the packet just read, and call outputFromAGC().
-					# Start with a sanity check.
-					ok = 1
-					if (inputBuffer[0] & 0xF0) != 0x00:
-						ok = 0
-					elif (inputBuffer[1] & 0xC0) != 0x40:
-						ok = 0
-					elif (inputBuffer[2] & 0xC0) != 0x80:
-						ok = 0
-					elif (inputBuffer[3] & 0xC0) != 0xC0:
-						ok = 0
-					# Packet has the various signatures we expect.
-					if ok == 0:
-						# Note that, depending on the yaAGC version, it occasionally
-						# sends either a 1-byte packet (just 0xFF, older versions)
-						# or a 4-byte packet (0xFF 0xFF 0xFF 0xFF, newer versions)
-						# just for pinging the client.  These packets hold no
-						# data and need to be ignored, but for other corrupted packets
-						# we print a message. And try to realign past the corrupted
-						# bytes.
-						if inputBuffer[0] != 0xff or inputBuffer[1] != 0xff or inputBuffer[2] != 0xff or inputBuffer[2] != 0xff:
-							if inputBuffer[0] != 0xff:
-								print("Illegal packet: " + hex(inputBuffer[0]) + " " + hex(inputBuffer[1]) + " " + hex(inputBuffer[2]) + " " + hex(inputBuffer[3]))
-							for i in range(1,packetSize):
-								if (inputBuffer[i] & 0xF0) == 0:
-									j = 0
-									for k in range(i,4):
-										inputBuffer[j] = inputBuffer[k]
-										j += 1
-									view = view[j:]
-									leftToRead = packetSize - j
+							cannedRsetCount == 0
+						updateLampStatusesAndLamps(name, False)
+						t = threading.Timer(0.32, updateLampStatusesAndLamps, (name, True))
+						t.start()
+					elif channel == 0o32:
+						if (value & 0o20000) != 0:
+							updateLampStatusesAndLamps("PRO KEY", True)
+						else:
+							updateLampStatusesAndLamps("PRO KEY", False)
 					else:
-						channel = (inputBuffer[0] & 0x0F) << 3
-						channel |= (inputBuffer[1] & 0x38) >> 3
-						value = (inputBuffer[1] & 0x07) << 12
-						value |= (inputBuffer[2] & 0x3F) << 6
-						value |= (inputBuffer[3] & 0x3F)
 						outputFromAGC(channel, value)
-					didSomething = True
+				else:
+					sys.stderr.write("Command = \"" + playbackEvents[currentPlaybackIndex][2] + "\"\n")
+					os.system(playbackEvents[currentPlaybackIndex][2] + ' &')
+				currentPlaybackIndex += 1
+				didSomething = True
 		
-		# Check for locally-generated data for which we must generate messages
-		# to yaAGC over the socket.  In theory, the externalData list could contain
-		# any number of channel operations, but in practice (at least for something
-		# like a DSKY implementation) it will actually contain only 0 or 1 operations.
-		externalData = inputsForAGC()
-		if externalData == "":
-			echoOn(True)
-			timersStop()
-			screenshot(homeDir + "/lastscrn.png")
-			root.destroy()
-			shutdownGPIO()
-			os.system("xset r on &")
+		if not pollInputs():
 			return
-		for i in range(0, len(externalData)):
-			packetize(externalData[i])
-			didSomething = True
-		if debugKey != "":
-			print("GUI key = " + debugKey)
-			debugKey = ""
 
 eventLoopThread = threading.Thread(target=eventLoop)
 eventLoopThread.start()
@@ -0,0 +1,492 @@
+#!/usr/bin/python3
+# Copyright:	None, placed in the PUBLIC DOMAIN by its author (Ron Burkey)
+# Filename: 	virtualWire.py
+# Purpose:	Client side of the "virtual wire" socket protocols by which
+#		Python-language peripherals talk to the emulators:  the 4-byte
+#		packets of yaAGC and yaAGS, and the 6-byte packets of yaLVDC.
+#		Formerly, each peripheral (piPeripheral.py, piDEDA.py,
+#		piDSKY2.py, yaPTC.py, yaMccLvdc.py, analyzeBoost.py) had its
+#		own copy of all of this.
+# Reference:	http://www.ibiblio.org/apollo/developer.html
+# Mod history:	2026-10-17 RSB	Began.
+#
+# Typical usage is like so:
+#
+#	from virtualWire import VirtualWire
+#	wire = VirtualWire("agc", TCP_IP, TCP_PORT)
+#	if not wire.connect(10):
+#		sys.exit(1)
+#	wire.subscribe(outputFromAGx)
+#	wire.run(inputsForAGx, PULSE)
+#
+# where run() is asyncio based, and doesn't return until the connection to
+# the emulator is lost for good (or stop() is called).  Data from the
+# emulator is decoded in bulk, however much of it has arrived, as soon as it
+# has arrived, and each packet is passed to the callback functions subscribed
+# to its channel.  The inputs function is polled every PULSE seconds, and the
+# packets for whatever channel operations it returns are sent together.
+#
+# Programs which have some other event loop of their own, such as tkinter
+# programs, can instead call poll() periodically from that event loop.  It
+# reads everything presently available from the emulator without waiting,
+# and returns all of the packets decoded from it (as well as calling the
+# subscribers).  Outputs queued by send() are written by poll() or by flush().
+#
+# The decoded packets are tuples:
+#
+#	"agc":		(channel, value)
+#	"ags":		(channel, value)
+#	"lvdc":		(ioType, source, channel, value)
+#
+# and the tuples passed to send() for channel operations are those the
+# peripherals have always used:
+#
+#	"agc":		(channel, value, mask)
+#	"ags":		(channel, value)
+#	"lvdc":		(ioType, channel, value, mask)
+
+import sys
+import time
+import socket
+import re
+import asyncio
+import threading
+
+# Sizes of the packets for each protocol.
+packetSizes = { "agc": 4, "ags": 4, "lvdc": 6 }
+emulatorNames = { "agc": "AGC", "ags": "AGS", "lvdc": "LVDC/PTC emulator" }
+
+# Patterns matching a single legal packet for each protocol.  Each byte of a
+# packet has a signature in its most-significant bits, and data which doesn't
+# match is skipped, realigning on the next legal packet.
+packetPatterns = {
+	"agc": re.compile(b"[\x00-\x0f][\x40-\x7f][\x80-\xbf][\xc0-\xff]"),
+	"ags": re.compile(b"[\x00-\x3f][\xc0-\xff][\x80-\xbf][\x40-\x7f]"),
+	"lvdc": re.compile(b"[\x80-\xff][\x00-\x7f]{5}")
+}
+
+# The emulators occasionally send bytes that are 0xFF, intended as pings,
+# which can be ignored.  For other data we can't parse, we print a message.
+def illegalData(protocol, data):
+	for byte in data:
+		if byte != 0xFF:
+			if protocol == "lvdc":
+				print("Illegal packet: " + " ".join("%03o" % b for b in data))
+			else:
+				print("Illegal packet: " + " ".join(hex(b) for b in data))
+			break
+
+# Decode all of the complete packets in data (a bytearray), removing them
+# from it, and return a list of the decoded packets and the number of illegal
+# bytes that were skipped.  Whatever's left in data at the end may be the
+# beginning of a packet, to be completed by data received later.
+def decodePackets(protocol, data):
+	packetSize = packetSizes[protocol]
+	packets = []
+	illegal = 0
+	position = 0
+	for match in packetPatterns[protocol].finditer(data):
+		start = match.start()
+		if start > position:
+			illegalData(protocol, data[position:start])
+			illegal += start - position
+		b0, b1, b2, b3 = match.group(0)[:4]
+		if protocol == "agc":
+			channel = ((b0 & 0x0F) << 3) | ((b1 & 0x38) >> 3)
+			value = ((b1 & 0x07) << 12) | ((b2 & 0x3F) << 6) | (b3 & 0x3F)
+			packets.append((channel, value))
+		elif protocol == "ags":
+			channel = b0 & 0x3F
+			value = ((b1 & 0x3F) << 12) | ((b2 & 0x3F) << 6) | (b3 & 0x3F)
+			packets.append((channel, value))
+		else:
+			b4, b5 = match.group(0)[4:]
+			ioType = (b0 >> 3) & 7
+			source = b0 & 7
+			channel = ((b2 << 2) & 0x180) | b1
+			value = ((b2 & 0x1F) << 21) | (b3 << 14) | (b4 << 7) | b5
+			packets.append((ioType, source, channel, value))
+		position = match.end()
+	keep = max(position, len(data) - packetSize + 1)
+	if keep > position:
+		illegalData(protocol, data[position:keep])
+		illegal += keep - position
+	del data[:keep]
+	return packets, illegal
+
+# Patterns matching a single legal packet sent to the emulator by a 
+# peripheral.  For yaAGC these differ from the above, since they may be mask
+# commands, with the 0x20 bit of the first byte set.
+inputPacketPatterns = {
+	"agc": re.compile(b"[\x00-\x3f][\x40-\x7f][\x80-\xbf][\xc0-\xff]"),
+	"ags": packetPatterns["ags"],
+	"lvdc": packetPatterns["lvdc"]
+}
+
+# Like decodePackets(), except that the packets aren't decoded, and are 
+# returned simply as bytes.  If toEmulator is True, the packets are those
+# sent by a peripheral to the emulator, rather than the reverse.
+def splitPackets(protocol, data, toEmulator=False):
+	packetSize = packetSizes[protocol]
+	if toEmulator:
+		pattern = inputPacketPatterns[protocol]
+	else:
+		pattern = packetPatterns[protocol]
+	packets = []
+	illegal = 0
+	position = 0
+	for match in pattern.finditer(data):
+		start = match.start()
+		if start > position:
+			illegalData(protocol, data[position:start])
+			illegal += start - position
+		packets.append(match.group(0))
+		position = match.end()
+	keep = max(position, len(data) - packetSize + 1)
+	if keep > position:
+		illegalData(protocol, data[position:keep])
+		illegal += keep - position
+	del data[:keep]
+	return packets, illegal
+
+# The channel number of a packet (in either direction), without the rest of
+# the decoding.
+def packetChannel(protocol, packet):
+	if protocol == "agc":
+		return ((packet[0] & 0x0F) << 3) | ((packet[1] & 0x38) >> 3)
+	elif protocol == "ags":
+		return packet[0] & 0x3F
+	return ((packet[2] << 2) & 0x180) | packet[1]
+
+# Whether a packet sent to the emulator is a mask command, which applies to 
+# the data packet following it.
+def isMaskPacket(protocol, packet):
+	if protocol == "agc":
+		return (packet[0] & 0x20) != 0
+	elif protocol == "lvdc":
+		return (packet[0] & 0x40) != 0
+	return False
+
+# Given a tuple for a channel operation (see above), returns the bytes of the
+# packet(s) to be sent to the emulator for it.  For yaLVDC, source is the ID
+# of the peripheral.
+def encodePacket(protocol, tuple, source=0):
+	if protocol == "agc":
+		channel, value, mask = tuple[:3]
+		# First the mask command, and then the actual data for the channel.
+		return bytes((
+			0x20 | ((channel >> 3) & 0x0F),
+			0x40 | ((channel << 3) & 0x38) | ((mask >> 12) & 0x07),
+			0x80 | ((mask >> 6) & 0x3F),
+			0xC0 | (mask & 0x3F),
+			0x00 | ((channel >> 3) & 0x0F),
+			0x40 | ((channel << 3) & 0x38) | ((value >> 12) & 0x07),
+			0x80 | ((value >> 6) & 0x3F),
+			0xC0 | (value & 0x3F) ))
+	elif protocol == "ags":
+		channel, value = tuple[:2]
+		return bytes((
+			0x00 | (channel & 0x3F),
+			0xC0 | ((value >> 12) & 0x3F),
+			0x80 | ((value >> 6) & 0x3F),
+			0x40 | (value & 0x3F) ))
+	ioType, channel, value, mask = tuple[:4]
+	packet = b""
+	if mask != 0o377777777:
+		packet = bytes((
+			0x80 | 0x40 | ((ioType & 7) << 3) | (source & 7),
+			channel & 0x7F,
+			((channel & 0x180) >> 2) | ((mask >> 21) & 0x1F),
+			(mask >> 14) & 0x7F,
+			(mask >> 7) & 0x7F,
+			mask & 0x7F ))
+	return packet + bytes((
+			0x80 | ((ioType & 7) << 3) | (source & 7),
+			channel & 0x7F,
+			((channel & 0x180) >> 2) | ((value >> 21) & 0x1F),
+			(value >> 14) & 0x7F,
+			(value >> 7) & 0x7F,
+			value & 0x7F ))
+
+class VirtualWire:
+
+	# The protocol is "agc", "ags", or "lvdc".  The onConnect function, if
+	# any, is called with no arguments each time a connection is made.
+	def __init__(self, protocol, host, port, source=0, onConnect=None,
+			maxReadSize=65536):
+		self.protocol = protocol
+		self.host = host
+		self.port = port
+		self.source = source
+		self.onConnect = onConnect
+		self.maxReadSize = maxReadSize
+		self.socket = None
+		self.writer = None
+		self.connected = False
+		self.receivedData = bytearray()
+		# send() may be called from other threads than the one doing the 
+		# socket I/O.
+		self.outputData = bytearray()
+		self.outputLock = threading.Lock()
+		self.subscribers = {}
+		self.everything = []
+		self.running = False
+		self.loop = None
+		self.stopEvent = None
+		self.lastAttempt = 0
+		self.startTime = time.time()
+		self.lastCounts = (0, 0)
+		self.counters = { "bytesIn": 0, "bytesOut": 0, "packetsIn": 0,
+			"packetsOut": 0, "illegalBytes": 0, "connects": 0 }
+
+	# Calls callback(*packet) for every packet received on any of the given
+	# channels, or on any channel at all if channels is None.
+	def subscribe(self, callback, channels=None):
+		if channels == None:
+			self.everything.append(callback)
+			return
+		for channel in channels:
+			if channel not in self.subscribers:
+				self.subscribers[channel] = []
+			self.subscribers[channel].append(callback)
+
+	# For a connection made by runAsync(), s is None, since the socket 
+	# belongs to asyncio, and it's the writer that's used instead.
+	def newConnection(self, s):
+		if s != None:
+			s.setblocking(0)
+		self.socket = s
+		self.connected = True
+		self.counters["connects"] += 1
+		self.receivedData = bytearray()
+		# Don't send anything stale, queued while there was no connection.
+		with self.outputLock:
+			self.outputData = bytearray()
+		if self.onConnect != None:
+			self.onConnect()
+
+	# Connects to the emulator, trying once per second up to retries times
+	# (or forever if retries is None), and calling onRetry (if any) after
+	# each failed attempt.  Returns True on success, False on failure.
+	def connect(self, retries=10, onRetry=None):
+		sys.stderr.write("Connecting to %s at %s:%d\n" % \
+			(emulatorNames[self.protocol], self.host, self.port))
+		count = 0
+		while True:
+			s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			try:
+				s.connect((self.host, self.port))
+				sys.stderr.write("Connected.\n")
+				self.newConnection(s)
+				return True
+			except socket.error as msg:
+				s.close()
+				sys.stderr.write(str(msg) + "\n")
+				count += 1
+				if retries != None and count >= retries:
+					sys.stderr.write("Too many retries ...\n")
+					return False
+				time.sleep(1)
+				if onRetry != None:
+					onRetry()
+
+	def disconnect(self):
+		if self.writer != None:
+			self.writer.close()
+			self.writer = None
+		elif self.socket != None:
+			self.socket.close()
+		self.socket = None
+		if self.connected:
+			sys.stderr.write("Connection to %s at %s:%d lost.\n" % \
+				(emulatorNames[self.protocol], self.host, self.port))
+		self.connected = False
+
+	# Queues the packet(s) for a channel operation to be sent to the emulator.
+	def send(self, tuple):
+		packet = encodePacket(self.protocol, tuple, self.source)
+		with self.outputLock:
+			self.outputData += packet
+			self.counters["packetsOut"] += 1
+
+	# Sends whatever packets have been queued, all at once.
+	def flush(self):
+		if not self.connected:
+			return
+		with self.outputLock:
+			if len(self.outputData) == 0:
+				return
+			data = self.outputData
+			self.outputData = bytearray()
+		self.counters["bytesOut"] += len(data)
+		if self.writer != None:
+			self.writer.write(data)
+			return
+		try:
+			self.socket.setblocking(1)
+			self.socket.sendall(data)
+			self.socket.setblocking(0)
+		except OSError:
+			self.disconnect()
+
+	# Decodes the data received so far, and dispatches the packets to the
+	# subscribers.  Returns the list of packets.
+	def dispatch(self, data):
+		self.counters["bytesIn"] += len(data)
+		self.receivedData += data
+		packets, illegal = decodePackets(self.protocol, self.receivedData)
+		self.counters["packetsIn"] += len(packets)
+		self.counters["illegalBytes"] += illegal
+		if len(self.subscribers) > 0 or len(self.everything) > 0:
+			for packet in packets:
+				for callback in self.everything:
+					callback(*packet)
+				for callback in self.subscribers.get(packet[-2], ()):
+					callback(*packet)
+		return packets
+
+	# Reads everything presently available from the emulator, without
+	# waiting, sends everything queued for it, and returns the list of
+	# packets received.  If the connection has been lost, an attempt to
+	# reconnect is made, at most once per retryInterval seconds.
+	def poll(self, retryInterval=1.0):
+		if not self.connected:
+			now = time.time()
+			if now - self.lastAttempt < retryInterval:
+				return []
+			self.lastAttempt = now
+			s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			s.settimeout(0.1)
+			try:
+				s.connect((self.host, self.port))
+			except OSError:
+				s.close()
+				return []
+			sys.stderr.write("Reconnected.\n")
+			self.newConnection(s)
+		data = bytearray()
+		while True:
+			try:
+				chunk = self.socket.recv(self.maxReadSize)
+			except BlockingIOError:
+				break
+			except OSError:
+				self.disconnect()
+				break
+			if len(chunk) == 0:
+				self.disconnect()
+				break
+			data += chunk
+			if len(chunk) < self.maxReadSize:
+				break
+		self.flush()
+		if len(data) == 0:
+			return []
+		return self.dispatch(data)
+
+	# Packets per second since the last call (or since the VirtualWire was
+	# created), as (packetsIn, packetsOut).  The counters themselves are 
+	# totals, and aren't reset.
+	def throughput(self):
+		now = time.time()
+		elapsed = max(now - self.startTime, 1e-6)
+		packetsIn = self.counters["packetsIn"]
+		packetsOut = self.counters["packetsOut"]
+		rates = ((packetsIn - self.lastCounts[0]) / elapsed,
+			(packetsOut - self.lastCounts[1]) / elapsed)
+		self.startTime = now
+		self.lastCounts = (packetsIn, packetsOut)
+		return rates
+
+	# Makes run() return.  Can be called from any thread.
+	def stop(self):
+		self.running = False
+		if self.loop != None:
+			self.loop.call_soon_threadsafe(self.stopEvent.set)
+
+	# The asyncio event loop, as described at the top of the file.  The
+	# connection must already have been made by connect().  If it's lost,
+	# reconnection is attempted once per second, up to retries times (or
+	# forever if retries is None), before giving up.
+	def run(self, inputs=None, pulse=0.05, retries=10):
+		self.running = True
+		asyncio.run(self.runAsync(inputs, pulse, retries))
+		self.loop = None
+
+	async def receiver(self, reader):
+		while True:
+			data = await reader.read(self.maxReadSize)
+			if len(data) == 0:
+				return
+			self.dispatch(data)
+			self.flush()
+
+	async def poller(self, inputs, pulse):
+		while True:
+			if inputs != None:
+				for tuple in inputs():
+					self.send(tuple)
+			self.flush()
+			await asyncio.sleep(pulse)
+
+	async def runAsync(self, inputs, pulse, retries):
+		self.loop = asyncio.get_running_loop()
+		self.stopEvent = asyncio.Event()
+		if not self.running:
+			return
+		stopTask = asyncio.create_task(self.stopEvent.wait())
+		pollerTask = asyncio.create_task(self.poller(inputs, pulse))
+		failure = None
+		reader = None
+		while self.running:
+			if self.connected:
+				if reader == None:
+					reader, self.writer = \
+						await asyncio.open_connection(sock=self.socket)
+				receiverTask = asyncio.create_task(self.receiver(reader))
+				await asyncio.wait((receiverTask, stopTask, pollerTask), 
+					return_when=asyncio.FIRST_COMPLETED)
+				receiverTask.cancel()
+				if pollerTask.done():
+					# An exception in inputs().
+					self.running = False
+				if receiverTask.done() and not receiverTask.cancelled():
+					error = receiverTask.exception()
+					if error != None and not isinstance(error, 
+							(OSError, asyncio.IncompleteReadError)):
+						# An exception in a subscriber, rather than a
+						# lost connection.
+						failure = error
+						self.running = False
+				if not self.running:
+					break
+				reader = None
+				self.disconnect()
+			count = 0
+			while self.running and not self.connected:
+				count += 1
+				if retries != None and count > retries:
+					sys.stderr.write("Too many retries ...\n")
+					self.running = False
+					break
+				await asyncio.wait((stopTask,), timeout=1)
+				if not self.running:
+					break
+				# Not poll(), whose blocking connect() would stall the 
+				# poller meanwhile.
+				try:
+					reader, self.writer = await asyncio.wait_for(
+						asyncio.open_connection(self.host, self.port), 1)
+				except (OSError, asyncio.TimeoutError):
+					continue
+				sys.stderr.write("Reconnected.\n")
+				self.newConnection(None)
+		pollerTask.cancel()
+		stopTask.cancel()
+		if self.writer != None:
+			await self.writer.drain()
+		if pollerTask.done() and not pollerTask.cancelled() \
+				and pollerTask.exception() != None:
+			raise pollerTask.exception()
+		if failure != None:
+			raise failure
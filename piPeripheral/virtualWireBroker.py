@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+# Copyright:	None, placed in the PUBLIC DOMAIN by its author (Ron Burkey)
+# Filename: 	virtualWireBroker.py
+# Purpose:	Lets any number of peripherals share a single socket connection
+#		to yaAGC, yaAGS, or yaLVDC.  Otherwise, each peripheral has its own
+#		connection, and the emulator has to format and send every one of
+#		its outputs separately to each of them.
+# Reference:	http://www.ibiblio.org/apollo/developer.html
+# Mod history:	2026-10-17 RSB	Began.
+#
+# The broker connects to the emulator just as a peripheral would, and then
+# listens on one or more ports of its own, to which the peripherals connect
+# instead of to the emulator.  Everything the emulator sends is passed along
+# to every peripheral connected to the broker, except for channels which have
+# been filtered out for the port the peripheral is connected to.  Everything
+# the peripherals send is merged and passed along to the emulator, always
+# in whole packets (and mask commands together with the data they apply to),
+# so that inputs from different peripherals can't be garbled together.
+#
+# Each --listen=PORT[:ID[:CHANNELS]] specifies a port to listen on.  For
+# yaLVDC, ID (if not empty) is the source ID which replaces that in all
+# packets sent by peripherals connected to this port.  CHANNELS (if present)
+# is a comma-separated list of the (octal) channel numbers or ranges of
+# channel numbers which are passed along to the peripherals connected to the
+# port, such as "5,114-117".  For example, to run a PTC panel, a MCC panel,
+# and a telemetry logger together against one yaLVDC,
+#
+#	yaLVDC ...
+#	virtualWireBroker.py --lvdc --listen=19654:1 --listen=19655:2 \
+#		--listen=19656::0-177
+#	yaPTC.py --port=19654 ...
+#	yaMccLvdc.py --port=19655 ...
+#	analyzeBoost.py --telemetry --port=19656 ...
+#
+# Peripherals which are too slow to keep up (i.e., for which more than
+# --backlog bytes have accumulated unsent) are disconnected, rather than
+# letting them hold up everyone else.  If the connection to the emulator is
+# lost, the broker keeps trying to reconnect, without disconnecting the
+# peripherals.
+
+import argparse
+import asyncio
+import sys
+import time
+from virtualWire import splitPackets, packetChannel, isMaskPacket, \
+			emulatorNames
+
+cli = argparse.ArgumentParser()
+cli.add_argument("--host", help="Host address of the emulator, defaulting to localhost.")
+cli.add_argument("--port", help="Port of the emulator, defaulting to 19697 for yaAGC, 19897 for yaAGS, or 19653 for yaLVDC.", type=int)
+cli.add_argument("--ags", help="For use with yaAGS (defaults to yaAGC).", action="store_true")
+cli.add_argument("--lvdc", help="For use with yaLVDC (defaults to yaAGC).", action="store_true")
+cli.add_argument("--listen", help="PORT[:ID[:CHANNELS]] on which peripherals can connect.  Can be used more than once.", action="append", required=True)
+cli.add_argument("--backlog", help="Maximum bytes buffered for a peripheral before it's disconnected, defaulting to 1000000.", type=int, default=1000000)
+cli.add_argument("--stats", help="Print throughput statistics every STATS seconds.", type=float)
+args = cli.parse_args()
+
+if args.lvdc:
+	protocol = "lvdc"
+	TCP_PORT = 19653
+elif args.ags:
+	protocol = "ags"
+	TCP_PORT = 19897
+else:
+	protocol = "agc"
+	TCP_PORT = 19697
+if args.port:
+	TCP_PORT = args.port
+if args.host:
+	TCP_IP = args.host
+else:
+	TCP_IP = "localhost"
+emulatorName = emulatorNames[protocol]
+
+# Parse a list of channel numbers like "5,114-117", returning a set.
+def parseChannels(channelList):
+	channels = set()
+	for field in channelList.split(","):
+		if "-" in field:
+			first, last = field.split("-")
+			channels.update(range(int(first, 8), int(last, 8) + 1))
+		elif field != "":
+			channels.add(int(field, 8))
+	return channels
+
+# Each listening port is a dictionary with keys "port", "id" (None if the
+# source IDs aren't replaced), and "channels" (None if unfiltered).
+listeners = []
+for spec in args.listen:
+	fields = spec.split(":")
+	listener = { "port": int(fields[0]), "id": None, "channels": None }
+	if len(fields) > 1 and fields[1] != "":
+		listener["id"] = int(fields[1]) & 7
+	if len(fields) > 2:
+		listener["channels"] = parseChannels(fields[2])
+	listeners.append(listener)
+
+# The connected peripherals.  Each is a dictionary with the keys "name",
+# "listener", "writer", "packetsIn", and "packetsOut".
+peripherals = []
+upstream = None
+counters = { "packetsFromEmulator": 0, "packetsToEmulator": 0,
+	"illegalBytes": 0, "connects": 0 }
+
+def log(message):
+	sys.stderr.write(time.strftime("%H:%M:%S ") + message + "\n")
+
+# Data from the emulator is passed along to the peripherals.  If several
+# packets are received at once, each peripheral gets all of them (those that
+# pass its filter) with a single write.
+def fromEmulator(packets):
+	counters["packetsFromEmulator"] += len(packets)
+	for peripheral in list(peripherals):
+		channels = peripheral["listener"]["channels"]
+		if channels == None:
+			selected = packets
+		else:
+			selected = [packet for packet in packets
+				if packetChannel(protocol, packet) in channels]
+		if len(selected) == 0:
+			continue
+		writer = peripheral["writer"]
+		if writer.transport.get_write_buffer_size() > args.backlog:
+			log("Peripheral %s can't keep up; disconnecting it." % \
+				peripheral["name"])
+			writer.close()
+			peripherals.remove(peripheral)
+			continue
+		writer.write(b"".join(selected))
+		peripheral["packetsOut"] += len(selected)
+
+async def serveEmulator():
+	global upstream
+	while True:
+		try:
+			reader, writer = await asyncio.open_connection(TCP_IP, TCP_PORT)
+		except OSError as msg:
+			if counters["connects"] == 0:
+				log(str(msg))
+			await asyncio.sleep(1)
+			continue
+		log("Connected to %s at %s:%d." % (emulatorName, TCP_IP, TCP_PORT))
+		counters["connects"] += 1
+		upstream = writer
+		receivedData = bytearray()
+		while True:
+			try:
+				data = await reader.read(65536)
+			except OSError:
+				data = b""
+			if len(data) == 0:
+				break
+			receivedData += data
+			packets, illegal = splitPackets(protocol, receivedData)
+			counters["illegalBytes"] += illegal
+			if len(packets) > 0:
+				fromEmulator(packets)
+		upstream = None
+		writer.close()
+		log("Connection to %s lost." % emulatorName)
+		await asyncio.sleep(1)
+
+# Data from a peripheral is passed along to the emulator, in whole packets
+# only.  A mask command is held back until the packet it applies to has
+# arrived as well.
+async def servePeripheral(listener, reader, writer):
+	address = writer.get_extra_info("peername")
+	peripheral = { "name": "%s:%d (port %d)" % (address[0], address[1],
+			listener["port"]), "listener": listener, "writer": writer,
+			"packetsIn": 0, "packetsOut": 0 }
+	peripherals.append(peripheral)
+	log("Peripheral %s connected." % peripheral["name"])
+	receivedData = bytearray()
+	id = listener["id"]
+	while True:
+		try:
+			data = await reader.read(65536)
+		except OSError:
+			data = b""
+		if len(data) == 0:
+			break
+		receivedData += data
+		packets, illegal = splitPackets(protocol, receivedData, True)
+		counters["illegalBytes"] += illegal
+		if len(packets) > 0 and isMaskPacket(protocol, packets[-1]):
+			receivedData[:0] = packets.pop()
+		if len(packets) == 0:
+			continue
+		if id != None:
+			packets = [bytes(((packet[0] & 0xF8) | id,)) + packet[1:]
+				for packet in packets]
+		peripheral["packetsIn"] += len(packets)
+		counters["packetsToEmulator"] += len(packets)
+		if upstream != None:
+			upstream.write(b"".join(packets))
+	if peripheral in peripherals:
+		peripherals.remove(peripheral)
+	writer.close()
+	log("Peripheral %s disconnected, after %d packets in and %d out." % \
+		(peripheral["name"], peripheral["packetsIn"], peripheral["packetsOut"]))
+
+async def printStats():
+	lastFrom = 0
+	lastTo = 0
+	while True:
+		await asyncio.sleep(args.stats)
+		packetsFrom = counters["packetsFromEmulator"]
+		packetsTo = counters["packetsToEmulator"]
+		log("%d peripherals, %.1f packets/s from %s, %.1f packets/s to it, %d illegal bytes" % \
+			(len(peripherals), (packetsFrom - lastFrom) / args.stats,
+			emulatorName, (packetsTo - lastTo) / args.stats,
+			counters["illegalBytes"]))
+		lastFrom = packetsFrom
+		lastTo = packetsTo
+
+async def main():
+	for listener in listeners:
+		def handler(reader, writer, listener=listener):
+			return servePeripheral(listener, reader, writer)
+		await asyncio.start_server(handler, None, listener["port"])
+		log("Listening for peripherals on port %d." % listener["port"])
+	if args.stats:
+		asyncio.create_task(printStats())
+	await serveEmulator()
+
+try:
+	asyncio.run(main())
+except KeyboardInterrupt:
+	pass
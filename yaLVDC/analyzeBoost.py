@@ -14,19 +14,34 @@ History:    2023-08-06 RSB  Created.
             2023-08-12 RSB  Better handling of case in which no binary scaling
                             is defined, some of which was accomplished by 
                             updating lvdcTelemetryDefinitions.tsv.
+            2026-10-17 RSB  Now uses virtualWire.py (from piPeripheral/) for
+                            --telemetry, and reconnects if yaLVDC is 
+                            restarted.
+            2026-10-17 RSB  The PIO log is now read in chunks, parsed into 
+                            NumPy arrays, and decoded with vectorized table
+                            lookups, rather than reading all of it into 
+                            memory and processing it line by line.  Added
+                            --csv and --parquet.
 
 The PIO log file is read on stdin, and the output dataset is created on stdout.
 '''
 
 import sys
-import math
+import os
 import time
-import socket
+import numpy as np
 from lvdcTelemetryDecoder import lvdcTelemetryDecoder, lvdcSetVersion, \
-                                 lvdcFormatData
+                                 lvdcFormatData, lvdcDecimalUnits
+# The tables selected by lvdcSetVersion() are module globals.
+import lvdcTelemetryDecoder as ltd
+# virtualWire.py is shared with the AGC peripherals in piPeripheral/.
+sys.path.append(os.path.join(sys.path[0], "..", "piPeripheral"))
+from virtualWire import VirtualWire
 
 version = None
 telemetry = False
+csvPath = None
+parquetPath = None
 TCP_IP = "localhost"
 TCP_PORT = 19653
 for param in sys.argv[1:]:
@@ -35,6 +50,10 @@ for param in sys.argv[1:]:
         lvdcSetVersion(version)
     elif param == "--telemetry":
         telemetry = True
+    elif param.startswith("--csv="):
+        csvPath = param[6:]
+    elif param.startswith("--parquet="):
+        parquetPath = param[10:]
     elif param.startswith("--port="):
         TCP_PORT = int(param[7:])
     elif param.startswith("--host="):
@@ -61,40 +80,200 @@ for param in sys.argv[1:]:
         print("               IP address, etc.  It specifies the host machine")
         print("               on which yaLVDC is running.")
         print("--port=P       P defaults to 19653. ")
+        print("--csv=P        For 1, also write the altitude/velocity dataset")
+        print("               as CSV to the file P.  For 2, also write each")
+        print("               telemetered variable as CSV to a separate file")
+        print("               (VARIABLE.csv) in the folder P.")
+        print("--parquet=P    Like --csv, but for Parquet files, for which")
+        print("               pyarrow must be installed.")
         sys.exit(0)
 
 # Generic initialization (TCP socket setup).  Has no target-specific code, and 
 # shouldn't need to be modified unless there are bugs.
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-#s.setblocking(0)
-newConnect = False
+wire = VirtualWire("lvdc", TCP_IP, TCP_PORT)
 def connectToLVDC():
-    global newConnect
-    count = 0
-    sys.stderr.write("Connecting to LVDC/PTC emulator at %s:%d\n" % \
-                        (TCP_IP, TCP_PORT))
+    if not wire.connect(100):
+        time.sleep(3)
+        sys.exit(1)
+
+###############################################################################
+# Reading the PIO log.  Its lines are formatted (see runOneInstruction.c) as
+#    CYCLECOUNT\t>\tCHANNEL\tMODEREG\tVALUE\n
+# where CYCLECOUNT is decimal and variable in length, but CHANNEL, MODEREG, 
+# and VALUE are octal with 3, 9, and 9 digits respectively.  Everything after
+# CYCLECOUNT is thus at a fixed offset from the end of the line, so entire 
+# chunks of the log can be parsed at once by NumPy.  Lines not in that format 
+# are ignored.
+
+chunkSize = 1 << 22
+pioDtype = np.dtype([("t", np.int64), ("direction", "S1"), 
+                     ("channel", np.int64), ("value", np.int64)])
+octal3 = 8 ** np.arange(2, -1, -1, dtype=np.int64)
+octal9 = 8 ** np.arange(8, -1, -1, dtype=np.int64)
+decimal18 = 10 ** np.arange(17, -1, -1, dtype=np.int64)
+
+# Parse the lines in buf, a uint8 array of complete lines, each ending in a 
+# newline, into an array of pioDtype.
+def parsePioChunk(buf):
+    ends = np.flatnonzero(buf == 10)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    keep = ends - starts >= 27
+    ends = ends[keep]
+    starts = starts[keep]
+    keep = (buf[ends - 10] == 9) & (buf[ends - 20] == 9) & \
+           (buf[ends - 24] == 9) & (buf[ends - 26] == 9) & \
+           (ends - starts <= 26 + len(decimal18))
+    ends = ends[keep]
+    starts = starts[keep]
+    channelDigits = buf[ends[:, None] + np.arange(-23, -20)].astype(np.int64) - 48
+    valueDigits = buf[ends[:, None] + np.arange(-9, 0)].astype(np.int64) - 48
+    # The cycle count is right-justified into len(decimal18) digits, 
+    # zero-filled on the left.
+    timeIndices = (ends - 26)[:, None] + np.arange(-len(decimal18), 0)
+    timeDigits = np.where(timeIndices >= starts[:, None], 
+                          buf[np.maximum(timeIndices, 0)].astype(np.int64) - 48,
+                          0)
+    keep = np.all((channelDigits >= 0) & (channelDigits < 8), axis=1) & \
+           np.all((valueDigits >= 0) & (valueDigits < 8), axis=1) & \
+           np.all((timeDigits >= 0) & (timeDigits < 10), axis=1)
+    records = np.empty(np.count_nonzero(keep), dtype=pioDtype)
+    records["t"] = timeDigits[keep] @ decimal18
+    records["direction"] = buf[ends[keep] - 25].view("S1")
+    records["channel"] = channelDigits[keep] @ octal3
+    records["value"] = valueDigits[keep] @ octal9
+    return records
+
+# Generator for the contents of the PIO log, as successive arrays of 
+# pioDtype, each holding the lines from (roughly) chunkSize bytes of it.
+def readPioLog(f):
+    leftover = b""
     while True:
-        try:
-            s.connect((TCP_IP, TCP_PORT))
-            sys.stderr.write("Connected.\n")
-            newConnect = True
+        data = f.read(chunkSize)
+        if len(data) == 0:
             break
-        except socket.error as msg:
-            sys.stderr.write(str(msg) + "\n")
-            count += 1
-            if count >= 100:
-                sys.stderr.write("Too many retries ...\n")
-                time.sleep(3)
-                sys.exit(1)
-            time.sleep(1)
+        data = leftover + data
+        last = data.rfind(b"\n")
+        if last < 0:
+            leftover = data
+            continue
+        leftover = data[last + 1:]
+        yield parsePioChunk(np.frombuffer(data, dtype=np.uint8, count=last + 1))
+    if len(leftover) > 0:
+        yield parsePioChunk(np.frombuffer(leftover + b"\n", dtype=np.uint8))
+
+###############################################################################
+# Table-driven decoding of telemetry, equivalent to lvdcTelemetryDecoder() and
+# lvdcFormatData() (see lvdcTelemetryDecoder.py), but on entire arrays of 
+# PIO-log records at once.  The tables, built from forMission (i.e., from
+# lvdcTelemetryDefinitions.tsv), are indexed by the "augmented" PIO number,
+# i.e., the mode register and the channel number combined.
+
+modeChannels = [0o006, 0o206, 0o406, 0o606]
+minusFlag = 0o200000000
+minusMask = 0o377777777
+
+def telemetryTables():
+    forMission = ltd.forMission
+    tables = {
+        "forMission": forMission,
+        "known": np.zeros(0o10000, dtype=bool),
+        "decimal": np.zeros(0o10000, dtype=bool),
+        "factor": np.ones(0o10000),
+        "scale": [""] * 0o10000
+    }
+    for aug in forMission:
+        teld = forMission[aug]
+        # The block header and the memory words of a memory dump aren't
+        # decoded as variables (see lvdcTelemetryDecoder()).
+        if aug == 0o4470 or \
+                (aug >= 0o4474 and aug <= 0o4570 and (aug & 3) == 0):
+            continue
+        tables["known"][aug] = True
+        for n in lvdcDecimalUnits:
+            if n in teld[3]:
+                tables["decimal"][aug] = True
+                break
+        if teld[1] != -1000:
+            if teld[1] != 0:
+                tables["factor"][aug] = 2.0 ** (teld[1] - 25)
+            tables["scale"][aug] = "B%d" % teld[1]
+            if teld[2] != -1000:
+                tables["scale"][aug] += "/B%d" % teld[2]
+    return tables
+
+# Decode an array of PIO-log records.  The mode register is tracked from the 
+# records for modeChannels, starting from lvdcMode (-1 if not known yet), and
+# so is the mode after the last of the records.  Returns that mode, along 
+# with the indices of the records holding telemetered variables, their 
+# augmented PIO numbers, and their raw and scaled values.
+def decodeTelemetry(records, tables, lvdcMode):
+    channels = records["channel"]
+    values = records["value"]
+    isMode = np.isin(channels, modeChannels)
+    lastMode = np.maximum.accumulate(np.where(isMode, np.arange(len(records)), -1))
+    modes = np.where(lastMode >= 0, 
+                     (values[np.maximum(lastMode, 0)] >> 20) & 7, lvdcMode)
+    if len(modes) > 0:
+        lvdcMode = int(modes[-1])
+    augs = ((modes << 9) | channels) & 0o7777
+    indices = np.flatnonzero(~isMode & (modes >= 0) & tables["known"][augs])
+    augs = augs[indices]
+    raws = values[indices]
+    decimal = tables["decimal"][augs]
+    raws = np.where(decimal & ((raws & minusFlag) != 0), -(raws ^ minusMask), 
+                    raws)
+    scaled = raws * tables["factor"][augs]
+    return lvdcMode, indices, augs, raws, scaled, decimal
+
+def fileName(var):
+    return var.replace("/", "_").replace("*", "_")
+
+# Writes per-variable CSV files in csvPath, and Parquet files in parquetPath.
+outputFiles = {}
+def writeVariables(tables, times, augs, raws, scaled, decimal):
+    for aug in np.unique(augs).tolist():
+        which = np.flatnonzero(augs == aug)
+        var = tables["forMission"][aug][0]
+        if csvPath != None:
+            if aug not in outputFiles:
+                os.makedirs(csvPath, exist_ok=True)
+                f = open(os.path.join(csvPath, fileName(var) + ".csv"), "w")
+                f.write("time,raw,scaled\n")
+                outputFiles[aug] = f
+            if tables["decimal"][aug]:
+                rows = ["%.6f,%d,%.10g" % row for row in zip(times[which], 
+                        raws[which].tolist(), scaled[which])]
+            else:
+                rows = ["%.6f,O%09o," % row for row in zip(times[which], 
+                        raws[which].tolist())]
+            outputFiles[aug].write("\n".join(rows) + "\n")
+        if parquetPath != None:
+            table = pyarrow.table({"time": times[which], "raw": raws[which],
+                                   "scaled": scaled[which]})
+            if ("parquet", aug) not in outputFiles:
+                os.makedirs(parquetPath, exist_ok=True)
+                outputFiles[("parquet", aug)] = pyarrow.parquet.ParquetWriter(
+                    os.path.join(parquetPath, fileName(var) + ".parquet"),
+                    table.schema)
+            outputFiles[("parquet", aug)].write_table(table)
+
+def closeOutputFiles():
+    for key in outputFiles:
+        outputFiles[key].close()
+
+if parquetPath != None:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        print("--parquet requires pyarrow (pip3 install pyarrow).")
+        sys.exit(1)
 
 def tScale(t):
     return t * 168.0 / 2048000
 
 if version != None and not telemetry:
     
-    lines = sys.stdin.readlines()
-
     format0 = "\t%-8s\t%-12s\t%-12s\t%-16s\t%-12s\t%s"
     hFormat = "%12s" + format0
     lFormat = "%12.3f" + format0
@@ -102,34 +281,32 @@ if version != None and not telemetry:
           ("Time (sec)", "Variable", "Raw Value", "Scale", "Scaled Val", "Units", "Description"))
     print(hFormat % \
           ("----------", "--------", "---------", "-----", "----------", "-----", "-----------"))
-    for line in lines:
-        fields = line.strip().split("\t")
-        if len(fields) != 5:
-            continue
-        t = int(fields[0])
-        channelNumber = int(fields[2], 8)
-        data = int(fields[4], 8)
-        var,val,sc1,sc2,units,desc,msg,aug = \
-                        lvdcTelemetryDecoder(0, channelNumber, data)
-        scale = ""
-        if isinstance(sc1, int):
-            if sc1 != -1000:
-                scale = "B%d" % sc1
-                if sc2 != -1000:
-                    scale = scale + ("/B%d" % sc2)
-        if val != None:
-            val,scaled = lvdcFormatData(val, sc1, units)
-            print(lFormat % (tScale(t), var, val, scale, scaled, units, desc))
+    tables = telemetryTables()
+    lvdcMode = -1
+    for records in readPioLog(sys.stdin.buffer):
+        lvdcMode, indices, augs, raws, scaled, decimal = \
+                        decodeTelemetry(records, tables, lvdcMode)
+        times = tScale(records["t"][indices])
+        lines = []
+        for i in range(len(indices)):
+            teld = tables["forMission"][augs[i]]
+            if decimal[i]:
+                lines.append(lFormat % (times[i], teld[0], "%d" % raws[i], 
+                             tables["scale"][augs[i]], "%g" % scaled[i], 
+                             teld[3], teld[4]))
+            else:
+                lines.append(lFormat % (times[i], teld[0], "O%09o" % raws[i], 
+                             tables["scale"][augs[i]], "", teld[3], teld[4]))
+        if len(lines) > 0:
+            print("\n".join(lines))
+        if csvPath != None or parquetPath != None:
+            writeVariables(tables, times, augs, raws, scaled, decimal)
+    closeOutputFiles()
     sys.exit(0)
 
 if version != None and telemetry:
     
     connectToLVDC()
-    # Buffer for a packet received from yaLVDC.
-    packetSize = 6
-    inputBuffer = bytearray(packetSize)
-    leftToRead = packetSize
-    view = memoryview(inputBuffer)
     
     format0 = "\t%-8s\t%-12s\t%-12s\t%-12s\t%-12s\t%s"
     hFormat = "%12s" + format0
@@ -142,78 +319,27 @@ if version != None and telemetry:
     print(hFormat % \
           ("----------", "--------", "---------", "-----", "----------", "-----", "-----------"))
     t0 = time.time()
-    while True:
-        # Check for packet data received from yaLVDC and process it.
-        # While these packets are always the same length in bytes,
-        # since the socket is non-blocking any individual read
-        # operation may yield less bytes than that, and the buffer may 
-        # accumulate data over time until it fills.    
-        try:
-            numNewBytes = s.recv_into(view, leftToRead)
-        except:
-            numNewBytes = 0
-        if numNewBytes > 0:
-            view = view[numNewBytes:]
-            leftToRead -= numNewBytes 
-            if leftToRead == 0:
-                # Prepare for next read attempt.
-                view = memoryview(inputBuffer)
-                leftToRead = packetSize
-                # Parse the packet just read, and call outputFromAGx().
-                # Start with a sanity check.
-                ok = 1
-                if (inputBuffer[0] & 0x80) != 0x80:
-                    ok = 0
-                elif (inputBuffer[1] & 0x80) != 0x00:
-                    ok = 0
-                elif (inputBuffer[2] & 0x80) != 0x00:
-                    ok = 0
-                elif (inputBuffer[3] & 0x80) != 0x00:
-                    ok = 0
-                elif (inputBuffer[4] & 0x80) != 0x00:
-                    ok = 0
-                elif (inputBuffer[5] & 0x80) != 0x00:
-                    ok = 0
-                # Packet has the various signatures we expect.
-                if ok == 0:
-                    # The protocol allows yaLVDC to send a byte that's 0xFF, 
-                    # which is intended as a ping and can be ignored.  I don't
-                    # know if there will actually be any such messages.  For 
-                    # other corrupted packets we print a message.  In either 
-                    # case, we try to realign past the corrupted/ping byte(s).
-                    if inputBuffer[0] != 0xff:
-                        print("Illegal packet: %03o %03o %03o %03o %03o %03o" % \
-                                tuple(inputBuffer))
-                    for i in range(1,packetSize):
-                        if (inputBuffer[i] & 0x80) == 0x80 \
-                                and inputBuffer[i] != 0xFF:
-                            j = 0
-                            for k in range(i,6):
-                                inputBuffer[j] = inputBuffer[k]
-                                j += 1
-                            view = view[j:]
-                            leftToRead = packetSize - j
-                else:
-                    ioType = (inputBuffer[0] >> 3) & 7
-                    source = inputBuffer[0] & 7
-                    channel = ((inputBuffer[2] << 2) & 0x180) | \
-                                (inputBuffer[1] & 0x7F)
-                    value = (inputBuffer[2] & 0x1F) << 21
-                    value |= (inputBuffer[3] & 0x7F) << 14
-                    value |= (inputBuffer[4] & 0x7F) << 7
-                    value |= inputBuffer[5] & 0x7F
-                    var,val,sc1,sc2,units,desc,msg,aug = \
-                                    lvdcTelemetryDecoder(0, channel, value)
-                    scale = ""
-                    if isinstance(sc1, int):
-                        if sc1 != -1000:
-                            scale = "B%d" % sc1
-                            if sc2 != -1000:
-                                scale = scale + ("/B%d" % sc2)
-                    if val != None:
-                        val,scaled = lvdcFormatData(val, sc1, units)
-                        t1 = time.time()
-                        print(lFormat % (t1-t0, var, val, scale, scaled, units, desc))
+    
+    # Called for each packet received from yaLVDC, as soon as it arrives.
+    # Packets which can't be parsed are skipped by wire, which realigns on the
+    # next legal packet.
+    def outputFromCPU(ioType, source, channel, value):
+        var,val,sc1,sc2,units,desc,msg,aug = \
+                        lvdcTelemetryDecoder(0, channel, value)
+        scale = ""
+        if isinstance(sc1, int):
+            if sc1 != -1000:
+                scale = "B%d" % sc1
+                if sc2 != -1000:
+                    scale = scale + ("/B%d" % sc2)
+        if val != None:
+            val,scaled = lvdcFormatData(val, sc1, units)
+            t1 = time.time()
+            print(lFormat % (t1-t0, var, val, scale, scaled, units, desc))
+    
+    wire.subscribe(outputFromCPU)
+    wire.run(None, 1.0, 100)
+    sys.exit(0)
 
 radius39A = 6373382.0
 
@@ -221,39 +347,54 @@ def vScale(v):
     return v / 2048
 
 def rScale(x):
-    if x & 0o200000000:
-        x = -(x ^ 0o377777777)
+    x = np.where(x & 0o200000000, -(x ^ 0o377777777), x)
     return x / 4.0
 
-lines = sys.stdin.readlines()
+# The PIO channels of the telemetered velocity and position components.
+boostChannels = { 0o124: "v", 0o034: "z", 0o044: "x", 0o050: "y" }
+
+if csvPath != None:
+    csvFile = open(csvPath, "w")
+    csvFile.write("time,altitude,velocity\n")
+if parquetPath != None:
+    parquetWriter = None
 
 print("Time (sec)\tAltitude (km)\tVelocity (m/sec)")
 components = {}
-for line in lines:
-    fields = line.strip().split("\t")
-    if len(fields) != 5 or fields[1] != ">" \
-            or fields[2] not in ["124", "034", "044", "050"]:
+for records in readPioLog(sys.stdin.buffer):
+    records = records[(records["direction"] == b">") & 
+                      np.isin(records["channel"], list(boostChannels))]
+    # Only the handful of records selected above need to be examined one
+    # at a time.
+    rows = []
+    for t, channel, value in zip(records["t"].tolist(), 
+                                 records["channel"].tolist(), 
+                                 records["value"].tolist()):
+        if len(components) == 0:
+            components["t"] = tScale(t)
+        components[boostChannels[channel]] = value
+        if len(components) == 5:
+            rows.append((components["t"], components["v"], components["x"],
+                         components["y"], components["z"]))
+            components = {}
+    if len(rows) == 0:
         continue
-    rtc = tScale(int(fields[0]))
-    if len(components) == 0:
-        components["t"] = rtc
-    channel = fields[2]
-    value = int(fields[4], 8)
-    if channel == "124":
-        components["v"] = vScale(value)
-    elif channel == "034":
-        components["z"] = rScale(value)
-    elif channel == "044":
-        components["x"] = rScale(value)
-    elif channel == "050":
-        components["y"] = rScale(value)
-    if len(components) == 5:
-        t = components["t"]
-        v = components["v"]
-        x = components["x"]
-        y = components["y"]
-        z = components["z"]
-        r2 = x * x + y * y + z * z
-        r = (math.sqrt(r2) - radius39A) / 1000.0
-        print("%8.4f\t%8.4f\t%8.3f" % (t, r, v))
-        components = {}
+    rows = np.array(rows)
+    t = rows[:, 0]
+    v = vScale(rows[:, 1])
+    xyz = rScale(rows[:, 2:].astype(np.int64))
+    r = (np.sqrt(np.sum(xyz * xyz, axis=1)) - radius39A) / 1000.0
+    print("\n".join("%8.4f\t%8.4f\t%8.3f" % row for row in zip(t, r, v)))
+    if csvPath != None:
+        np.savetxt(csvFile, np.column_stack((t, r, v)), 
+                   fmt=("%.4f", "%.4f", "%.3f"), delimiter=",")
+    if parquetPath != None:
+        table = pyarrow.table({"time": t, "altitude": r, "velocity": v})
+        if parquetWriter == None:
+            parquetWriter = pyarrow.parquet.ParquetWriter(parquetPath, 
+                                                          table.schema)
+        parquetWriter.write_table(table)
+if csvPath != None:
+    csvFile.close()
+if parquetPath != None and parquetWriter != None:
+    parquetWriter.close()
@@ -15,6 +15,17 @@
 #               2023-08-22 RSB  Implemented last command (EXECUTE ALTERNATE
 #                               SEQUENCE) and corrected yesterday's
 #                               (EXECUTE GENERALIZED MANEUVER).
+#               2026-10-17 RSB  Now reads all of the data available from
+#                               yaLVDC on each pass through the event loop,
+#                               rather than a single packet, and skips 
+#                               superseded telemetry updates.
+#               2026-10-17 RSB  Now uses virtualWire.py (from piPeripheral/)
+#                               for the socket handling, and reconnects if
+#                               yaLVDC is restarted.
+#               2026-10-17 RSB  Telemetry labels are now found directly by
+#                               PIO rather than via grid_slaves(), values 
+#                               which haven't changed aren't reformatted,
+#                               and the display is refreshed once per frame.
 
 '''
 Regarding how the Digital Command System (DCS) delivers commands and data to 
@@ -73,8 +84,8 @@ and stored in bits S,1,2,3,4,5 at V.DSBL, V.DSBL+1, V.DSBL+2, and so on.
 
 import sys
 import argparse
+import os
 import time
-import socket
 try:
   import Tkinter as tk
   import Tkinter.font as font
@@ -91,6 +102,9 @@ from lvdcTelemetryDecoder import lvdcFormatData, lvdcModeReset, \
                                  lvdcSetVersion, lvdcTelemetryDecoder, \
                                  forAS206RAM, forAS512, forAS513, getLvdcMode
 from dcsDefinitions import *
+# virtualWire.py is shared with the AGC peripherals in piPeripheral/.
+sys.path.append(os.path.join(sys.path[0], "..", "piPeripheral"))
+from virtualWire import VirtualWire
 from decimal import Decimal, ROUND_HALF_UP
 
 # Python's native round() function uses a silly method (in the sense that it is
@@ -942,7 +956,10 @@ class telPanel:
         self.array = []
         for row in range(self.numRows):
             self.array.append([])
-        self.locations = {}
+        # The label displaying each PIO's value, and the last raw value 
+        # displayed in it.
+        self.widgets = {}
+        self.lastRaw = {}
         row = 0
         for var in sorted(variables):
             pio = variables[var]
@@ -964,12 +981,12 @@ class telPanel:
             label.grid(row=row, column=len(rowArray), sticky=tk.W)
             rowArray.append(label)
             CreateToolTip(label, tooltip)
-            self.locations[pio] = (row, len(rowArray))
             label = tk.Label(text="", width=12, fg=colors[0], \
                              anchor="w", name=str(pio))
             label.grid(row=row, column=len(rowArray), sticky=tk.W)
             label.bind("<Control-Button-1>", telControlClickCallback)
             label.bind('<Button-1>', varClick)
+            self.widgets[pio] = label
             rowArray.append(label)
             text = normalizeText(teld[3])
             label = tk.Label(text=text+" ", fg=gray, anchor="w")
@@ -1053,30 +1070,17 @@ class dcsPanel:
 # Generic initialization (TCP socket setup).  Has no target-specific code, and 
 # shouldn't need to be modified unless there are bugs.
 
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.setblocking(0)
-
 newConnect = False
-def connectToLVDC():
+def setNewConnect():
     global newConnect
-    count = 0
-    sys.stderr.write("Connecting to LVDC/PTC emulator at %s:%d\n" % \
-                        (TCP_IP, TCP_PORT))
-    while True:
-        try:
-            s.connect((TCP_IP, TCP_PORT))
-            sys.stderr.write("Connected.\n")
-            newConnect = True
-            lvdcModeReset()
-            break
-        except socket.error as msg:
-            sys.stderr.write(str(msg) + "\n")
-            count += 1
-            if count >= 50:
-                sys.stderr.write("Too many retries ...\n")
-                time.sleep(3)
-                sys.exit(1)
-            time.sleep(1)
+    newConnect = True
+    lvdcModeReset()
+wire = VirtualWire("lvdc", TCP_IP, TCP_PORT, ID, setNewConnect)
+
+def connectToLVDC():
+    if not wire.connect(50):
+        time.sleep(3)
+        sys.exit(1)
 
 connectToLVDC()
 
@@ -1090,27 +1094,7 @@ connectToLVDC()
 # Given a 4-tuple (ioType,channel,value,mask), creates packet data and sends it 
 # to yaLVDC.
 def packetize(tuple):
-    outputBuffer = bytearray(6)
-    source = ID
-    ioType = tuple[0]
-    channel = tuple[1]
-    value = tuple[2]
-    mask = tuple[3]
-    if mask != 0o377777777:
-        outputBuffer[0] = 0x80 | 0x40 | ((ioType & 7) << 3) | (ID & 7)
-        outputBuffer[1] = channel & 0x7F
-        outputBuffer[2] = ((channel & 0x180) >> 2) | ((mask >> 21) & 0x1F)
-        outputBuffer[3] = (mask >> 14) & 0x7F
-        outputBuffer[4] = (mask >> 7) & 0x7F
-        outputBuffer[5] = mask & 0x7F
-        s.send(outputBuffer)
-    outputBuffer[0] = 0x80 | ((ioType & 7) << 3) | (ID & 7)
-    outputBuffer[1] = channel & 0x7F
-    outputBuffer[2] = ((channel & 0x180) >> 2) | ((value >> 21) & 0x1F)
-    outputBuffer[3] = (value >> 14) & 0x7F
-    outputBuffer[4] = (value >> 7) & 0x7F
-    outputBuffer[5] = value & 0x7F
-    s.send(outputBuffer)
+    wire.send(tuple)
 
 def outputFromCPU(ioType, channel, value):
     var, val, sc1, sc2, units, desc, msg, aug = \
@@ -1126,9 +1110,22 @@ def outputFromCPU(ioType, channel, value):
     if aug >= 0o4474 and aug <= 0o4570 and (aug & 3) == 0:
         print("Memory word +%02o: %09o (%09o)" % ((aug - 0o4474) // 4, val, val<<1))
         return
-    if aug in top.locations:
-        row, col = top.locations[aug]
-        widget = root.grid_slaves(row=row, column=col)[0]
+    if aug in top.widgets:
+        # Unchanged values are dropped here, and changed ones are only
+        # formatted and displayed at the end of mainLoopIteration(), so 
+        # that the display is refreshed just once per frame.
+        if aug not in pendingDisplay and top.lastRaw.get(aug) == val:
+            return
+        pendingDisplay[aug] = (val, sc1, units)
+
+# Telemetry values waiting to be displayed, by PIO.
+pendingDisplay = {}
+def refreshDisplay():
+    for aug, (val, sc1, units) in pendingDisplay.items():
+        if top.lastRaw.get(aug) == val:
+            continue
+        top.lastRaw[aug] = val
+        widget = top.widgets[aug]
         raw, scaled = lvdcFormatData(val, sc1, units)
         if scaled == "":
             valueToUse = raw
@@ -1136,20 +1133,47 @@ def outputFromCPU(ioType, channel, value):
             valueToUse = scaled
         if widget["text"] != valueToUse:
             telChanged(widget)
-        widget["text"] = valueToUse
+            widget["text"] = valueToUse
+    pendingDisplay.clear()
 
 def inputsForCPU():
     return []
 
-# Buffer for a packet received from yaLVDC.
-packetSize = 6
-inputBuffer = bytearray(packetSize)
-leftToRead = packetSize
-view = memoryview(inputBuffer)
+# On each pass through mainLoopIteration(), everything presently available 
+# from yaLVDC is read and decoded at once by wire.poll(), and anything 
+# incomplete at the end is kept for next time.  If the connection to yaLVDC
+# is lost, wire.poll() keeps trying to reconnect.
+
+# Telemetry which merely updates a widget can be coalesced:  if several 
+# updates for the same widget arrive at once, only the last of them needs to 
+# be displayed.  However, which widget a PIO refers to depends on the LVDC 
+# mode, which is itself set by telemetry (see lvdcTelemetryDecoder.py), so we
+# have to track the mode through the packets to decide.  Returns a list of
+# booleans, parallel to packets, of the packets which are superseded.
+modeChannels = (0o006, 0o206, 0o406, 0o606)
+def supersededPackets(packets):
+    superseded = [False] * len(packets)
+    last = {}
+    lvdcMode = getLvdcMode()
+    for i in range(len(packets)):
+        ioType, source, channel, value = packets[i]
+        if ioType != 0:
+            continue
+        if channel in modeChannels:
+            lvdcMode = (value >> 20) & 7
+            continue
+        if lvdcMode == None:
+            continue
+        aug = (lvdcMode << 9) | channel
+        if aug in top.widgets:
+            if aug in last:
+                superseded[last[aug]] = True
+            last[aug] = i
+    return superseded
 
 didSomething = False
 def mainLoopIteration():
-    global didSomething, inputBuffer, leftToRead, view
+    global didSomething
     global doubleClickTimeouts, doubleClickIds
     global pendingDcsStatusCodes
 
@@ -1167,68 +1191,17 @@ def mainLoopIteration():
     servicePending()
 
     # Check for packet data received from yaLVDC and process it.
-    # While these packets are always the same length in bytes,
-    # since the socket is non-blocking any individual read
-    # operation may yield less bytes than that, and the buffer may accumulate
-    # data over time until it fills.    
-    try:
-        numNewBytes = s.recv_into(view, leftToRead)
-    except:
-        numNewBytes = 0
-    if numNewBytes > 0:
-        view = view[numNewBytes:]
-        leftToRead -= numNewBytes 
-        if leftToRead == 0:
-            # Prepare for next read attempt.
-            view = memoryview(inputBuffer)
-            leftToRead = packetSize
-            # Parse the packet just read, and call outputFromAGx().
-            # Start with a sanity check.
-            ok = 1
-            if (inputBuffer[0] & 0x80) != 0x80:
-                ok = 0
-            elif (inputBuffer[1] & 0x80) != 0x00:
-                ok = 0
-            elif (inputBuffer[2] & 0x80) != 0x00:
-                ok = 0
-            elif (inputBuffer[3] & 0x80) != 0x00:
-                ok = 0
-            elif (inputBuffer[4] & 0x80) != 0x00:
-                ok = 0
-            elif (inputBuffer[5] & 0x80) != 0x00:
-                ok = 0
-            # Packet has the various signatures we expect.
-            if ok == 0:
-                # The protocol allows yaLVDC to send a byte that's 0xFF, 
-                # which is intended as a ping and can be ignored.  I don't
-                # know if there will actually be any such messages.  For 
-                # other corrupted packets we print a message.  In either 
-                # case, we try to realign past the corrupted/ping byte(s).
-                if inputBuffer[0] != 0xff:
-                    print("Illegal packet: %03o %03o %03o %03o %03o %03o" % \
-                            tuple(inputBuffer))
-                for i in range(1,packetSize):
-                    if (inputBuffer[i] & 0x80) == 0x80 and \
-                            inputBuffer[i] != 0xFF:
-                        j = 0
-                        for k in range(i,6):
-                            inputBuffer[j] = inputBuffer[k]
-                            j += 1
-                        view = view[j:]
-                        leftToRead = packetSize - j
-            else:
-                ioType = (inputBuffer[0] >> 3) & 7
-                source = inputBuffer[0] & 7
-                channel = ((inputBuffer[2] << 2) & 0x180) | \
-                            (inputBuffer[1] & 0x7F)
-                value = (inputBuffer[2] & 0x1F) << 21
-                value |= (inputBuffer[3] & 0x7F) << 14
-                value |= (inputBuffer[4] & 0x7F) << 7
-                value |= inputBuffer[5] & 0x7F
-                if source == 0 and getLvdcMode() == 4 and channel in [0o030, 0o055, 0o574]:
-                    pendingDcsStatusCodes.append((channel,value))
-                outputFromCPU(ioType, channel, value)
-            didSomething = True
+    packets = wire.poll()
+    superseded = supersededPackets(packets)
+    for i in range(len(packets)):
+        ioType, source, channel, value = packets[i]
+        if source == 0 and getLvdcMode() == 4 and channel in [0o030, 0o055, 0o574]:
+            pendingDcsStatusCodes.append((channel,value))
+        if not superseded[i]:
+            outputFromCPU(ioType, channel, value)
+    refreshDisplay()
+    if len(packets) > 0:
+        didSomething = True
     
     # Check for locally-generated data for which we must generate messages to
     # yaLVDC over the socket.  In theory, the externalData list could contain
@@ -1238,6 +1211,7 @@ def mainLoopIteration():
     for i in range(0, len(externalData)):
         packetize(externalData[i])
         didSomething = True
+    wire.flush()
     
     root.after(refreshRate, mainLoopIteration)
 
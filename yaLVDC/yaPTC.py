@@ -51,6 +51,13 @@
 #								Added --terminal operation to allow using 
 #								as a spy on virtual-wire outputs but yaLVDC
 #								(whether with --ptc switch or not).
+#				2026-10-17 RSB	Now reads all of the data available from
+#								yaLVDC on each pass through the event loop,
+#								rather than a single packet, and skips 
+#								superseded updates to the display panels.
+#				2026-10-17 RSB	Now uses virtualWire.py (from piPeripheral/)
+#								for the socket handling, and reconnects if
+#								yaLVDC is restarted.
 #
 # The parts which need to be modified from the skeleton form of the program 
 # to make it peripheral-specific are the outputFromCPU() and inputsForCPU() 
@@ -1594,33 +1601,23 @@ ProcessorDisplayPanel_support.eventModeControl = eventModeControl
 # Generic initialization (TCP socket setup).  Has no target-specific code, and 
 # shouldn't need to be modified unless there are bugs.
 
+import os
+import sys
 import time
-import socket
-
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.setblocking(0)
+# virtualWire.py is shared with the AGC peripherals in piPeripheral/.
+sys.path.append(os.path.join(sys.path[0], "..", "piPeripheral"))
+from virtualWire import VirtualWire
 
 newConnect = False
-def connectToLVDC():
+def setNewConnect():
 	global newConnect
-	import sys
-	count = 0
-	sys.stderr.write("Connecting to LVDC/PTC emulator at %s:%d\n" % \
-						(TCP_IP, TCP_PORT))
-	while True:
-		try:
-			s.connect((TCP_IP, TCP_PORT))
-			sys.stderr.write("Connected.\n")
-			newConnect = True
-			break
-		except socket.error as msg:
-			sys.stderr.write(str(msg) + "\n")
-			count += 1
-			if count >= 10:
-				sys.stderr.write("Too many retries ...\n")
-				time.sleep(3)
-				sys.exit(1)
-			time.sleep(1)
+	newConnect = True
+wire = VirtualWire("lvdc", TCP_IP, TCP_PORT, ID, setNewConnect)
+
+def connectToLVDC():
+	if not wire.connect(10):
+		time.sleep(3)
+		sys.exit(1)
 
 connectToLVDC()
 
@@ -1634,104 +1631,50 @@ connectToLVDC()
 # Given a 4-tuple (ioType,channel,value,mask), creates packet data and sends it 
 # to yaLVDC.
 def packetize(tuple):
-	outputBuffer = bytearray(6)
-	source = ID
-	ioType = tuple[0]
-	channel = tuple[1]
-	value = tuple[2]
-	mask = tuple[3]
-	if mask != 0o377777777:
-		outputBuffer[0] = 0x80 | 0x40 | ((ioType & 7) << 3) | (ID & 7)
-		outputBuffer[1] = channel & 0x7F
-		outputBuffer[2] = ((channel & 0x180) >> 2) | ((mask >> 21) & 0x1F)
-		outputBuffer[3] = (mask >> 14) & 0x7F
-		outputBuffer[4] = (mask >> 7) & 0x7F
-		outputBuffer[5] = mask & 0x7F
-		s.send(outputBuffer)
-	outputBuffer[0] = 0x80 | ((ioType & 7) << 3) | (ID & 7)
-	outputBuffer[1] = channel & 0x7F
-	outputBuffer[2] = ((channel & 0x180) >> 2) | ((value >> 21) & 0x1F)
-	outputBuffer[3] = (value >> 14) & 0x7F
-	outputBuffer[4] = (value >> 7) & 0x7F
-	outputBuffer[5] = value & 0x7F
-	s.send(outputBuffer)
-
-# Buffer for a packet received from yaLVDC.
-packetSize = 6
-inputBuffer = bytearray(packetSize)
-leftToRead = packetSize
-view = memoryview(inputBuffer)
+	wire.send(tuple)
+
+# On each pass through mainLoopIteration(), everything presently available 
+# from yaLVDC is read and decoded at once by wire.poll(), and anything 
+# incomplete at the end is kept for next time.  (Formerly, at most one packet 
+# was read per pass, so that yaPTC couldn't keep up with yaLVDC.)  If the 
+# connection to yaLVDC is lost, wire.poll() keeps trying to reconnect.
+
+# Outputs from yaLVDC on these (ioType, channel) pairs merely update the 
+# display panels, so if several of them arrive for the same channel at once, 
+# only the last of them needs to be acted upon.
+coalescibleChannels = {
+	(5, 0o002), (5, 0o602), (5, 0o003), (5, 0o603), (5, 0o004), (5, 0o601), 
+	(5, 0o005), (5, 0o604), (5, 0o605)
+}
 
 didSomething = False
 def mainLoopIteration():
-	global didSomething, inputBuffer, leftToRead, view, terminalHeaderPrinted
+	global didSomething, terminalHeaderPrinted
 
 	# Check for packet data received from yaLVDC and process it.
-	# While these packets are always the same length in bytes,
-	# since the socket is non-blocking any individual read
-	# operation may yield less bytes than that, and the buffer may accumulate
-	# data over time until it fills.	
-	try:
-		numNewBytes = s.recv_into(view, leftToRead)
-	except:
-		numNewBytes = 0
-	if numNewBytes > 0:
-		view = view[numNewBytes:]
-		leftToRead -= numNewBytes 
-		if leftToRead == 0:
-			# Prepare for next read attempt.
-			view = memoryview(inputBuffer)
-			leftToRead = packetSize
-			# Parse the packet just read, and call outputFromAGx().
-			# Start with a sanity check.
-			ok = 1
-			if (inputBuffer[0] & 0x80) != 0x80:
-				ok = 0
-			elif (inputBuffer[1] & 0x80) != 0x00:
-				ok = 0
-			elif (inputBuffer[2] & 0x80) != 0x00:
-				ok = 0
-			elif (inputBuffer[3] & 0x80) != 0x00:
-				ok = 0
-			elif (inputBuffer[4] & 0x80) != 0x00:
-				ok = 0
-			elif (inputBuffer[5] & 0x80) != 0x00:
-				ok = 0
-			# Packet has the various signatures we expect.
-			if ok == 0:
-				# The protocol allows yaLVDC to send a byte that's 0xFF, 
-				# which is intended as a ping and can be ignored.  I don't
-				# know if there will actually be any such messages.  For 
-				# other corrupted packets we print a message.  In either 
-				# case, we try to realign past the corrupted/ping byte(s).
-				if inputBuffer[0] != 0xff:
-					print("Illegal packet: %03o %03o %03o %03o %03o %03o" % \
-							tuple(inputBuffer))
-				for i in range(1,packetSize):
-					if (inputBuffer[i] & 0x80) == 0x80 and inputBuffer[i] != 0xFF:
-						j = 0
-						for k in range(i,6):
-							inputBuffer[j] = inputBuffer[k]
-							j += 1
-						view = view[j:]
-						leftToRead = packetSize - j
-			else:
-				ioType = (inputBuffer[0] >> 3) & 7
-				source = inputBuffer[0] & 7
-				channel = ((inputBuffer[2] << 2) & 0x180) | (inputBuffer[1] & 0x7F)
-				value = (inputBuffer[2] & 0x1F) << 21
-				value |= (inputBuffer[3] & 0x7F) << 14
-				value |= (inputBuffer[4] & 0x7F) << 7
-				value |= inputBuffer[5] & 0x7F
-				if args.terminal:
-					if not terminalHeaderPrinted:
-						print("Dir\tIoType\tSource\tChannel\tData")
-						terminalHeaderPrinted = True
-					print(">\t%01o\t%01o\t%03o\t%09o" \
-							% (ioType, source, channel, value))
-				else:
-					outputFromCPU(ioType, channel, value)
-			didSomething = True
+	packets = wire.poll()
+	if args.terminal:
+		for ioType, source, channel, value in packets:
+			if not terminalHeaderPrinted:
+				print("Dir\tIoType\tSource\tChannel\tData")
+				terminalHeaderPrinted = True
+			print(">\t%01o\t%01o\t%03o\t%09o" \
+					% (ioType, source, channel, value))
+	else:
+		# Find the last output to each coalescible channel, and skip the 
+		# earlier ones.  Everything else is processed in order.
+		last = {}
+		for i in range(len(packets)):
+			key = (packets[i][0], packets[i][2])
+			if key in coalescibleChannels:
+				last[key] = i
+		for i in range(len(packets)):
+			ioType, source, channel, value = packets[i]
+			if last.get((ioType, channel), i) != i:
+				continue
+			outputFromCPU(ioType, channel, value)
+	if len(packets) > 0:
+		didSomething = True
 	
 	# Check for locally-generated data for which we must generate messages
 	# to yaLVDC over the socket.  In theory, the externalData list could contain
@@ -1741,6 +1684,7 @@ def mainLoopIteration():
 	for i in range(0, len(externalData)):
 		packetize(externalData[i])
 		didSomething = True
+	wire.flush()
 	
 	root.after(refreshRate, mainLoopIteration)		
 	
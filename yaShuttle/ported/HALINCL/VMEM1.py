@@ -7,8 +7,10 @@ Purpose:    This is part of the port of the original XPL source code for
             HAL/S-FC into Python.
 Contact:    The Virtual AGC Project (www.ibiblio.org/apollo).
 History:    2023-09-22 RSB  Began porting process from XPL.
+            2026-10-17 RSB  Added --vmem-pads.
 '''
 
+import sys
 from HALINCL.VMEM1 import *
 import g
 import HALINCL.COMMON as h
@@ -22,5 +24,13 @@ VMEM_TOTAL_PAGES = 399
 VMEM_PAGE_SIZE = 3360
 VMEM_LIM_PAGES = 2
 
+# The number of in-memory page buffers ("pads"), VMEM_LIM_PAGES+1, can be 
+# increased from the command line with --vmem-pads=N, up to the total number
+# of pages in the virtual memory, at which point no paging occurs at all.
+for parm in sys.argv[1:]:
+    if parm.startswith("--vmem-pads="):
+        VMEM_LIM_PAGES = min(max(int(parm[12:]), VMEM_LIM_PAGES + 1), \
+                             VMEM_TOTAL_PAGES + 1) - 1
+
 VMEM_PTR_STATUS = [0] * (VMEM_LIM_PAGES + 1)  # PTRS LAST ACCESSED 
 VMEM_FLAGS_STATUS = [0] * (VMEM_LIM_PAGES + 1)  # FLAGS FOR ABOVE PTRS 
@@ -5,6 +5,10 @@
    Purpose:    Part of the HAL/S-FC compiler.
    Contact:    The Virtual AGC Project (www.ibiblio.org/apollo).
    History:    2022-10-23 RSB  Began porting from XPL.
+               2026-10-17 RSB  MOVE() and ZERO_256() now use slice 
+                               assignments rather than byte-by-byte loops.
+                               Fixed several problems in PTR_LOCATE() and 
+                               GET_CELL() that prevented paging from working.
 """
 
 from xplBuiltins import *
@@ -93,8 +97,21 @@ def MOVE(LENGTH, FROM, INTO):
     # Now copy the data.
     if isinstance(sourceObject, bytearray):
         if isinstance(destObject, bytearray):
-            for i in range(LENGTH):
-                destObject[destIndex + i] = sourceObject[sourceIndex + i]
+            if sourceIndex + LENGTH > len(sourceObject) or \
+                    destIndex + LENGTH > len(destObject):
+                raise IndexError("MOVE out of range")
+            if sourceObject is destObject and \
+                    sourceIndex < destIndex < sourceIndex + LENGTH:
+                # The 360's MVC instruction copies byte by byte from left to
+                # right, so an overlapping MOVE like this one propagates the
+                # leading bytes of the source rather than acting like
+                # memmove(), and code sometimes relied on that to fill 
+                # fields.  A slice assignment would act like memmove().
+                for i in range(LENGTH):
+                    destObject[destIndex + i] = sourceObject[sourceIndex + i]
+            else:
+                destObject[destIndex : destIndex + LENGTH] = \
+                    memoryview(sourceObject)[sourceIndex : sourceIndex + LENGTH]
         else:
             print("MOVE not yet implemented for this case", file=sys.stderr)
             0 / 0
@@ -133,8 +150,9 @@ def ZERO_256(CORE_ADDR, COUNT):
         0 / 0
     
     if isinstance(object, bytearray):
-        for i in range(COUNT):
-            object[index + i] = 0
+        if index + COUNT > len(object):
+            raise IndexError("ZERO_256 out of range")
+        object[index : index + COUNT] = bytes(COUNT)
     else:
         print("Zeroing non-bytearray not yet implemented", file=sys.stderr)
         0 / 0
@@ -215,17 +233,13 @@ def PTR_LOCATE(PTR, FLAGS):
         
         CUR_NDX = -1;
         
-        # The following was originally a macro.
-        def SET_INDEX():
-            global PREV_CNT, CUR_INDEX
-            CUR_NDX = I; 
-            PREV_CNT = v2.VMEM_PAD_CNT[I];
-        # END SET_INDEX.
-        
+        # SET_INDEX was originally a macro, and is expanded inline here,
+        # since as a nested function its assignments would be local to it.
         for I in range(0, v2.VMEM_MAX_PAGE + 1):
             if (v2.VMEM_PAD_DISP[I] & 0x3FFF) == 0:  # DO
-                if CUR_NDX < 0: SET_INDEX();
-                elif (v2.VMEM_PAD_CNT[I] < PREV_CNT): SET_INDEX();
+                if CUR_NDX < 0 or (v2.VMEM_PAD_CNT[I] < PREV_CNT): 
+                    CUR_NDX = I; 
+                    PREV_CNT = v2.VMEM_PAD_CNT[I];
             # END
         # END
         if CUR_NDX < 0:  # DO
@@ -279,7 +293,7 @@ def PTR_LOCATE(PTR, FLAGS):
             CUR_NDX = v2.VMEM_LAST_PAGE;
         # END
         else:  # DO
-            if v2.VMEM_LAST_PAGE > VMEM_TOTAL_PAGES:  # DO
+            if v2.VMEM_LAST_PAGE > v1.VMEM_TOTAL_PAGES:  # DO
                 ERRORS(d.CLASS_BI, 702);
                 EXIT;
             # END
@@ -287,7 +301,11 @@ def PTR_LOCATE(PTR, FLAGS):
         # END
         FLAGS = FLAGS | v2.MODF;
         ZERO_CORE(v2.VMEM_PAD_ADDR[CUR_NDX], v1.VMEM_PAGE_SIZE);
-        goto = "LOC_COMMON1";
+        # GO TO LOC_COMMON1, which is in the middle of the ELSE clause below.
+        v2.VMEM_PAGE_TO_NDX[PAGE] = CUR_NDX;
+        v2.VMEM_PAD_PAGE[CUR_NDX] = PAGE;
+        v2.VMEM_PAD_DISP[CUR_NDX] = 0;
+        v2.VMEM_PAD_CNT[CUR_NDX] = v2.VMEM_LOC_CNT;
     # END
     else:  # DO
         CUR_NDX = v2.VMEM_PAGE_TO_NDX[PAGE];
@@ -300,7 +318,7 @@ def PTR_LOCATE(PTR, FLAGS):
             VMEM_PAGE = v2.VMEM_PAD_ADDR[CUR_NDX]
             FILE(VMEM_PAGE, v1.VMEM_FILEp, PAGE);
             v2.VMEM_READ_CNT = v2.VMEM_READ_CNT + 1;
-            if goto == "LOC_COMMON1": goto = None
+            # LOC_COMMON1:
             v2.VMEM_PAGE_TO_NDX[PAGE] = CUR_NDX;
             v2.VMEM_PAD_PAGE[CUR_NDX] = PAGE;
             v2.VMEM_PAD_DISP[CUR_NDX] = 0;
@@ -311,7 +329,7 @@ def PTR_LOCATE(PTR, FLAGS):
                 v2.VMEM_LOOK_AHEAD_PAGE = -1;
             # END
         # END
-        v2VMEM_PAD_CNT[CUR_NDX] = v2.VMEM_LOC_CNT;
+        v2.VMEM_PAD_CNT[CUR_NDX] = v2.VMEM_LOC_CNT;
     # END
     SAVE_PTR_STATE(CUR_NDX);
     v2.VMEM_OLD_NDX = CUR_NDX;
@@ -340,7 +358,7 @@ def PTR_LOCATE(PTR, FLAGS):
                 v2.VMEM_PAGE_TO_NDX[PAGE] = CUR_NDX;
                 v2.VMEM_PAD_PAGE[CUR_NDX] = PAGE;
                 v2.VMEM_PAD_DISP[CUR_NDX] = 0;
-                v2VMEM_PAD_CNT[CUR_NDX] = v2.VMEM_LOC_CNT - 1;
+                v2.VMEM_PAD_CNT[CUR_NDX] = v2.VMEM_LOC_CNT - 1;
             # END
         # END
     # END
@@ -378,6 +396,7 @@ def GET_CELL(CELL_SIZE, FLAGS):
                 AVAIL_SIZE = v2.VMEM_PAGE_AVAIL_SPACE[PAGE];
                 if (AVAIL_SIZE >= CELL_SIZE) & (v2.VMEM_PAGE_TO_NDX[PAGE] != -1):
                     goto = "GET_SPACE";
+                    break
             # END
     # END
     if goto in [None, "EXTEND_VMEM"]:
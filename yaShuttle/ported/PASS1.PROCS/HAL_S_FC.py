@@ -16,6 +16,7 @@ History:    2023-08-24 RSB  Began porting from ##DRIVER.xpl, segregating global
                             turns out that "HAL-S-FC" is not a valid
                             name for a Python module (and all Python
                             scripts are Python modules).
+            2026-10-17 RSB  Added --batch and --jobs.
 
  /***************************************************************************/
  /* PROCEDURE NAME:  MAIN PROGRAM                                           */
@@ -58,28 +59,49 @@ from ALMOST_DISASTER import ALMOST_DISASTER
 # random-access files FILE1 through FILE6, nor the system printer
 # OUTPUT, since xplBuiltins.py hard-codes those.
 import sys
+import time
+import traceback
+import gc
+import xplBuiltins
 
-if "--help" not in sys.argv:
+# Parse the command-line arguments to see if there's anything that
+# modifies how we're supposed to open the files.
+sourceFiles = []  # Use stdin by default for HAL/S source-code file.
+listing2 = False
+templib = False
+batchFolder = None
+jobs = 1
+for parm in sys.argv[1:]:
+    if parm.startswith("--hal="):
+        sourceFile = parm[6:]
+        if not sourceFile.endswith(".hal"):
+            sourceFile = sourceFile + ".hal"
+        sourceFiles.append(sourceFile)
+    elif parm == "LISTING2":
+        listing2 = True
+    elif parm == "--templib":
+        templib = True
+    elif parm.startswith("--batch="):
+        batchFolder = parm[8:]
+    elif parm.startswith("--jobs="):
+        jobs = max(1, int(parm[7:]))
 
-    # Parse the command-line arguments to see if there's anything that
-    # modifies how we're supposed to open the files.
-    sourceFile = None  # Use stdin by default for HAL/S source-code file.
-    listing2 = False
-    templib = False
-    for parm in sys.argv[1:]:
-        if parm.startswith("--hal="):
-            sourceFile = parm[6:]
-            if not sourceFile.endswith(".hal"):
-                sourceFile = sourceFile + ".hal"
-        elif parm == "LISTING2":
-            listing2 = True
-        elif parm == "--templib":
-            templib = True
+# Open the libraries, which are input files that are the same for every
+# compilation.
+def openLibraries():
+    # Template library.
+    inputDevices[4] = openGenericInputDevice("TEMPLIB.json", True, templib)
+    # Error-message library.
+    inputDevices[5] = openGenericInputDevice("ERRORLIB.json", True)
+    # File of module access rights.
+    inputDevices[6] = openGenericInputDevice("ACCESS.json", True)
 
-    # Open the files that we need for INPUT() and OUTPUT(), other than 
-    # output files 0 and 1 (whose behavior is hard-coded separately), 
-    # and buffer their contents where appropriate.  Does not include
-    # random-access files handled by the FILE() function.
+# Open the files that we need for INPUT() and OUTPUT(), other than 
+# output files 0 and 1 (whose behavior is hard-coded separately), 
+# and buffer their contents where appropriate.  Does not include
+# random-access files handled by the FILE() function.  Returns False
+# if the source file can't be found.
+def openDevices(sourceFile):
     
     # Start with INPUT(0), which is much more complex than the other 
     # files in order to take care of possible use of stdin, filtering 
@@ -113,7 +135,7 @@ if "--help" not in sys.argv:
         if f == None:
             print("Couldn't find the source file (%s)" % sourceFile, \
                   file=sys.stderr)
-            sys.exit(1)
+            return False
     dummy = []
     for line in f:
         # Regarding the "\xef\xbb\xbf" replacement ... *apparently*,
@@ -138,12 +160,6 @@ if "--help" not in sys.argv:
     if listing2:
         # Secondary output listing.
         outputDevices[2] = openGenericOutputDevice("LISTING2.txt")
-    # Template library.
-    inputDevices[4] = openGenericInputDevice("TEMPLIB.json", True, templib)
-    # Error-message library.
-    inputDevices[5] = openGenericInputDevice("ERRORLIB.json", True)
-    # File of module access rights.
-    inputDevices[6] = openGenericInputDevice("ACCESS.json", True)
     # Where to stow output templates.
     if templib: # In permanent template library.
         outputDevices[6] = inputDevices[4]
@@ -153,6 +169,15 @@ if "--help" not in sys.argv:
     outputDevices[8] = openGenericOutputDevice("&&TEMPINC.json", True)
     # Source-comparision output.
     outputDevices[9] = openGenericOutputDevice("SOURCECO.txt")
+    return True
+
+if "--help" not in sys.argv:
+    openLibraries()
+    if batchFolder == None:
+        if len(sourceFiles) == 0:
+            sourceFiles.append(None)
+        if not openDevices(sourceFiles[-1]):
+            sys.exit(1)
 ####################################################################
 
 '''
@@ -173,15 +198,125 @@ an error exit.  The other error exits (not shown below) are SCAN_DISASTER(),
 OUTPUT_WRITER_DISASTER(), and ENDITNOW().
 '''
 
-# Initialization
-g.CLOCK[0] = MONITOR(18)
-INITIALIZATION()
+def compileUnit():
+    # Initialization
+    g.CLOCK[0] = MONITOR(18)
+    INITIALIZATION()
+    
+    # import HALINCL.COMMON as h
+    # from watchpoints import watch
+    # watch(g.FCN_LV)
+    
+    # THE_BEGINNING:
+    g.CLOCK[1] = MONITOR(18)
+    COMPILATION_LOOP()
+    ALMOST_DISASTER()  # GO TO ALMOST_DISASTER
 
-# import HALINCL.COMMON as h
-# from watchpoints import watch
-# watch(g.FCN_LV)
+'''
+Batch mode (--batch=FOLDER) compiles any number of HAL/S source files, given
+either by --hal switches or else, one filename per line, on stdin.  In the
+latter case, each file is compiled as soon as its name is read, so the 
+compiler can be left running as a server fed by a pipe.
+
+What makes this faster than running the compiler separately for each file is
+that the compiler is loaded and initialized just once:  all of the modules are
+imported and the libraries (ERRORLIB, TEMPLIB, ACCESS) are read, which is
+typically most of the time taken by a compilation of a small program.  Each 
+compilation unit is then compiled by a forked copy of that warm process.  Thus
+the per-compilation state (in g, HALINCL, and elsewhere) starts out exactly as
+it would for a separate run of the compiler, without our having to know which
+variables comprise it, and no compilation can affect any other.  Up to --jobs
+compilations are run in parallel.
+
+For a source file X.hal, the listing (i.e., what would otherwise be printed on
+stdout) is written to FOLDER/X.lst, and all of the other files that would 
+otherwise be written into the ported/ folder (FILE1.bin, &&TEMPLIB.json, and 
+so on) are written into the folder FOLDER/X/.  A line is printed on stdout 
+(by the child process itself, so that the timing isn't affected by the parent
+waiting for stdin) for each compilation as it completes, giving its return 
+code and wall-clock time.
+'''
+def batch():
+    os.makedirs(batchFolder, exist_ok=True)
+    # Keep the garbage collector in the child processes away from all of the
+    # objects inherited from this process, so that it doesn't have to scan 
+    # them (and thereby un-share their memory pages) at every collection.
+    gc.freeze()
+    running = set()  # Process IDs of the compilations in progress.
+    failures = 0
+    count = 0
+    batchStart = time.time()
+    readStdin = (len(sourceFiles) == 0)
+    
+    def nextSourceFile():
+        if not readStdin:
+            if len(sourceFiles) == 0:
+                return None
+            return sourceFiles.pop(0)
+        line = sys.stdin.readline()
+        while line != "" and line.strip() == "":
+            line = sys.stdin.readline()
+        if line == "":
+            return None
+        return line.strip()
+    
+    def waitForUnit():
+        nonlocal failures, count
+        pid, status = os.wait()
+        running.remove(pid)
+        count += 1
+        if os.waitstatus_to_exitcode(status) != 0:
+            failures += 1
+    
+    while True:
+        sourceFile = nextSourceFile()
+        if sourceFile == None:
+            break
+        while len(running) >= jobs:
+            waitForUnit()
+        unitName = os.path.splitext(os.path.basename(sourceFile))[0]
+        unitFolder = os.path.join(batchFolder, unitName)
+        os.makedirs(unitFolder, exist_ok=True)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        startTime = time.time()
+        pid = os.fork()
+        if pid != 0:
+            running.add(pid)
+            continue
+        # We're now in the child process, which compiles just this one unit
+        # and then exits.
+        report = os.fdopen(os.dup(1), "w")
+        listing = open(os.path.join(batchFolder, unitName + ".lst"), "w")
+        os.dup2(listing.fileno(), 1)
+        sys.stdin = open(os.devnull, "r")
+        xplBuiltins.compilerStartTime = time.time_ns()
+        xplBuiltins.scriptParentFolder = unitFolder
+        xplBuiltins.openRandomAccessFiles()
+        g.litCharFile = open(unitFolder + "/LIT_CHAR.bin", "wb")
+        returnCode = 1
+        try:
+            if openDevices(sourceFile):
+                compileUnit()
+        except SystemExit as e:
+            if e.code == None:
+                returnCode = 0
+            elif isinstance(e.code, int):
+                returnCode = e.code
+        except:
+            traceback.print_exc()
+        sys.stdout.flush()
+        print("%-40s rc=%-3d %8.3f s" % (sourceFile, returnCode, \
+                                         time.time() - startTime), \
+              file=report, flush=True)
+        sys.exit(returnCode)
+    while len(running) > 0:
+        waitForUnit()
+    print("%d compilation(s), %d failed, %.3f s total" % \
+          (count, failures, time.time() - batchStart))
+    sys.exit(failures != 0)
 
-# THE_BEGINNING:
-g.CLOCK[1] = MONITOR(18)
-COMPILATION_LOOP()
-ALMOST_DISASTER()  # GO TO ALMOST_DISASTER
+if batchFolder == None:
+    compileUnit()
+else:
+    batch()
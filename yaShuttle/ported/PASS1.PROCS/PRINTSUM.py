@@ -7,11 +7,13 @@ Purpose:    This is part of the port of the original XPL source code for
             HAL/S-FC into Python. 
 Contact:    The Virtual AGC Project (www.ibiblio.org/apollo).
 History:    2023-08-25 RSB  Created place-holder file.
+            2026-10-17 RSB  Restored the virtual-memory statistics.
 '''
 
 from xplBuiltins import *
 import g
 from HALINCL.SPACELIB import *
+import HALINCL.VMEM2 as v2
 from DUMPIT   import DUMPIT
 from ERRORSUM import ERROR_SUMMARY
 from LITDUMP  import LIT_DUMP
@@ -126,13 +128,11 @@ def PRINT_SUMMARY():
             g.S = str(g.ERROR_COUNT) + ' ERRORS WERE';
         OUTPUT(0, g.S + ' DETECTED IN PHASE 1.');
         ERROR_SUMMARY();
-    '''
-    if VMEM_LOC_CNT != 0:
+    if v2.VMEM_LOC_CNT != 0:
         g.DOUBLE_SPACE();
-        OUTPUT(0, 'NUMBER OF FILE 6 LOCATES          = ' + VMEM_LOC_CNT);
-        OUTPUT(0, 'NUMBER OF FILE 6 READS            = ' + VMEM_READ_CNT);
-        OUTPUT(0, 'NUMBER OF FILE 6 WRITES           = ' + VMEM_WRITE_CNT);
-    '''
+        OUTPUT(0, 'NUMBER OF FILE 6 LOCATES          = ' + str(v2.VMEM_LOC_CNT));
+        OUTPUT(0, 'NUMBER OF FILE 6 READS            = ' + str(v2.VMEM_READ_CNT));
+        OUTPUT(0, 'NUMBER OF FILE 6 WRITES           = ' + str(v2.VMEM_WRITE_CNT));
     g.DOUBLE_SPACE();
     g.DOUBLE_SPACE();
     g.CLOCK[3] = MONITOR(18);
@@ -12,6 +12,8 @@ History:    2023-08-24 RSB  Began importing global variables from ##DRIVER.xpl.
             2023-09-07 RSB  Split off xplBuiltins.py to contain just the 
                             functions.
             2024-06-20 RSB  Stuff related to `D DOWNGRADE`
+            2026-10-17 RSB  Added --vmem and --vmem-pads.
+            2026-10-17 RSB  Added --batch and --jobs.
 '''
 
 # The version of the compiler port: (Y, M, D, H, M, S).
@@ -125,6 +127,10 @@ for parm in sys.argv[1:]:
         templib = True
     elif parm == "--debugwr":
         debugwr = True
+    elif parm.startswith("--vmem=") or parm.startswith("--vmem-pads="):
+        pass  # These cases are handled by xplBuiltins.py and VMEM1.py.
+    elif parm.startswith("--batch=") or parm.startswith("--jobs="):
+        pass  # These cases are handled by HAL_S_FC.py.
     elif parm in pCON or ("NO" + parm) in pCON or \
             (parm.startswith("NO") and parm[2:] in pCON):
         # Type 1 option:
@@ -171,6 +177,12 @@ for parm in sys.argv[1:]:
         print('--extra          Enhances messages for some ¢-toggles.')
         print('--no-syn         Do not synthesize HALMAT.')
         print('--sanity         Perform a sanity check on the Python port.')
+        print('--batch=FOLDER   Compile many source files, given by --hal')
+        print('                 switches or else one per line on stdin.')
+        print('                 Listings and other output files go into')
+        print('                 FOLDER.  See HAL_S_FC.py for details.')
+        print('--jobs=N         In --batch mode, compile up to N source files')
+        print('                 in parallel (default 1).')
         print('--help           Show this explanation.')
         print('--dummy=X        This option is ignored. (It is useful for')
         print('                 commenting out --hal switches.)')
@@ -179,6 +191,11 @@ for parm in sys.argv[1:]:
         print('--debugwr        Print debugging messages for OUTPUTWR.')
         print('--trace-inlines  Print messages for CALL INLINE.')
         print('--intersection   Helps test overlap between globals/locals.')
+        print('--vmem=B         Backend for random-access files, including the')
+        print('                 virtual memory:  B is disk (default), mmap')
+        print('                 (memory-map FILEn.bin), or ram (no FILEn.bin).')
+        print('--vmem-pads=N    Number of in-memory virtual-memory pages')
+        print('                 (default 3, maximum 400).')
         print('Additionally, many of the options from the original JCL')
         print('PARMLISTs can be used.  For "type 1" options (i.e., those')
         print('without values), you can use either the form XXXX or NOXXXX,')
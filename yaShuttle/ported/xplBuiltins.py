@@ -11,6 +11,10 @@ History:    2023-09-07 RSB  Split the former g.py into two files, this one
                             (xplBuiltins.py) containing just functions, and g.py
                             (which continues to contain all of the variables
                             and constants).
+            2026-10-17 RSB  Added the --vmem=mmap and --vmem=ram backends for
+                            random-access FILE()s, and replaced FILE()'s
+                            byte-by-byte copying with slice assignments.
+            2026-10-17 RSB  Added openRandomAccessFiles().
 '''
 
 import sys
@@ -21,6 +25,8 @@ from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 import json
 import math
+import mmap
+import atexit
 import ebcdic
 from virtualenv.create.via_global_ref.builtin import via_global_self_do
 
@@ -43,6 +49,27 @@ scriptParentFolder = str(pathlib.Path(scriptFolder).parent.absolute())
 
 outUTF8 = ("--utf8" in sys.argv[1:])
 
+# The "backend" for the random-access files used by FILE(), which is 
+# selected by the command-line switch --vmem=disk, --vmem=mmap, or --vmem=ram.
+# The name comes from the fact that the most-important of these files is the
+# one that holds the compiler's virtual memory (see the VMEM* modules in 
+# HALINCL/), but the backend applies to all of the random-access files.  For
+# "disk" (the default), every FILE() operation is a seek plus a read or write
+# of the FILEn.bin file.  For "mmap", FILEn.bin is instead memory-mapped, so
+# that FILE() operations are simply copies to or from the mapping, while for
+# "ram" the file's contents are kept entirely in memory (in a bytearray) and
+# FILEn.bin isn't used at all.  The pages being moved in and out of the 
+# compiler's in-memory buffers are the same in all cases, and are still counted
+# (in VMEM_READ_CNT and VMEM_WRITE_CNT of HALINCL/VMEM2.py); they're just much
+# cheaper to move.
+vmemBackend = "disk"
+for parm in sys.argv[1:]:
+    if parm.startswith("--vmem="):
+        vmemBackend = parm[7:]
+if vmemBackend not in ("disk", "mmap", "ram"):
+    print("Unknown --vmem backend: %s" % vmemBackend, file=sys.stderr)
+    sys.exit(1)
+
 
 # Python's native round() function uses a silly method (in the sense that it is
 # unlike the expectation of every programmer who ever lived) called 'banker's
@@ -227,21 +254,32 @@ def openGenericOutputDevice(name, isPDS=False):
         outputDevice["pds"] = {}
     return outputDevice
 
-if "--help" not in sys.argv:
-    # Note that while textual-data files (the "buf" and "pds" files from above)
-    # are handled by the INPUT(...)/OUTPUT(...) mechanism, random-access files
-    # are handled by the entirely-different FILE() method. Thus random-access files
-    # do not appear in inputDevices[] and outputDevices[] above, but rather in
-    # files[] below.  And although all are accessed by "file number", with the 
-    # file numbers overlapping all three of these cases, the individual files of
-    # the same file-number differ essentially entirely.  The entries of the files[] 
-    # array are 3-lists of the open random-access file pointer, the record size, 
-    # and the current file size (in bytes).
+# Note that while textual-data files (the "buf" and "pds" files from above)
+# are handled by the INPUT(...)/OUTPUT(...) mechanism, random-access files
+# are handled by the entirely-different FILE() method. Thus random-access files
+# do not appear in inputDevices[] and outputDevices[] above, but rather in
+# files[] below.  And although all are accessed by "file number", with the 
+# file numbers overlapping all three of these cases, the individual files of
+# the same file-number differ essentially entirely.  The entries of the files[] 
+# array are 4-lists of the open random-access file pointer, the record size, 
+# the current file size (in bytes), and the file's in-memory image (None 
+# for --vmem=disk, an mmap object for --vmem=mmap, or a bytearray for 
+# --vmem=ram).  With --vmem=ram, the file pointer is None.
+# openRandomAccessFiles() is used again by the batch mode of HAL_S_FC.py
+# to give each compilation fresh files (in a different folder).
+def openRandomAccessFiles():
+    global files
     files = [None]
     for i in range(1, 7):
+        if vmemBackend == "ram":
+            files.append([None, 7200, 0, bytearray()])
+            continue
         f = open(scriptParentFolder + "/FILE%d.bin" % i, "w+b")
         f.seek(2, 0)
-        files.append([f, 7200, f.tell()])
+        files.append([f, 7200, f.tell(), None])
+
+if "--help" not in sys.argv:
+    openRandomAccessFiles()
     
 def SHL(a, b):
     return a << b
@@ -801,7 +839,8 @@ def INPUT(fileNumber):
 #    FILE(array, fileNumber, recordNumber)    # For input.
 # In either case, array must be a bytearray of length equal to reclen, where
 # reclen is the record length specified in files[fileNumber] when the file
-# was opened, but no check is performed for that or any other error condition.
+# was opened, but no check is performed for that or any other error condition
+# other than reading past the end of the file.
 def FILE(arg1, arg2, arg3):
     global files
     
@@ -819,21 +858,73 @@ def FILE(arg1, arg2, arg3):
     f = files[fileNumber][0]
     reclen = files[fileNumber][1]
     size = files[fileNumber][2]
-    f.seek(recordNumber * reclen, 0)
+    image = files[fileNumber][3]
+    position = recordNumber * reclen
     if isInput:
-        data = bytearray(f.read(reclen))
-        for i in range(reclen):
-            try:
-                inputArray[i] = data[i]
-            except:
-                print("Incomplete record %d (<%d bytes) from file %s" \
-                      % (recordNumber, reclen, f.name), 
-                      file = sys.stderr)
-                sys.exit(1)
+        if vmemBackend == "disk":
+            f.seek(position, 0)
+            data = f.read(reclen)
+        elif position + reclen <= size:
+            data = memoryview(image)[position : position + reclen]
+        else:
+            data = b""
+        if len(data) < reclen or len(inputArray) < reclen:
+            if f == None:
+                name = "FILE%d (in memory)" % fileNumber
+            else:
+                name = f.name
+            print("Incomplete record %d (<%d bytes) from file %s" \
+                  % (recordNumber, reclen, name), 
+                  file = sys.stderr)
+            sys.exit(1)
+        inputArray[:reclen] = data
         return
-    f.write(outputArray)
-    if f.tell() > size:
-        files[fileNumber][2] = f.tell()
+    end = position + len(outputArray)
+    if vmemBackend == "disk":
+        f.seek(position, 0)
+        f.write(outputArray)
+    else:
+        if image == None or len(image) < end:
+            image = growFileImage(fileNumber, end)
+        image[position : end] = outputArray
+    if end > size:
+        files[fileNumber][2] = end
+
+# Enlarges the in-memory image of a random-access file for --vmem=mmap or
+# --vmem=ram, so that it's at least end bytes long, and returns the enlarged 
+# image.  The size is at least doubled each time, to keep the number of 
+# remappings small.  For --vmem=mmap, the FILEn.bin file itself is extended 
+# (with zeroes) to the new size and then remapped.
+def growFileImage(fileNumber, end):
+    f = files[fileNumber][0]
+    image = files[fileNumber][3]
+    if image == None:
+        oldSize = 0
+    else:
+        oldSize = len(image)
+    newSize = max(end, 2 * oldSize, 16 * files[fileNumber][1])
+    if vmemBackend == "ram":
+        image.extend(bytes(newSize - oldSize))
+        return image
+    if image != None:
+        image.close()
+    f.truncate(newSize)
+    f.flush()
+    image = mmap.mmap(f.fileno(), newSize)
+    files[fileNumber][3] = image
+    return image
+
+# At exit, unmaps the files used with --vmem=mmap and trims each FILEn.bin
+# back to the size it would have had with --vmem=disk.
+def closeFileImages():
+    for entry in files[1:]:
+        if entry[0] != None and entry[3] != None:
+            entry[3].close()
+            entry[3] = None
+            entry[0].truncate(entry[2])
+            entry[0].flush()
+if vmemBackend == "mmap" and "--help" not in sys.argv:
+    atexit.register(closeFileImages)
 
 # For XPL's DATE and TIME 'variables'.  DATE = (1000*(year-1900))+DayOfTheYear,
 # while TIME=NumberOfCentisecondsSinceMidnight.  The timezone isn't specified
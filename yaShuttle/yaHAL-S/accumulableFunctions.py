@@ -12,10 +12,14 @@ References: https://www.ibiblio.org/apollo/hal-s-compiler.html#PALMAT
             [HPG] HAL/S Programmer's Guide.
             [PIH] Programming in HAL/S.
 History:    2023-03-07 RSB  Began.
+            2026-10-17 RSB  Use NumPy, if present, for large ARRAYs.
 """
 
 import math
-from palmatAux import isArrayQuick, printError, NaN, isNaN
+from palmatAux import isArrayQuick, printError, NaN, isNaN, toNumpy, \
+                      getArrayDimensions, numpyPresent
+if numpyPresent:
+    import numpy
 
 accumulableFunctions = ["MAX", "MIN", "PROD", "SUM"]
 fnMAX = accumulableFunctions.index("MAX")
@@ -51,6 +55,27 @@ def accumulate(PALMAT, array, halsFunctionName, source, instruction, \
     
     if initial:
         accumulation = [None]
+        # With NumPy, an entire (large) ARRAY of SCALARs can be done at once.
+        # A NaN result (from inf-inf or 0*inf) is left to the loop below, 
+        # which reports it.
+        if isArrayQuick(array):
+            a = toNumpy(array)
+            if a is not None and a.ndim == len(getArrayDimensions(array)[0]):
+                result = NaN
+                with numpy.errstate(all="ignore"):
+                    if halsFunctionName == "MAX":
+                        result = float(a.max())
+                    elif halsFunctionName == "MIN":
+                        result = float(a.min())
+                    # Accumulated in order, exactly like the loop below, 
+                    # rather than by a.prod() or a.sum(), whose order 
+                    # differs.
+                    elif halsFunctionName == "PROD":
+                        result = float(numpy.multiply.accumulate(a.ravel())[-1])
+                    elif halsFunctionName == "SUM":
+                        result = float(numpy.add.accumulate(a.ravel())[-1])
+                if not isNaN(result):
+                    return result
     
     try:
         if halsFunctionName == "MAX":
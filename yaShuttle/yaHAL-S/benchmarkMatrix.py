@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright:      None - the author (Ron Burkey) declares this software to
+                be in the Public Domain, with no rights reserved.
+Filename:       benchmarkMatrix.py
+Purpose:        Measures the speed at which the interpreter executes a loop
+                of guidance-style VECTOR and MATRIX arithmetic, both with
+                NumPy (if present) and without it.
+History:        2026-10-17 RSB  Created.
+
+Usage:
+    benchmarkMatrix.py [OPTIONS]
+
+The OPTIONS are:
+    --compiler=F    Name of the compiler front-end (as for yaHAL-S-FC.py).
+    --size=N        The width of the VECTORs and MATRIXes.  The default is 3.
+    --iterations=N  The number of times the loop is executed.  The default
+                    is 1000.
+    --repeat=N      Number of times to execute the loop with each method,
+                    the best time being the one reported.  The default is 5.
+
+Only execution of the PALMAT is timed, and not compilation.  Both methods
+must print the same results.  NumPy is used only for the larger sizes, so
+for the default size the two methods should take about the same time.
+"""
+
+import sys
+import io
+import time
+import palmatAux
+from pass1 import parms, stopServer
+from processSource import processSource
+from palmatAux import constructPALMAT, astSourceFile
+from optimizePALMAT import optimizePALMAT
+from linkPALMAT import linkPALMAT
+from executePALMAT import executePALMAT
+
+size = 3
+iterations = 1000
+repeat = 5
+for param in sys.argv[1:]:
+    if param[:11] == "--compiler=":
+        parms["compiler"] = param[11:]
+    elif param[:7] == "--size=":
+        size = int(param[7:])
+    elif param[:13] == "--iterations=":
+        iterations = int(param[13:])
+    elif param[:9] == "--repeat=":
+        repeat = int(param[9:])
+    else:
+        print("Unknown parameter:", param)
+        sys.exit(1)
+
+# A rotation-like MATRIX M, which is repeatedly applied to a MATRIX N and
+# VECTORs V and W, much as guidance code propagates state vectors and
+# transformation matrices.  The cross product exists only for 3-VECTORs.
+if size == 3:
+    unitLine = "   V = UNIT(W * V + V);"
+else:
+    unitLine = "   V = UNIT(W + V);"
+elements = []
+for i in range(size):
+    for j in range(size):
+        if i == j:
+            elements.append("0.5")
+        elif j == i + 1:
+            elements.append("0.25")
+        elif i == j + 1:
+            elements.append("-0.25")
+        else:
+            elements.append("0")
+source = [
+    " DECLARE I INTEGER, X SCALAR, V VECTOR(%d), W VECTOR(%d), " % \
+        (size, size) + \
+        "M MATRIX(%d,%d), N MATRIX(%d,%d);" % (size, size, size, size),
+    " M = MATRIX$(%d, %d)(%s);" % (size, size, ", ".join(elements)),
+    " N = M;",
+    " V = VECTOR$(%d)(%s);" % \
+        (size, ", ".join(str(i + 1) for i in range(size))),
+    " DO FOR I = 1 TO %d;" % iterations,
+    "   N = M N;",
+    "   W = N V;",
+    unitLine,
+    "   X = ABVAL(W) + V . W;",
+    "   N = TRANSPOSE(N) + M;",
+    " END;",
+    " WRITE(6) X, V;"
+]
+
+PALMAT = constructPALMAT()
+fileIndex = astSourceFile(PALMAT, "benchmarkMatrix")
+metadata = []
+for i in range(len(source)):
+    metadata.append({"file": fileIndex, "lineNumber": i + 1})
+success, ast = processSource(PALMAT, source, metadata, macros=[{"@": 0}])
+stopServer()
+if not success:
+    print("Compilation failed.")
+    sys.exit(1)
+optimizePALMAT(PALMAT)
+linkPALMAT(PALMAT)
+
+# Executes the loop repeat times, returning the best time per iteration in
+# seconds, and what the loop printed.
+def benchmark():
+    best = None
+    for i in range(repeat):
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        start = time.perf_counter()
+        executePALMAT(PALMAT, 0, 0, True)
+        elapsed = time.perf_counter() - start
+        printed = sys.stdout.getvalue()
+        sys.stdout = stdout
+        if best == None or elapsed < best:
+            best = elapsed
+    return best / iterations, printed
+
+print("%dx%d, %d iterations, best of %d." % (size, size, iterations, repeat))
+numpyPresent = palmatAux.numpyPresent
+palmatAux.numpyPresent = False
+perIteration, printedWithout = benchmark()
+print("Without NumPy: %8.1f us/iteration" % (1000000 * perIteration))
+if numpyPresent:
+    palmatAux.numpyPresent = True
+    perIterationNumpy, printedWith = benchmark()
+    print("With NumPy:    %8.1f us/iteration" % (1000000 * perIterationNumpy))
+    print("Speedup:       %8.1fx" % (perIteration / perIterationNumpy))
+    if printedWith != printedWithout:
+        print("Results differ!")
+        print(printedWithout, end="")
+        print(printedWith, end="")
+        sys.exit(1)
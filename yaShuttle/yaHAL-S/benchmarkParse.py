@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright:      None - the author (Ron Burkey) declares this software to
+                be in the Public Domain, with no rights reserved.
+Filename:       benchmarkParse.py
+Purpose:        Measures the per-statement latency of compiling HAL/S
+                statements one at a time, as the interpreter does, both with
+                the compiler front-end running in --server mode and with it
+                being run anew for each statement.
+History:        2026-10-17 RSB  Created.
+
+Usage:
+    benchmarkParse.py [OPTIONS] [STATEMENTS.hal]
+
+The OPTIONS are:
+    --compiler=F    Name of the compiler front-end (as for yaHAL-S-FC.py).
+    --repeat=N      Number of times to compile the full set of statements
+                    with each method.  The default is 10.
+
+If a file STATEMENTS.hal is given, each of its non-blank lines is compiled as
+a separate statement, exactly as if it had been typed into the interpreter
+in `STRICT mode; otherwise, a built-in set of typical statements is used.
+Only preprocessing, parsing, and generation of PALMAT are timed, and not
+execution.
+"""
+
+import sys
+import io
+import time
+from pass1 import parms, stopServer, server
+from processSource import processSource
+from palmatAux import constructPALMAT, astSourceFile
+
+statements = [
+    " DECLARE I INTEGER, X SCALAR, V VECTOR(3), M MATRIX(3,3);",
+    " X = 1.5;",
+    " V = VECTOR(1, 2, 3);",
+    " M = MATRIX(1, 0, 0, 0, 1, 0, 0, 0, 1);",
+    " I = I + 1;",
+    " X = SIN(X) ** 2 + COS(X) ** 2;",
+    " V = M V + 2 V;",
+    " IF X > 2 THEN X = 0; ELSE X = X + 1;",
+    " DO FOR I = 1 TO 3; V$(I) = I; END;",
+    " WRITE(6) 'X =', X, 'V =', V;"
+]
+repeat = 10
+for param in sys.argv[1:]:
+    if param[:11] == "--compiler=":
+        parms["compiler"] = param[11:]
+    elif param[:9] == "--repeat=":
+        repeat = int(param[9:])
+    elif param[:1] == "-":
+        print("Unknown parameter:", param)
+        sys.exit(1)
+    else:
+        f = open(param, "r")
+        statements = []
+        for line in f:
+            if line.strip() != "":
+                statements.append(line.rstrip("\n"))
+        f.close()
+
+# Compiles all of the statements, repeat times, each into a fresh PALMAT in
+# the way the interpreter does.  Returns the average time per statement in
+# seconds, and the number of statements which failed to compile.
+def benchmark():
+    elapsed = 0
+    failures = 0
+    for i in range(repeat):
+        PALMAT = constructPALMAT()
+        macros = [{"@": 0}]
+        for statement in statements:
+            fileIndex = astSourceFile(PALMAT, "Interpreter")
+            metadata = [{"file": fileIndex, "lineNumber": 1}]
+            stdout = sys.stdout
+            sys.stdout = io.StringIO()
+            start = time.perf_counter()
+            success, ast = processSource(PALMAT, [statement], metadata,
+                                         macros=macros)
+            elapsed += time.perf_counter() - start
+            sys.stdout = stdout
+            if not success:
+                failures += 1
+    return elapsed / (repeat * len(statements)), failures // repeat
+
+print("%d statements, compiled %d times with each method." % \
+      (len(statements), repeat))
+parms["server"] = False
+perProcess, failures = benchmark()
+print("Process per statement: %8.3f ms/statement (%d failed)" % \
+      (1000 * perProcess, failures))
+parms["server"] = True
+# Don't count the startup of the server.
+processSource(constructPALMAT(), [" ;"], [{"file": None, "lineNumber": 1}])
+perServer, failures = benchmark()
+if server["process"] == None:
+    print("Compiler front-end doesn't support --server; rebuild it.")
+    sys.exit(1)
+print("Persistent server:     %8.3f ms/statement (%d failed)" % \
+      (1000 * perServer, failures))
+print("Speedup:               %8.1fx" % (perProcess / perServer))
+stopServer()
@@ -12,6 +12,9 @@ References: https://www.ibiblio.org/apollo/hal-s-compiler.html#PALMAT
             [HPG] HAL/S Programmer's Guide.
             [PIH] Programming in HAL/S.
 History:    2023-03-08 RSB  Split off from executePALMAT.
+            2026-10-17 RSB  Use NumPy, if present, for products of large
+                            MATRIX values.  Sped up the pure-Python code for
+                            the commonest operations.
 
 What follows is a bunch of functions used with the binaryOperation() function.
 The idea is that if you want to perform an "arrayed operation" -- i.e., you
@@ -26,9 +29,13 @@ indeterminate results due to uninitialized inputs), or else NaN on error.
 
 import math
 import copy
+import operator
 from palmatAux import *
 from unaryFunctions import matrixInverse
 
+# See compatibleArithmetic().
+fastOperators = { "+": operator.add, "-": operator.sub, "": operator.mul }
+
 def identityMatrix(n):
     result = []
     for i in range(n):
@@ -37,6 +44,55 @@ def identityMatrix(n):
         result.append(row)
     return result
 
+# The product of MATRIX a and MATRIX b, with each element summed in the same
+# order as matrixMultiply().  Returns None if matrixMultiply() would fail,
+# on account of a NaN (0*inf) term.
+def numpyMultiply(a, b):
+    result = numpy.zeros((a.shape[0], b.shape[1]))
+    # Overflows just give inf, as in Python, without warnings.
+    with numpy.errstate(all="ignore"):
+        for k in range(a.shape[1]):
+            term = a[:, k:k+1] * b[k:k+1, :]
+            if numpy.isnan(term).any():
+                return None
+            result = result + term
+    return result
+
+# Performs an operation checked by compatibleArithmetic() (see below) using
+# NumPy, if possible, returning the result or else None if not possible.
+# c1 and c2 are as determined by compatibleArithmetic().  Since VECTOR and
+# MATRIX values aren't kept as NumPy arrays, but have to be converted to
+# NumPy and back for every operation, the only operations that gain from 
+# NumPy are MATRIX products and powers, and only for large matrices (see
+# toNumpy()); everything else is left to the pure-Python code.
+# Moreover, only operations whose results are bit-for-bit identical to the
+# pure-Python code are done; thus products are accumulated term by term in
+# the same order as matrixMultiply(), rather than with numpy.matmul(), whose
+# summation order differs.
+def numpyArithmetic(operand1, operand2, c1, c2, opType):
+    if c1 != "matrix" or (opType, c2) not in [("", "matrix!"), 
+                                              ("**", "integer")]:
+        return None
+    a = toNumpy(operand1)
+    if a is None or a.ndim != 2:
+        return None
+    if opType == "":
+        b = toNumpy(operand2)
+        if b is None or b.ndim != 2:
+            return None
+        result = numpyMultiply(a, b)
+    elif operand2 >= 1 and a.shape[0] == a.shape[1]:
+        result = a
+        for i in range(operand2 - 1):
+            result = numpyMultiply(result, a)
+            if result is None:
+                break
+    else:
+        return None
+    if result is None:
+        return None
+    return result.tolist()
+
 # A building block for functions used with used with binaryOperation().  
 # The idea is that you give it the following information:
 #    Two operands (not ARRAY and not STRUCTURE) for the operation.
@@ -111,8 +167,8 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
             for j in range(numCols):
                 s = 0
                 for k in range(numInner):
-                    r = elementary(a[i][k], b[k][j], "")
-                    if isNaN(r):
+                    r = a[i][k] * b[k][j]
+                    if r != r:
                         return NaN
                     if r == None:
                         s = None
@@ -171,21 +227,31 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
     # We now have only compatible operands.  c1 and c2 tell us the operand
     # types, while dimensions1 and dimensions2 tell us the geometries.  Let's
     # perform the operation.
+    if numpyPresent and c1 == "matrix":
+        result = numpyArithmetic(operand1, operand2, c1, c2, opType)
+        if result is not None:
+            return result
+    # Since the operands have passed isVector() or isMatrix(), their elements
+    # are all INTEGER or SCALAR, so the commonest operations can be done by
+    # Python's operators directly, rather than by elementary(), whose 
+    # overhead is most of the cost for small VECTOR and MATRIX operands.  
+    # The results are identical.
+    op = fastOperators.get(opType, elementary)
     result = NaN
     if c1 == "numeric" and c2 == "numeric":
         result = elementary(operand1, operand2)
     elif c1 == "numeric" and c2 == "vector":
         result = []
         for e in operand2:
-            r = elementary(operand1, e)
-            if isNaN(r):
+            r = op(operand1, e)
+            if r != r:
                 return NaN
             result.append(r)
     elif c1 == "vector" and c2 == "numeric":
         result = []
         for e in operand1:
-            r = elementary(e, operand2)
-            if isNaN(r):
+            r = op(e, operand2)
+            if r != r:
                 return NaN
             result.append(r)
     elif c1 == "numeric" and c2 == "matrix":
@@ -193,8 +259,8 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         for oRow in operand2:
             row = []
             for e in oRow:
-                r = elementary(operand1, e)
-                if isNaN(r):
+                r = op(operand1, e)
+                if r != r:
                     return NaN
                 row.append(r)
             result.append(row)
@@ -203,8 +269,8 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         for oRow in operand1:
             row = []
             for e in oRow:
-                r = elementary(e, operand2)
-                if isNaN(r):
+                r = op(e, operand2)
+                if r != r:
                     return NaN
                 row.append(r)
             result.append(row)
@@ -213,16 +279,16 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         for i in range(dimensions1[0]):
             row = []
             for j in range(dimensions2[0]):
-                r = elementary(operand1[i], operand2[j])
-                if isNaN(r):
+                r = op(operand1[i], operand2[j])
+                if r != r:
                     return NaN
                 row.append(r)
             result.append(row)
     elif c1 == "vector" and c2 == "vector!" and opType == ".":
         result = 0
         for i in range(dimensions1[0]):
-            r = elementary(operand1[i], operand2[i], "")
-            if isNaN(r):
+            r = operand1[i] * operand2[i]
+            if r != r:
                 return NaN
             if r == None:
                 result = None
@@ -234,19 +300,19 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         index1 = 1
         index2 = 2
         for i in range(3):
-            r = elementary(operand1[index1], operand2[index2], "")
-            if isNaN(r):
+            r = operand1[index1] * operand2[index2]
+            if r != r:
                 return NaN
             if r == None:
                 result.append(None)
             else:
-                result.append(r - elementary(operand1[index2], operand2[index1], ""))
+                result.append(r - operand1[index2] * operand2[index1])
             index0, index1, index2 = index1, index2, index0
     elif c1 == "vector" and c2 == "vector!":
         result = []
         for i in range(dimensions1[0]):
-            r = elementary(operand1[i], operand2[i])
-            if isNaN(r):
+            r = op(operand1[i], operand2[i])
+            if r != r:
                 return NaN
             result.append(r)
     elif c1 == "matrix" and c2 == "matrix!" and opType == "":
@@ -256,8 +322,8 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         for i in range(dimensions2[1]):
             sum = 0
             for j in range(dimensions1[0]):
-                r = elementary(operand1[j], operand2[j][i])
-                if isNaN(r):
+                r = op(operand1[j], operand2[j][i])
+                if r != r:
                     return NaN
                 if r == None:
                     sum = None
@@ -269,8 +335,8 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         for i in range(dimensions1[0]):
             sum = 0
             for j in range(dimensions1[1]):
-                r = elementary(operand1[i][j], operand2[j])
-                if isNaN(r):
+                r = op(operand1[i][j], operand2[j])
+                if r != r:
                     return NaN
                 if r == None:
                     sum = None
@@ -305,8 +371,8 @@ def compatibleArithmetic(PALMAT, operand1, operand2, opType, compatibility):
         for i in range(dimensions1[0]):
             row = []
             for j in range(dimensions1[1]):
-                r = elementary(operand1[i][j], operand2[i][j])
-                if isNaN(r):
+                r = op(operand1[i][j], operand2[i][j])
+                if r != r:
                     return NaN
                 row.append(r)
             result.append(row)
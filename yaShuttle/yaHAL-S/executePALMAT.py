@@ -12,6 +12,20 @@ References: https://www.ibiblio.org/apollo/hal-s-compiler.html#PALMAT
             [HPG] HAL/S Programmer's Guide.
             [PIH] Programming in HAL/S.
 History:    2023-01-01 RSB  Began.
+            2026-10-17 RSB  Instructions are now lowered by loadPALMAT.py
+                            to numeric opcodes, and executed by handler
+                            functions dispatched via a table, rather than by
+                            a giant if-elif chain on the instruction
+                            dictionaries.
+            2026-10-17 RSB  Jump targets are now normally resolved in
+                            advance by linkPALMAT.py, and identifiers are
+                            bound to their attributes when loaded.
+            2026-10-17 RSB  Cloned PALMATs now share the attributes of
+                            their identifiers with the original PALMAT
+                            until written (copy-on-write).
+            2026-10-17 RSB  Unsubscripted VECTOR and MATRIX values are 
+                            fetched and stored without sliceIt() or 
+                            copy.deepcopy().
 
 I think that this code (unlike my normal code), though perhaps not 
 exactly a walk in the park to brows through it, is reasonably clean.  
@@ -41,27 +55,7 @@ from unaryFunctions import arrayableUnaryRTL, unaryRTL
 from binaryFunctions import arrayableBinaryRTL, binaryRTL
 from accumulableFunctions import accumulate, accumulableFunctions
 from saveValueToVariable import *
-
-'''
-Categorization of the HAL/S built-in functions by the number of arguments
-they take.
-'''
-builtIns = [
-    # No arguments
-    ["CLOCKTIME", "DATE", "ERRGRP", "ERRNUM", "PRIO", "RANDOM", "RANDOMG", 
-     "RUNTIME"],
-    # One argument
-    ["ABS", "CEILING", "FLOOR", "ODD", "ROUND", "SIGN", "SIGNUM", "TRUNCATE",
-     "ARCCOS", "ARCCOSH", "ARCSIN", "ARCSINH", "ARCTAN", "ARCTANH", "COS",
-     "COSH", "EXP", "LOG", "SIN", "SINH", "SQRT", "TAN", "TANH",
-     "ABVAL", "DET", "INVERSE", "TRACE", "TRANSPOSE", "UNIT",
-     "MAX", "MIN", "PROD", "SUM", "LENGTH", "TRIM", "NEXTIME", "SIZE"],
-    # Two arguments
-    ["DIV", "MOD", "REMAINDER", "ARCTAN2", "XOR", "INDEX", "LJUST", "RJUST",
-     "SHL", "SHR"],
-    # Three arguments
-    ["MIDVAL"]
-]
+from loadPALMAT import *
 
 '''
 The following is the guts of a "jump" instruction.  The parameters are:
@@ -95,7 +89,8 @@ This function does two things:
         later.  If it does that, it creates a new key, "symbolicLabel", to 
         preserve the original symbolic label for debugging purposes.  Of course,
         if the compiler or linker did this stuff for us, then the emulator 
-        would not have to do it at all.
+        would not have to do it at all ... and indeed, linkPALMAT() now does,
+        so this is just a fallback for jumps which couldn't be linked.
 '''
 def jump(PALMAT, source, scopeNumber, instructionDict, instructionName):
     si, s = instructionDict[instructionName]
@@ -116,6 +111,15 @@ executePALMAT() function's newInstantiation parameter (see below).  The
 clonePALMAT() function doesn't actually start such a new thread or process,
 but merely creates a cloned PALMAT structure suitable for it, and then 
 returns it.
+
+The clone is copy-on-write:  each of its (non-COMPOOL) scopes gets its own
+"identifiers" dictionary, but the attributes of the identifiers in it (and
+thus their values) remain shared with rawPALMAT until the clone first writes
+to them, at which point writableAttributes() (see below) gives the clone its
+own copy.  So the cost of the cloning doesn't depend on how much data the
+program has, but only on how much of it the new process/thread changes.  The
+clone's "cloneOf" key is rawPALMAT, which is what tells writableAttributes()
+what's still shared.
 '''
 instantiationNumber = 0
 def clonePALMAT(rawPALMAT):
@@ -123,15 +127,15 @@ def clonePALMAT(rawPALMAT):
     instantiationNumber += 1
     scopeIndex = 0
     
-    # For the specified scope, make sure its identifiers are a deep copy
-    # rather than a shallow copy.  Except for COMPOOLs.
-    def deepcopyDescendents(scopeIndex):
+    # For the specified scope, make sure its identifiers are a shallow copy
+    # rather than the same dictionary.  Except for COMPOOLs.
+    def copyDescendents(scopeIndex):
         rawScope = rawPALMAT["scopes"][scopeIndex]
         scope = PALMAT["scopes"][scopeIndex]
         if rawScope["type"] != "compool":
-            scope["identifiers"] = copy.deepcopy(rawScope["identifiers"])
+            scope["identifiers"] = copy.copy(rawScope["identifiers"])
         for childIndex in scope["children"]:
-            deepcopyDescendents(childIndex)
+            copyDescendents(childIndex)
     
     # After the following operation, both PALMAT and PALMAT["scopes"] are
     # entirely new, but each of the individual scopes PALMAT["scopes"][i]
@@ -140,14 +144,34 @@ def clonePALMAT(rawPALMAT):
     # and its descendents.
     PALMAT = { 
         "scopes": [],
-        "instantiation": instantiationNumber
+        "instantiation": instantiationNumber,
+        "cloneOf": rawPALMAT
         }
     for scope in rawPALMAT["scopes"]:
         PALMAT["scopes"].append(copy.copy(scope))
-    # Now correct the shallowly-copied indentifiers to deep copies where needed.
-    deepcopyDescendents(scopeIndex)
+    # Now give the clone its own identifier dictionaries where needed.
+    copyDescendents(scopeIndex)
     return PALMAT
 
+# Must be called before modifying the attributes (usually, the "value") of 
+# a variable, where si and mangledIdentifier are the variable's scope and
+# identifier, and attributes are the attributes found for it.  If the PALMAT
+# being executed is a clone (see clonePALMAT()) still sharing those attributes
+# with the PALMAT from which it was cloned, the attributes are copied and the
+# copy is returned.  Otherwise, the attributes are returned unchanged.
+def writableAttributes(vm, si, mangledIdentifier, attributes):
+    rawPALMAT = vm["cloneOf"]
+    if rawPALMAT == None:
+        return attributes
+    identifiers = vm["scopes"][si]["identifiers"]
+    rawIdentifiers = rawPALMAT["scopes"][si]["identifiers"]
+    if identifiers is rawIdentifiers or \
+            rawIdentifiers.get(mangledIdentifier) is not attributes:
+        return attributes
+    attributes = copy.deepcopy(attributes)
+    identifiers[mangledIdentifier] = attributes
+    return attributes
+
 # For WRITE statements.
 def printVectorOrMatrix(vOrM):
     if isinstance(vOrM, list):
@@ -271,6 +295,8 @@ were used.  No conversions are performed.  Returns NaN on failure.
 def sliceIt(object, subscripts):
     if not isinstance(object, list) or isBitArray(object):
         if len(subscripts) == 0:
+            if object == None or isinstance(object, (int, float, str)):
+                return object
             return copy.deepcopy(object)
         else: # Too many subscripts for the object.
             return NaN
@@ -466,6 +492,1441 @@ def getAttributes(PALMAT, scopeIndex, qualifications, identifier):
     except:
         return None
 
+#-----------------------------------------------------------------------------
+# The emulator proper.
+#
+# The state of the emulated machine is kept in a dictionary, "vm", created by
+# executePALMAT() below, having the following keys:
+#     "PALMAT"          The PALMAT structure being executed.
+#     "cloneOf"         If PALMAT is a clone, the PALMAT it was cloned
+#                       from, or else None.  See writableAttributes().
+#     "scopes"          PALMAT["scopes"].
+#     "loaded"          A dictionary, indexed by scope number, of the
+#                       instruction lists of those scopes lowered by
+#                       loadScope() (see loadPALMAT.py).  Scopes are lowered
+#                       only as they're first entered.
+#     "scopeNumber"     The index of the scope currently being executed.
+#     "scope"           PALMAT["scopes"][vm["scopeNumber"]].
+#     "code"            vm["loaded"][vm["scopeNumber"]].
+#     "index"           The offset in the current scope of the next
+#                       instruction to be executed.  This is kept up to
+#                       date only while executing the "special"
+#                       instructions (see loadPALMAT.py).
+#     "stack"           The computation stack.
+#     "source"          The most-recently encountered "source" field.
+#     "qualifications"  Structure qualifications, subscripts, and the
+#     "subscripts"      concatenation of the latter two (respectively)
+#     "subscripts2"     produced by the instruction preceding the one being
+#     "fullSubscripts"  executed.  These persist only for a single
+#                       instruction.
+#     "pending"         None, or else (qualifications, subscripts,
+#                       subscripts2) produced by the instruction being
+#                       executed, for use by the next one.
+#     "indent"          Indentation for WRITE output.
+#     "timeOrigin"      For RUNTIME.
+#     "errorGroup"      For ERRGRP.
+#     "errorNum"        For ERRNUM.
+#
+# Each PALMAT instruction is executed by a handler function of the form
+# xeqXXXX(vm, operand, instruction), where operand is the pre-digested
+# operand provided by loadPALMAT.py and instruction is the original PALMAT
+# instruction.  The handlers are dispatched via the handlers[] table, indexed
+# by opcode.  A handler returns False if emulation is to end (normally due
+# to an error), and otherwise returns nothing.
+
+# Transfer control to a given offset in a given scope.
+def transfer(vm, scopeNumber, instructionIndex):
+    scope = vm["scopes"][scopeNumber]
+    loaded = vm["loaded"]
+    if scopeNumber not in loaded:
+        # In a clone, the identifiers' attributes may be replaced by
+        # writableAttributes(), so they can't be bound in advance.
+        loaded[scopeNumber] = loadScope(vm["scopes"], scopeNumber, \
+                                        vm["cloneOf"] == None)
+    vm["scopeNumber"] = scopeNumber
+    vm["scope"] = scope
+    vm["code"] = loaded[scopeNumber]
+    vm["index"] = instructionIndex
+
+# Shared by the handlers for "goto", "iffalse", and "iftrue".  The operand
+# of these instructions, as provided by loadPALMAT.py, is a list of the form
+# [instructionName, target], where target is None if the jump wasn't linked,
+# until the first time the jump is taken.
+def xeqJump(vm, operand, instruction):
+    target = operand[1]
+    if target == None:
+        target = jump(vm["PALMAT"], vm["source"], vm["scopeNumber"], \
+                      instruction, operand[0])
+        if target == None:
+            return False
+        operand[1] = target
+    transfer(vm, target[0], target[1])
+
+def xeqNoop(vm, operand, instruction):
+    pass # Nothing to do!
+
+def xeqEmpty(vm, operand, instruction):
+    vm["stack"].append(None)
+
+def xeqFill(vm, operand, instruction):
+    vm["stack"].append({"fill"})
+
+# "string", "boolean", "number", "vector", "matrix", and "array".
+def xeqPush(vm, operand, instruction):
+    vm["stack"].append(operand)
+
+def xeqStringifiedNumber(vm, operand, instruction):
+    vm["stack"].append(stringifiedToFloat(operand))
+
+def xeqSentinel(vm, operand, instruction):
+    vm["stack"].append({"sentinel"})
+
+def xeqPartition(vm, operand, instruction):
+    vm["stack"].append({"semicolon"})
+
+# "+><"
+def xeqIncrementAndTest(vm, operand, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    si, dummy, identifier, attributes = operand
+    if len(computationStack) < 2:
+        printError(PALMAT, source, instruction, \
+                "Implementation error, not enough operands for '+><'.")
+        return False
+    operand1 = computationStack.pop()
+    negativeIncrement = (operand1 < 0)
+    operand2 = computationStack[-1]
+    if attributes == None:
+        attributes = PALMAT["scopes"][si]["identifiers"][identifier]
+    attributes = writableAttributes(vm, si, identifier, attributes)
+    if attributes == None:
+        printError(PALMAT, source, instruction, \
+            "Implementation error, variable (%s) not found." \
+              % identifier[1:-1])
+        return False
+    if "integer" not in attributes and "scalar" not in attributes:
+        printError(PALMAT, source, instruction, \
+                   "Implementation error in '+><': Not a number.")
+        return False
+    if "value" not in attributes:
+        printError(PALMAT, source, instruction, \
+            "Implementation error in '+><': Uninitialized variable.")
+        return False
+    operand1 += attributes["value"]
+    if "integer" in attributes:
+        attributes["value"] = hround(operand1)
+    else:
+        attributes["value"] = operand1
+    if negativeIncrement:
+        computationStack[-1] = convertToBitArray(operand1 < operand2)
+    else:
+        computationStack[-1] = convertToBitArray(operand1 > operand2)
+
+# Operator "#".
+def xeqRepeat(vm, operator, instruction):
+    computationStack = vm["stack"]
+    if len(computationStack) < 2:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+            ("\tImplementation error, not enough operands " + \
+            "for operator \"%s\"") % operator)
+        return False
+    operand1 = hround(computationStack.pop())
+    # Recall that if a single item is being repeated, it is present
+    # as itself, but if a group of items are being repeated then
+    # that group appears on the computation stack in the form of
+    # a single item because the group is wrapped in [(...)].  That
+    # particular wrapping is chosen because it's distinguishable
+    # from VECTOR, MATRIX, and ARRAY.
+    if computationStack[-1] == {'sentinel'}:
+        computationStack.pop()
+        operands2 = [None]
+    else:
+        operands2 = []
+        while True:
+            value = computationStack.pop()
+            if value == {'sentinel'}:
+                break
+            flatten(value, operands2)
+    while operand1 > 0:
+        # I want to insert all the elements in operands2 into
+        # computation stack.  If I use the list .extend method
+        # for this, I find they end up in reversed order, so I
+        # want to do the insertion at the beginning rather than
+        # at the end.  I want to do this in place, without
+        # creating a new computationStack object.
+        #computationStack.extend(operands2)
+        #computationStack[0:0] = operands2
+        computationStack.extend(reversed(operands2))
+        operand1 -= 1
+
+# Operator "dotted".
+def xeqDotted(vm, operator, instruction):
+    # Structure qualifications.  These are the strings "A", "B", "C"
+    # in structure refrences like A.B.C.X.
+    computationStack = vm["stack"]
+    q = []
+    while True:
+        value = computationStack.pop()
+        if value == {"sentinel"}:
+            break
+        q[0:0] = [value] # Insert the qualification at position 0.
+    vm["pending"] = (q, [], [])
+
+# Operator "subscripts".
+def xeqSubscripts(vm, operator, instruction):
+    computationStack = vm["stack"]
+    subscripts = []
+    subscripts2 = []
+    s = subscripts
+    while True:
+        value = computationStack.pop()
+        if value == {"sentinel"}:
+            break
+        if value == {"semicolon"}:
+            s = subscripts2
+            continue
+        s.append(value)
+    if len(subscripts + subscripts2) < 1:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                   "Subscript operator without subscripts.")
+        return False
+    vm["pending"] = ([], subscripts, subscripts2)
+
+# Operators "U-" and "NOT".
+def xeqUnary(vm, operator, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if len(computationStack) < 1:
+        printError(PALMAT, source, instruction, \
+            ("\tImplementation error, not enough operands " + \
+            "for operator \"%s\"") % operator)
+        return False
+    operand = computationStack[-1]
+    #arrayDim, v = getArrayDimensions(operand)
+    #isi,iss,isv,ism = checkArithmeticalDatatype(v)
+    #isn = isi or iss
+    if operator == "U-":
+        result = arrayableUnaryRTL(PALMAT, "Negation", operand, \
+                                   source, instruction)
+        if isNaN(result):
+            return False
+    elif operator == "NOT":
+        if not isBitArray(operand):
+            printError(PALMAT, source, instruction, \
+                       "Not bit array: " + operand)
+            return False
+        value, length = parseBitArray(operand)
+        result = formBitArray(~value, length)
+    else:
+        printError(PALMAT, source, instruction, \
+                ("Implementation error, unary operator (%s) " + \
+               "not yet implemented") % operator)
+        return False
+    computationStack[-1] = result
+
+comparisonOperators = ("==", "!=", "<", ">", "<=", ">=")
+
+# Binary operators.
+def xeqBinary(vm, operator, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if len(computationStack) < 2:
+        printError(PALMAT, source, instruction, \
+            ("Implementation error, not enough operands " + \
+            "for operator \"%s\"") % operator)
+        return False
+    result = None
+    operand1 = computationStack[-1]
+    operand2 = computationStack[-2]
+    computationStack.pop()
+    computationStack[-1] = None
+    if operator in comparisonOperators and \
+            (not isCompletelyInitialized(operand1) or \
+             not isCompletelyInitialized(operand2)):
+        printError(PALMAT, source, instruction, \
+            "Cannot compare uninitialized values")
+        return False
+    # Common arithmetical operators ... both arrayed and
+    # non-arrayed operations.
+    if operator in binaryRTL:
+        result = arrayableBinaryRTL(PALMAT, operator, operand1, \
+                                    operand2, \
+                                    source, instruction)
+        if isNaN(result):
+            return False
+    else:
+        if operator == "C||": # string concatenation.
+            result = operand1 + operand2
+        elif operator in ["AND", "OR", "ORNOT", "B|N" ]:
+            if not isBitArray(operand1):
+                printError(PALMAT, source, instruction, \
+                           "Not bit array: " + str(operand1))
+                return False
+            if not isBitArray(operand2):
+                printError(PALMAT, source, instruction, \
+                           "Not bit array: " + str(operand2))
+                return False
+            value1, length1 = parseBitArray(operand1)
+            value2, length2 = parseBitArray(operand2)
+            if operator == "OR":
+                numbits = min(length1, length2)
+                result = formBitArray(value1 | value2, numbits)
+            elif operator == "AND":
+                numbits = min(length1, length2)
+                result = formBitArray(value1 & value2, numbits)
+            elif operator == "ORNOT":
+                numbits = min(length1, length2)
+                result = formBitArray(value1 | ~value2, numbits)
+            elif operator == "B||":
+                numbits = length1 + length2
+                result = formBitArray((value1 << length2) | value2,\
+                                       numbits)
+        elif operator == "==":
+            result = \
+                convertToBitArray(isEqualTo(operand1, operand2))
+        elif operator == "!=":
+            result = \
+                convertToBitArray(not isEqualTo(operand1, operand2))
+        elif operator == "<":
+            result = convertToBitArray(operand1 < operand2)
+        elif operator == ">":
+            result = convertToBitArray(operand1 > operand2)
+        elif operator == "<=":
+            result = convertToBitArray(operand1 <= operand2)
+        elif operator == ">=":
+            result = convertToBitArray(operand1 >= operand2)
+        elif operator == ".":
+            if isv1 and isv2 \
+                    and len(operand1) == len(operand2):
+                result = 0
+                for i in range(len(operand1)):
+                    result += operand1[i] * operand2[i]
+        elif operator == "*":
+            if isv1 and isv2 \
+                    and len(operand1) == 3 and len(operand2) == 3:
+                result = [
+                    operand1[1]*operand2[2]-operand1[2]*operand2[1],
+                    operand1[2]*operand2[0]-operand1[0]*operand2[2],
+                    operand1[0]*operand2[1]-operand1[1]*operand2[0]
+                    ]
+            else:
+                printError(PALMAT, source, instruction, \
+                    "Operands of * must be initialized 3-vectors.")
+                return False
+        else:
+            printError(PALMAT, source, instruction, \
+                ("Implementation error, binary operator \"%s\" " + \
+                "not yet implemented") % operator)
+            return False
+        if result == None:
+            printError(PALMAT, source, instruction, \
+                       "Uninitialized values in expression.")
+            return False
+    computationStack[-1] = result
+
+def xeqUnknownOperator(vm, operator, instruction):
+    printError(vm["PALMAT"], vm["source"], instruction, \
+               "Unknown operator \"%s\"" % operator)
+
+'''
+Find the attributes of the variable referenced by a "fetch", "unravel",
+"fetchp", "store", "storepop", "substore", or "substorepop" instruction,
+taking into account procedure-parameter aliases and any pending structure
+qualifications.  The operand is of the form (scopeIndex, identifier,
+mangledIdentifier).  Returns (scopeIndex, mangledIdentifier, attributes)
+for the variable actually referenced, or else None on error.
+'''
+def locateVariable(vm, operand, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    si, identifier, mangled, attributes = operand
+    if si == -1:
+        dummyScope = vm["scope"]
+        while si == -1:
+            '''
+            If si == -1, then the variable being assigned is itself a
+            local alias in a procedure call.  So we have to seek upstream
+            to find the variable to which it's actually referring.
+
+            The reason we're in a "while si" rather than an "if si" is that
+            we may have *nested* procedure calls, so once we find the
+            upstream variable to which our alias refers, it may itself be
+            an alias for another variable upstream of the calling code
+            (which may be a scope that's not necessarily an ancestor of
+            the procedure's scope), and so on.
+            '''
+            while "assignments" not in dummyScope:
+                if dummyScope["parent"] == None:
+                    printError(PALMAT, source, instruction, \
+                               "Cannot find identifier " + identifier)
+                    return None
+                dummyScope = PALMAT["scopes"][dummyScope["parent"]]
+            if identifier not in dummyScope["assignments"]:
+                printError(PALMAT, source, instruction, \
+                    ("Identifier \"%s\" " + \
+                    "not found") % identifier[1:-1])
+                return None
+            si, identifier = dummyScope["assignments"][identifier]
+            if si == -1:
+                if "return" not in dummyScope:
+                    printError(PALMAT, source, instruction, \
+                        "Cannot trace nested assignments (%s in %s)" % \
+                        (identifier, dummyScope["name"]))
+                    return None
+                dummyScope = PALMAT["scopes"][dummyScope["return"][0]]
+        mangled = "^" + identifier + "^"
+        attributes = None
+    qualifications = vm["qualifications"]
+    try:
+        if len(qualifications) == 0:
+            if attributes == None:
+                attributes = PALMAT["scopes"][si]["identifiers"][mangled]
+        else:
+            attributes = getAttributes(PALMAT, si, qualifications, mangled)
+        if attributes == None:
+            raise Exception("Problem fetching attributes")
+    except:
+        printError(PALMAT, source, instruction, \
+                   "Undiagnosed problem with PALMAT instruction")
+        print("\t\tnum scopes =", len(PALMAT["scopes"]))
+        print("\t\ttype of si =", type(si))
+        print("\t\tscope number =", si, " identifier =", mangled)
+        print("\t\tidentifiers =", PALMAT["scopes"][si]["identifiers"])
+        print("\t\tqualifications =", qualifications)
+        return None
+    return si, mangled, attributes
+
+# "fetch" and "unravel".
+def xeqFetch(vm, operand, instruction, unravel=False):
+    # Short-cut for the commonest case, an unsubscripted INTEGER, SCALAR, or
+    # CHARACTER variable, for which sliceIt() would just return the value
+    # itself.
+    attributes = operand[3]
+    if attributes != None and not unravel and \
+            len(vm["qualifications"]) == 0 and len(vm["fullSubscripts"]) == 0:
+        if "constant" in attributes:
+            value = attributes["constant"]
+        else:
+            value = attributes.get("value", NaN)
+        valueType = type(value)
+        if valueType is int or valueType is str or \
+                (valueType is float and value == value):
+            vm["stack"].append(value)
+            return
+        # Likewise for an unsubscripted VECTOR or MATRIX.
+        if valueType is list:
+            copied = copyVectorOrMatrix(value)
+            if copied is not None:
+                vm["stack"].append(copied)
+                return
+    located = locateVariable(vm, operand, instruction)
+    if located == None:
+        return False
+    si, identifier, attributes = located
+    fullSubscripts = vm["fullSubscripts"]
+    #print("!!", attributes)
+    if "constant" in attributes:
+        value = sliceIt(attributes["constant"], fullSubscripts)
+    else:
+        value = sliceIt(attributes["value"], fullSubscripts)
+    if isNaN(value):
+        printError(vm["PALMAT"], vm["source"], instruction, \
+            "Slicing error %s%s." % (identifier, str(fullSubscripts)))
+        return False
+    if unravel:
+        onto = []
+        flatten(value, onto)
+        vm["stack"].extend(reversed(onto))
+    else:
+        vm["stack"].append(value)
+
+def xeqUnravel(vm, operand, instruction):
+    return xeqFetch(vm, operand, instruction, True)
+
+def xeqFetchp(vm, operand, instruction):
+    located = locateVariable(vm, operand, instruction)
+    if located == None:
+        return False
+    si, identifier, attributes = located
+    vm["stack"].append( [si, identifier, 'p'] )
+
+# "store", "storepop", "substore", and "substorepop".
+def xeqStore(vm, operand, instruction, pop=False, lhsSubscripts=False):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    stackPos = 1
+    lhsSubscriptList = []
+    if lhsSubscripts:
+        subscript = computationStack.pop()
+        while subscript != {"sentinel"}:
+            if subscript != {"semicolon"}:
+                lhsSubscriptList.append(subscript)
+            subscript = computationStack.pop()
+    located = locateVariable(vm, operand, instruction)
+    if located == None:
+        return False
+    si, identifier, attributes = located
+    attributes = writableAttributes(vm, si, identifier, attributes)
+    if len(computationStack) < stackPos:
+        printError(PALMAT, source, instruction, \
+                   "Implementation error, stack too short for " +
+                   "STOREXXX instruction")
+        return False
+    value = computationStack[-stackPos]
+    if value != None and not isinstance(value, (int, float, str)):
+        copied = copyVectorOrMatrix(value)
+        if copied is None:
+            copied = copy.deepcopy(value)
+        value = copied
+    if pop:
+        computationStack.pop(-stackPos)
+    if "constant" in attributes:
+        printError(PALMAT, source, instruction, \
+                   "Cannot change value of constant %s." \
+                   % identifier[1:-1])
+        return False
+    if True:
+        if "array" in attributes and "parameter" in attributes \
+                and len(attributes["array"]) == 1 and \
+                isArrayQuick(value) and \
+                len(getArrayDimensions(value)[0]) == 1 and \
+                (attributes["array"][0] == "*" \
+                 or "flex" in attributes):
+            attributes["value"] = value
+            attributes["array"], dummy = getArrayDimensions(value)
+            attributes["flex"] = True
+        # This is my new, possibly-improved method.
+        elif not saveValueToVariable(PALMAT, source, value, \
+                                   identifier[1:-1], \
+                                   attributes, \
+                                   lhsSubscriptList):
+            return False
+    else:
+        # This my original, incomplete, imperfect method.
+        # Apply conversions to the data as necessary, if the datatype
+        # found on the computation stack was not precisely what the
+        # variable being assigned expects.
+        dimensions = []
+        if value == None:
+            pass
+        elif isinstance(value, str):
+            if "character" not in attributes:
+                printError(PALMAT, source, instruction, \
+                           "Cannot store string in non-CHARACTER " +
+                           "variable %s." % identifier[1:-1])
+                return False
+            maxlen = attributes["character"]
+            value = value[:maxlen]
+        elif isinstance(value, (float, int)):
+            if "integer" in attributes:
+                value = hround(value)
+            elif "scalar" in attributes or \
+                    ("vector" in attributes and len(lhsSubscriptList) == 1) or \
+                    ("matrix" in attributes and len(lhsSubscriptList) == 2):
+                value = float(value)
+            elif "bit" in attributes:
+                value = hround(value) & ((1 << attributes["bit"])-1)
+            elif "character" in attributes:
+                # TBD
+                printError(PALMAT, source, instruction, \
+                    "Storing number in CHARACTER not yet implemented.")
+                value = "?"
+        elif isBitArray(value) and "bit" in attributes:
+            value = formBitArray(parseBitArray(value)[0], \
+                                 attributes["bit"])
+        elif isVector(value, False) and "vector" in attributes \
+                and not lhsSubscripts:
+            numRows = len(value)
+            dimensions = [numRows]
+            if numRows != attributes["vector"]:
+                printError(PALMAT, source, instruction, \
+                        "Vector length mismatch in store operation: " \
+                        + identifier[1:-1])
+                return False
+        elif isMatrix(value, False) and "matrix" in attributes \
+                and not lhsSubscripts:
+            dimensions = [len(value), len(value[0])]
+            if dimensions != attributes["matrix"]:
+                printError(PALMAT, source, instruction, \
+                    "Matrix geometry mismatch in store operation: " + \
+                    identifier[1:-1])
+                return False
+        elif "array" in attributes:
+            dimensions = attributes["array"]
+            if not lhsSubscripts and \
+                    not isArrayGeometry(value, dimensions):
+                printError(PALMAT, source, instruction, \
+                        "Array geometry wrong in store operation: " \
+                        + identifier[1:-1])
+                return False
+        else:
+            printError(PALMAT, source, instruction, \
+                       "Mismatched datatypes in instruction: %s vs %s" \
+                       % (str(instruction), str(value)))
+            return False
+        if lhsSubscriptList == []:
+            if "bit" in attributes and not isBitArray(value):
+                value = formBitArray(value, attributes["bit"])
+            elif "character" in attributes and \
+                    "array" not in attributes and \
+                    "vector" not in attributes and \
+                    "matrix" not in attributes:
+                value = str(value)[:attributes["character"]]
+            attributes["value"] = value
+        else:
+            if "array" in attributes:
+                sdimensions = attributes["array"]
+            elif "vector" in attributes:
+                sdimensions = [attributes["vector"]]
+            elif "matrix" in attributes:
+                sdimensions = attributes["matrix"]
+            else:
+                sdimensions = []
+            if dimensions != sdimensions[len(lhsSubscriptList):]:
+                printError(PALMAT, source, instruction, \
+                           "Dimensionality mismatch in assignment.")
+                return False
+            if len(lhsSubscriptList) != len(sdimensions):
+                printError(PALMAT, source, instruction, \
+                        "Dimensionality of value and variable differ.")
+                return False
+            for i in range(len(dimensions)):
+                if lhsSubscriptList[i] < 1 or \
+                        lhsSubscriptList[i] > dimensions[i]:
+                    printError(PALMAT, source, instruction, \
+                               "Subscript out of range in assignment")
+                    return False
+            # Recall that in python, the following manipulations of 
+            # "row" operate on pointers.  So the final "row" we end up 
+            # with is actually a pointer to a stored row existing 
+            # already in the VECTOR, MATRIX, or ARRAY variable.
+            # Recall also that HAL/S indexes from 1 while Python indexes
+            # from 0.  Recall finally that even uninitialized composite
+            # data in our HAL/S scopes have the proper dimensionality,
+            # but with unused elements set to None, so the sought row
+            # does actually exist.
+            row = attributes["value"]
+            for i in range(len(dimensions)-1):
+                row = row[lhsSubscriptList[i]-1]
+            row[lhsSubscriptList[-1]-1] = value
+
+def xeqStorepop(vm, operand, instruction):
+    return xeqStore(vm, operand, instruction, True)
+
+def xeqSubstore(vm, operand, instruction):
+    return xeqStore(vm, operand, instruction, False, True)
+
+def xeqSubstorepop(vm, operand, instruction):
+    return xeqStore(vm, operand, instruction, True, True)
+
+def xeqPop(vm, value, instruction):
+    computationStack = vm["stack"]
+    stackSize = len(computationStack)
+    if value <= stackSize:
+        while value > 0:
+            computationStack.pop()
+            value -= 1
+    else:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+            "Implementation error, too many POPs: %d vs %d" \
+            % (value, stackSize))
+        return False
+
+def xeqRead(vm, lun, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if lun == '5':
+        # If this instruction is within a subroutine, then we can
+        # only regress in the computation stack until finding the
+        # return address, because we want to use that later (for
+        # returning!) rather than using it now for printing.
+        start = 0
+        for i in range(len(computationStack)-1, -1, -1):
+            entry = computationStack[i]
+            if isinstance(entry, list) and len(entry) == 3 and \
+                    isinstance(entry[0], int) and \
+                    isinstance(entry[1], str) and \
+                    entry[2] == 'p':
+                continue
+            start = i + 1
+            break
+        if start < len(computationStack):
+            semicolon = False
+            for value in computationStack[start:]:
+                if semicolon:
+                    break
+                # In reality, we could have subscripted VECTOR, MATRIX,
+                # or ARRAY variables here. For now, I'm just ignoring
+                # that possibility and implementing unsubscripted
+                # variables.
+                # Recall that "pointers" to variables, which is what
+                # should be on the computation stack at this point,
+                # are of the form [index, identifier, 'p'].
+                si = value[0]
+                identifier = value[1]
+                attributes = \
+                    PALMAT["scopes"][si]["identifiers"][identifier]
+                attributes = writableAttributes(vm, si, identifier, \
+                                                attributes)
+                if "vector" in attributes:
+                    rowLength = attributes["vector"]
+                    for i in range(rowLength):
+                        value = readItemLUN5(PALMAT, source)
+                        if value == ";":
+                            semicolon = True
+                            break
+                        if value == "":
+                            continue
+                        attributes["value"][i] = float(value)
+                elif "matrix" in attributes:
+                    numRows, numCols = attributes["matrix"]
+                    for i in range(numRows):
+                        if semicolon:
+                            break
+                        for j in range(numCols):
+                            value = readItemLUN5(source)
+                            if value == ";":
+                                semicolon = True
+                                break
+                            if value == "":
+                                continue
+                            attributes["value"][i][j] = float(value)
+                elif "integer" in attributes:
+                    value = readItemLUN5(source)
+                    if value == ";":
+                        semicolon = True
+                    elif value == "":
+                        attributes["value"] == None
+                    else:
+                        attributes["value"] = int(value)
+                elif "scalar" in attributes:
+                    value = readItemLUN5(source)
+                    if value == ";":
+                        semicolon = True
+                    elif value == "":
+                        attributes["value"] == None
+                    else:
+                        attributes["value"] = float(value)
+                elif "bit" in attributes:
+                    value = readItemLUN5(PALMAT, source)
+                    bitLength = attributes["bit"]
+                    if value == ";":
+                        semicolon = True
+                    elif value == "":
+                        attributes["value"] == [(None, bitLength)]
+                    else:
+                        value = int(value) & ((1 << bitLength) - 1)
+                        attributes["value"] = [(value, bitLength)]
+        while len(computationStack) > start:
+            computationStack.pop()
+
+def xeqWrite(vm, lun, instruction):
+    computationStack = vm["stack"]
+    if lun == '6':
+        print("%*s" % (vm["indent"], ""), end="")
+        for value in computationStack:
+            if value == None:
+                print(" None ", end="")
+            elif isArrayQuick(value):
+                printArray(value)
+            elif isBitArray(value):
+                print(" " + bin(parseBitArray(value)[0])[2:], end="")
+            elif isinstance(value, (int, float, list)):
+                printVectorOrMatrix(value)
+            elif isinstance(value, str):
+                print(value.replace("''", "'"), end="")
+            else:
+                print(value, end="")
+        computationStack.clear()
+        print()
+
+def xeqIocontrol(vm, operand, instruction):
+    # We just ignore all i/o controls in WRITE for now.
+    if len(vm["stack"]) > 0:
+        vm["stack"].pop()
+
+def xeqSliceAT(vm, shapingFunction, instruction):
+    computationStack = vm["stack"]
+    sliceLength = hround(computationStack.pop())
+    sliceStart = hround(computationStack[-1])
+    computationStack[-1] = [sliceLength, sliceStart]
+
+def xeqSliceTO(vm, shapingFunction, instruction):
+    computationStack = vm["stack"]
+    sliceStart = hround(computationStack.pop())
+    sliceEnd = hround(computationStack[-1])
+    computationStack[-1] = (sliceStart, sliceEnd)
+
+# The shaping functions INTEGER, SCALAR, VECTOR, MATRIX, and their DOUBLE
+# variants.
+def xeqShape(vm, shapingFunction, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    subscripts = vm["subscripts"]
+    subscripts2 = vm["subscripts2"]
+    dimensions = subscripts + subscripts2
+    if len(dimensions) == 0:
+        if shapingFunction in ["vector", "doublevector"]:
+            dimensions.append(3)
+        elif shapingFunction in ["matrix", "doublematrix"]:
+            dimensions.append(3)
+            dimensions.append(3)
+    # We now have the dimensionality, so let's create a Python
+    # object to hold the data.  If the dimension list is empty,
+    # there are a number of special cases (presumably originally
+    # intended as convenience features for the code) that we need
+    # to consider.
+    if len(dimensions) == 0:
+            # The shaping function has no subscripts, and the
+            # shaping function is integer or scalar, single or
+            # double precision, though in this Python implementation
+            # single and double precision are treated as identical.
+            object = []
+            operand = computationStack.pop()
+            if computationStack[-1] == {"sentinel"}:
+                # If we're here, it's because there's a single
+                # argument to the shaping function, currently
+                # stored in operand.
+                computationStack[-1] = \
+                    toIntegerOrScalar(operand, \
+                                      shapingFunction in \
+                                      ["integer", "doubleinteger"])
+            else:
+                # If we're here, then there are multiple arguments
+                # to the shaping functions, none of which we've yet
+                # pulled from the stack and we're supposed to
+                # produce a variable-length ARRAY by unraveling all
+                # of the arguments.
+                fill = False # TBD ... *do* something with fill!
+                while operand != {"sentinel"}:
+                    if operand == {"fill"}:
+                        fill = True
+                        operand = computationStack.pop()
+                        continue
+                    flatten(operand, object)
+                    operand = computationStack.pop()
+                if shapingFunction in ["integer", "doubleinteger"]:
+                    for i in range(len(object)):
+                        if object[i] != None:
+                            object[i] = int(object[i])
+                elif shapingFunction in ["scalar", "doublescalar"]:
+                    for i in range(len(object)):
+                        if object[i] != None:
+                            object[i] = float(object[i])
+                computationStack.append(object + ["a"])
+            return
+    '''
+    So if we've gotten to here, then the object we're trying to
+    construct has dimensionality; i.e., it's one of VECTOR,
+    MATRIX, ARRAY INTEGER|SCALAR, ARRAY VECTOR, or ARRAY MATRIX.
+    The function assignCompositeSubscripted()
+    in the module saveValueToVariable is ideal for initializing
+    such an object starting from an unraveled set of data, except
+    for the fact that it requires an object of the correct
+    dimensionality but with uninitialized elements as input.
+    Fortunately, the function uninitializedComposite() in the
+    palmatAux module can be used to construct the uninitialized
+    object.
+    '''
+    if shapingFunction in ["vector", "doublevector",
+                           "matrix", "doublematrix"]:
+        datatype = "scalar"
+        subscripts2 = dimensions
+        subscripts = []
+    elif shapingFunction in ["integer", "doubleinteger"]:
+        datatype = "integer"
+    elif shapingFunction in ["scalar", "doublescalar"]:
+        datatype = "scalar"
+    else:
+        printError(PALMAT, source, instruction, \
+                   "Unimplemented shaping function.")
+        return False
+    composite = uninitializedComposite(subscripts, subscripts2)
+    unraveled = []
+    while True:
+        value = computationStack.pop()
+        if value == {'sentinel'}:
+            break
+        flatten(value, unraveled)
+    subscriptedLHS = []
+    for i in subscripts + subscripts2:
+        subscriptedLHS.append(list(range(1, i + 1)))
+    if not assignCompositeSubscripted(None, composite, \
+                                      subscriptedLHS, \
+                   datatype, -1, unraveled):
+        printError(PALMAT, source, instruction, \
+                   "Cannot convert or too few values")
+        return False
+    computationStack.append(composite)
+
+def xeqUnknownShaping(vm, shapingFunction, instruction):
+    printError(vm["PALMAT"], vm["source"], instruction, \
+        "Implementation error, unknown shaping function: " + \
+        shapingFunction)
+    return False
+
+'''
+The following few handlers are for the "modern" instructions.  These are like
+RTL built-in functions, but are invented by me for the "modern"
+compiler/interpreter.  They do things to make debugging the compiler or
+performing validation testing on it easier.  Note that in distinction to real
+RTL built-in functions, in HAL/S their names are always lower-case, so they
+hopefully won't collide with any actual HAL/S code.  We'll see eventually,
+I suppose.
+'''
+def xeqInitialized(vm, modern, instruction):
+    computationStack = vm["stack"]
+    if len(computationStack) < 1:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                "Not enough arguments on stack.")
+        return False
+    if isCompletelyInitialized(computationStack[-1]):
+        computationStack[-1] = hTRUE
+    else:
+        computationStack[-1] = hFALSE
+
+def xeqTypeof(vm, modern, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if len(computationStack) < 1:
+        printError(PALMAT, source, instruction, \
+                   "Not enough arguments on stack.")
+        return False
+    operand = computationStack[-1]
+    if not isinstance(operand, str):
+        printError(PALMAT, source, instruction, \
+                   "Argument must be a string.")
+        return False
+    result = [""]*20
+    i, mangled = flexFindIdentifier(operand, PALMAT, vm["scopeNumber"])
+    if i == -1:
+        a = None
+    else:
+        i, a = findIdentifier(mangled, PALMAT, i)
+    if a == None:
+        a = {}
+        result[0] = "MISSING"
+    elif "bit" in a:
+        result[0] = "BIT"
+        result[1] = str(a["bit"])
+    elif "character" in a:
+        result[0] = "CHARACTER"
+        result[1] = str(a["character"])
+    elif "vector" in a:
+        result[0] = "VECTOR"
+        result[1] = str(a["vector"])
+    elif "matrix" in a:
+        result[0] = "MATRIX"
+        result[1] = str(a["matrix"][0])
+        result[2] = str(a["matrix"][1])
+    elif "scalar" in a:
+        result[0] = "SCALAR"
+    elif "integer" in a:
+        result[0] = "INTEGER"
+    elif "structure" in a:
+        result[0] = "STRUCTURE"
+    elif "label" in a:
+        result[0] = "LABEL"
+    else:
+        result[0] = "?"
+    if "constant" in a:
+        if result[0] == "BIT":
+            value, length = parseBitArray(a["constant"])
+            result[3] = "%d, %d" % (value, length)
+        elif result[0] in ["VECTOR", "MATRIX"]:
+            result[3] = str(a["constant"])
+            result[3] = presentify(a['constant'])
+        else:
+            result[3] = str(a["constant"])
+    if "initial" in a:
+        if result[0] == "BIT":
+            value, length = parseBitArray(a["initial"])
+            result[4] = "%d, %d" % (value, length)
+        elif result[0] in ["VECTOR", "MATRIX"]:
+            result[4] = str(a["initial"])
+            result[4] = presentify(a['initial'])
+        else:
+            result[4] = str(a["initial"])
+    if "double" in a:
+        result[5] = "DOUBLE"
+    if "array" in a:
+        dimensions = a["array"]
+        i = 15
+        for d in dimensions:
+            if i > 20:
+                break
+            result[i] = str(d)
+            i += 1
+    computationStack[-1] = result + ["a"]
+
+def xeqTypeofv(vm, modern, instruction):
+    # Same as TYPEOF, except analyzes the value atop the
+    # computation stack, rather than an identifier.
+    computationStack = vm["stack"]
+    if len(computationStack) < 1:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                   "Not enough arguments on stack")
+        return False
+    operand = computationStack[-1]
+    result = [""]*20
+    if isinstance(operand, list) and len(operand) == 3 and \
+            operand[-1] == 'p':
+        result[0] = "POINTER"
+    elif isinstance(operand, list) and operand[-1:] == ['a']:
+        dummy = operand
+        dimensions = []
+        while isinstance(dummy, list) and dummy[-1:] == ['a']:
+            dimensions.append(len(dummy)-1)
+            dummy = dummy[0]
+        if isArrayGeometry(operand, dimensions):
+            i = 15
+            for d in dimensions:
+                result[i] = str(d)
+                i += 1
+                if i > 20:
+                    break
+            operand = dummy
+        else:
+            result[0] = "?"
+    if operand == None:
+        result[0] = "NONE"
+    elif isinstance(operand, int):
+        result[0] = "INTEGER"
+    elif isinstance(operand, float):
+        result[0] = "SCALAR"
+    elif isinstance(operand, str):
+        result[0] = "CHARACTER"
+        result[1] = str(len(operand))
+    elif isBitArray(operand):
+        result[0] = "BIT"
+        dummy, result[1] = parseBitArray(operand)
+    elif isVector(operand, False):
+        result[0] = "VECTOR"
+        result[1] = str(len(operand))
+    elif isMatrix(operand, False):
+        result[0] = "MATRIX"
+        result[1] = str(len(operand))
+        result[2] = str(len(operand[0]))
+    elif isinstance(operand, dict):
+        result[0] = "STRUCTURE"
+    elif operand == {"sentinel"}:
+        result[0] = "SENTINEL"
+    elif operand == {"fill"}:
+        result[0] = "*"
+    elif result[0] == "":
+        result[0] = "?"
+    computationStack[-1] = result + ["a"]
+
+# Built-in functions with no arguments.
+def xeqFunction0(vm, function, instruction):
+    computationStack = vm["stack"]
+    if function == "RANDOM":
+        # Note that this returns a number in the range [0, 1),
+        # and therefore cannot return exactly 1.  The HAL/S
+        # documentation isn't entirely clear whether values
+        # that are *exactly* 0 or 1 should be returned.
+        computationStack.append(random.random())
+    elif function == "RANDOMG":
+        computationStack.append(random.gauss(0.0, 1.0))
+    elif function == "RUNTIME":
+        computationStack.append(1.0e-9 * \
+                                (time.time_ns() - vm["timeOrigin"]))
+    elif function == "CLOCKTIME":
+        rightNow = datetime.datetime.now(datetime.timezone.utc)
+        timeOfDay = 3600 * rightNow.hour + \
+                    60 * rightNow.minute + rightNow.second + \
+                    rightNow.microsecond * 1E-6
+        computationStack.append(timeOfDay)
+    elif function == "DATE":
+        rightNow = datetime.datetime.now(datetime.timezone.utc)
+        d = 10000 * rightNow.year + 100 * rightNow.month + \
+            rightNow.day
+        computationStack.append(d)
+    elif function == "ERRGRP":
+        computationStack.append(vm["errorGroup"])
+    elif function == "ERRNUM":
+        computationStack.append(vm["errorNum"])
+    else:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                "HAL/S built-in function " + function + \
+                " not yet implemented")
+        return False
+
+# Built-in functions with one argument.
+def xeqFunction1(vm, function, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if len(computationStack) < 1:
+        printError(PALMAT, source, instruction, \
+            "Not enough arguments on stack for function " + \
+            function)
+        return False
+    operand = computationStack[-1]
+    if function in unaryRTL: # See unaryFunctions.py module.
+        result = arrayableUnaryRTL(PALMAT, function, \
+                                   operand, \
+                                   source, instruction)
+        if isNaN(result):
+            return False
+        computationStack[-1] = result
+    elif function in accumulableFunctions: # See accumulableFunctions.py
+        result = accumulate(PALMAT, operand, function, source, \
+                            instruction)
+        if isNaN(result):
+            return False
+        computationStack[-1] = result
+    elif function == "SIZE":
+        if isArrayQuick(operand):
+            dimensions, value = getArrayDimensions(operand)
+            if len(dimensions) == 1:
+                computationStack[-1] = dimensions[0]
+            else:
+                printError(PALMAT, source, instruction, \
+                    "Array for SIZE must be one-dimensional.")
+                return False
+        else:
+            printError(PALMAT, source, instruction, \
+                       "SIZE function requires an array")
+            return False
+    elif function == "LENGTH":
+        operand = str(operand)
+        computationStack[-1] = len(operand)
+    elif function == "TRIM":
+        operand = str(operand)
+        computationStack[-1] = operand.strip()
+    else:
+        printError(PALMAT, source, instruction, \
+                   "HAL/S built-in function " + function + \
+                   "not yet implemented")
+        return False
+
+# Built-in functions with two arguments.
+def xeqFunction2(vm, function, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if len(computationStack) < 2:
+        printError(PALMAT, source, instruction, \
+                   "Not enough arguments on stack for function " + \
+                   function)
+        return False
+    operand1 = computationStack.pop()
+    operand2 = computationStack[-1]
+    if function in binaryRTL:
+        result = arrayableBinaryRTL(PALMAT, function, operand1, \
+                                    operand2, \
+                                    source, instruction)
+        if isNaN(result):
+            return False
+        computationStack[-1] = result
+    elif function == "XOR":
+        if not isBitArray(operand1):
+            printError(PALMAT, source, instruction, \
+                       "Not bit array: " + str(operand1))
+            return False
+        if not isBitArray(operand2):
+            printError(PALMAT, source, instruction, \
+                       "Not bit array: " + str(operand2))
+            return False
+        value1, length1 = parseBitArray(operand1)
+        value2, length2 = parseBitArray(operand2)
+        numbits = max(length1, length2)
+        computationStack[-1] = formBitArray(value1^value2, numbits)
+    elif function == "SHL":
+        operand1 = hround(operand1)
+        operand2 = hround(operand2)
+        computationStack[-1] = operand1 << operand2
+    elif function == "SHR":
+        operand1 = hround(operand1)
+        operand2 = hround(operand2)
+        computationStack[-1] = operand1 >> operand2
+    elif function == "INDEX":
+        # In Python, the character positions within the string are
+        # indexed from 0 (with -1 being "not present"), while in
+        # HAL/S indexing is from 1 (with 0 being "not present").
+        operand1 = str(operand1)
+        operand2 = str(operand2)
+        computationStack[-1] = 1 + operand1.find(operand2)
+    elif function == "LJUST":
+        operand1 = str(operand1)
+        operand2 = hround(operand2)
+        if operand2 < len(operand1):
+            computationStack[-1] = operand1[:operand2]
+            # This is also supposed to signal an error, which
+            # I have no idea about right now, so I'll have to come
+            # back to it later.
+            # TBD
+        else:
+            computationStack[-1] = "%*s" % (-operand2, operand1)
+    elif function == "RJUST":
+        operand1 = str(operand1)
+        operand2 = hround(operand2)
+        if operand2 < len(operand1):
+            computationStack[-1] = operand1[:operand2]
+            # This is also supposed to signal an error, which
+            # I have no idea about right now, so I'll have to come
+            # back to it later.
+            # TBD
+        else:
+            computationStack[-1] = "%*s" % (operand2, operand1)
+    else:
+        printError(PALMAT, source, instruction, \
+                   "HAL/S built-in function " + function + \
+                   " not yet implemented")
+        return False
+
+# Built-in functions with three arguments.
+def xeqFunction3(vm, function, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    if len(computationStack) < 3:
+        printError(PALMAT, source, instruction, \
+                   "Not enough arguments on stack for function " \
+                   + function)
+        return False
+    operand1 = computationStack.pop()
+    operand2 = computationStack.pop()
+    operand3 = computationStack[-1]
+    if function == "MIDVAL":
+        result = trinaryOperation(PALMAT, simpleMIDVAL, operand1, \
+                                  operand2, operand3)
+        if isNaN(result):
+            printError(PALMAT, source, instruction, \
+                       "Incompatible operands for MIDVAL function")
+            return False
+        computationStack[-1] = result
+    else:
+        printError(PALMAT, source, instruction, \
+                   "HAL/S built-in function " + function \
+                   + "not yet implemented")
+        return False
+
+def xeqUnknownFunction(vm, function, instruction):
+    printError(vm["PALMAT"], vm["source"], instruction, \
+               "Implementation error, function " + function)
+    return False
+
+def xeqCalloffset(vm, operand, instruction):
+    identifier, offset = operand
+    if offset == None:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                   "Implementation error, identifier %s not found" \
+                   % identifier)
+        return False
+    vm["scope"]["returnoffset"] = vm["index"];
+    vm["index"] = offset
+
+def xeqReturnoffset(vm, i, instruction):
+    scopes = vm["scopes"]
+    if i == -1:
+        i = vm["scopeNumber"]
+        while i != None and "returnoffset" not in scopes[i]:
+            i = scopes[i]["parent"]
+        if i == None:
+            printError(vm["PALMAT"], vm["source"], instruction, \
+                       "Implementation error, cannot find returnoffset.")
+            return False
+    scope = scopes[i]
+    if "returnoffset" in scope:
+        transfer(vm, i, scope.pop("returnoffset"))
+    else:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                   "Implementation error, returnoffset not in scope.")
+        for key in sorted(scope):
+            print("\t%s:" % key, scope[key])
+        return False
+
+def xeqCase(vm, operand, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    computationStack = vm["stack"]
+    prefix, targets, default = operand
+    if len(computationStack) < 1:
+        printError(PALMAT, source, instruction, \
+                   "Computation stack too short in CASE.")
+        return False
+    caseNumber = computationStack.pop()
+    if isinstance(caseNumber, float):
+        caseNumber = hround(caseNumber)
+    if not isinstance(caseNumber, int):
+        printError(PALMAT, source, instruction, "Non-numeric CASE key.")
+        return False
+    # The targets and default were looked up by loadScope().
+    offset = None
+    if caseNumber >= 1 and caseNumber < len(targets):
+        offset = targets[caseNumber]
+    if offset == None:
+        offset = default
+    if offset == None:
+        printError(PALMAT, source, instruction, \
+            "Implementation error, no accessible labels in CASE")
+        return False
+    vm["index"] = offset
+
+def xeqGoto(vm, operand, instruction):
+    return xeqJump(vm, operand, instruction)
+
+def xeqIffalse(vm, operand, instruction):
+    value, dummy = parseBitArray(vm["stack"].pop())
+    if (value & 1) == 0:
+        return xeqJump(vm, operand, instruction)
+
+def xeqIftrue(vm, operand, instruction):
+    value, dummy = parseBitArray(vm["stack"].pop())
+    if (value & 1) != 0:
+        return xeqJump(vm, operand, instruction)
+
+def xeqRun(vm, operand, instruction):
+    PALMAT = vm["PALMAT"]
+    si, dummy, identifier, attributes = operand
+    if attributes == None and si != -1:
+        attributes = PALMAT["scopes"][si]["identifiers"].get(identifier)
+    if attributes == None:
+        printError(PALMAT, vm["source"], instruction, \
+                   "Target of RUN not found: " + identifier)
+        return False
+    if "program" not in attributes:
+        printError(PALMAT, vm["source"], instruction, \
+                   "RUN target is not a PROGRAM: " + identifier)
+        return False
+    transfer(vm, attributes["scope"], 0)
+
+def xeqCall(vm, operand, instruction):
+    PALMAT = vm["PALMAT"]
+    source = vm["source"]
+    si, dummy, identifier, attributes = operand
+    if attributes == None and si != -1:
+        attributes = PALMAT["scopes"][si]["identifiers"].get(identifier)
+    if attributes == None:
+        printError(PALMAT, source, instruction, \
+                   "Target of CALL not found: " + identifier)
+        return False
+    if "function" not in attributes and "procedure" not in attributes:
+        printError(PALMAT, source, instruction, \
+                   "CALL to neither a FUNCTION nor PROCEDURE: " \
+                   + identifier)
+        return False
+    si = attributes["scope"]
+    s = vm["scopes"][si]
+    if "return" in s:
+        printError(PALMAT, source, identifier, \
+                   "Recursion in subroutine %s not allowed." \
+                   % identifier[1:-1])
+        return False
+    # The return address.
+    returnAddress = (vm["scopeNumber"], vm["index"])
+    #computationStack.append((scopeNumber, instructionIndex))
+    # Transfer control.
+    transfer(vm, si, 0)
+    if "assignments" in instruction:
+        # Only read, never modified, so needn't be a deep copy.
+        s["assignments"] = copy.copy(instruction["assignments"])
+    s["return"] = returnAddress
+
+def xeqReturn(vm, operand, instruction):
+    enclosure = vm["scope"]
+    while enclosure != None:
+        if "return" in enclosure:
+            scopeNumber, instructionIndex = enclosure["return"]
+            enclosure.pop("return")
+            if "assignments" in enclosure:
+                enclosure.pop("assignments")
+            break
+        enclosure = vm["scopes"][enclosure["parent"]]
+    if enclosure == None:
+        printError(vm["PALMAT"], vm["source"], instruction, \
+                   "Implementation error, no return address")
+        return False
+    #scopeNumber, instructionIndex = computationStack.pop(-stackPos)
+    transfer(vm, scopeNumber, instructionIndex)
+
+def xeqHalt(vm, operand, instruction):
+    # Ends emulation.
+    #printError(PALMAT, source, None, "Normal program termination")
+    return False
+
+def xeqAutomatics(vm, operand, instruction):
+    scopeNumber = vm["scopeNumber"]
+    identifiers = vm["scope"]["identifiers"]
+    for identifier in list(identifiers):
+        attributes = identifiers[identifier]
+        if "initial" in attributes and "automatic" in attributes:
+            attributes = writableAttributes(vm, scopeNumber, identifier, \
+                                            attributes)
+            initial = attributes["initial"]
+            if initial != None and not isinstance(initial, (int, float, str)):
+                initial = copy.deepcopy(initial)
+            attributes["value"] = initial
+
+def xeqUnknown(vm, operand, instruction):
+    printError(vm["PALMAT"], vm["source"], instruction, \
+               "Implementation error, unknown PALMAT: " + str(instruction))
+    return False
+
+# The dispatch table, indexed by the opcodes defined in loadPALMAT.py.
+handlers = [None] * numOpcodes
+handlers[opDebug] = xeqNoop
+handlers[opEmpty] = xeqEmpty
+handlers[opFill] = xeqFill
+handlers[opPush] = xeqPush
+handlers[opStringifiedNumber] = xeqStringifiedNumber
+handlers[opIncrementAndTest] = xeqIncrementAndTest
+handlers[opSentinel] = xeqSentinel
+handlers[opRepeat] = xeqRepeat
+handlers[opDotted] = xeqDotted
+handlers[opSubscripts] = xeqSubscripts
+handlers[opUnary] = xeqUnary
+handlers[opBinary] = xeqBinary
+handlers[opUnknownOperator] = xeqUnknownOperator
+handlers[opFetch] = xeqFetch
+handlers[opUnravel] = xeqUnravel
+handlers[opFetchp] = xeqFetchp
+handlers[opStore] = xeqStore
+handlers[opStorepop] = xeqStorepop
+handlers[opSubstore] = xeqSubstore
+handlers[opSubstorepop] = xeqSubstorepop
+handlers[opPop] = xeqPop
+handlers[opRead] = xeqRead
+handlers[opWrite] = xeqWrite
+handlers[opIocontrol] = xeqIocontrol
+handlers[opSliceAT] = xeqSliceAT
+handlers[opSliceTO] = xeqSliceTO
+handlers[opShape] = xeqShape
+handlers[opUnknownShaping] = xeqUnknownShaping
+handlers[opInitialized] = xeqInitialized
+handlers[opTypeof] = xeqTypeof
+handlers[opTypeofv] = xeqTypeofv
+handlers[opFunction0] = xeqFunction0
+handlers[opFunction1] = xeqFunction1
+handlers[opFunction2] = xeqFunction2
+handlers[opFunction3] = xeqFunction3
+handlers[opUnknownFunction] = xeqUnknownFunction
+handlers[opGoto] = xeqGoto
+handlers[opCalloffset] = xeqCalloffset
+handlers[opReturnoffset] = xeqReturnoffset
+handlers[opCase] = xeqCase
+handlers[opIffalse] = xeqIffalse
+handlers[opIftrue] = xeqIftrue
+handlers[opRun] = xeqRun
+handlers[opCall] = xeqCall
+handlers[opReturn] = xeqReturn
+handlers[opHalt] = xeqHalt
+handlers[opAutomatics] = xeqAutomatics
+handlers[opPartition] = xeqPartition
+handlers[opUnknown] = xeqUnknown
+
+# Instructions which are allowed to consume subscripts.
+subscriptConsumers = ("fetch", "fetchp", "shaping", "unravel")
+
 '''
 This is the main emulator loop.  Basically, you feed it an entire PALMAT
 structure of scopes (namely rawPALMAT) including the model of all variables
@@ -497,11 +1958,6 @@ uninitialized variable, then None is returned instead.
 '''
 def executePALMAT(rawPALMAT, pcScope=0, pcOffset=0, newInstantiation=False, \
                   trace=False, indent=0):
-    # Some values needed for RTL functions.
-    timeOrigin = time.time_ns() # For RUNTIME
-    errorGroup = 0              # For ERRGRP
-    errorNum = 0                # For ERRNUM
-    
     if newInstantiation:
         PALMAT = clonePALMAT(rawPALMAT)
     else:
@@ -512,1259 +1968,120 @@ def executePALMAT(rawPALMAT, pcScope=0, pcOffset=0, newInstantiation=False, \
             scope.pop("return")
         if "returnoffset" in scope:
             scope.pop("returnoffset")
-    scopeNumber = pcScope
-    instructionIndex = pcOffset
-    scope = scopes[scopeNumber]
+    # As originally designed, both structure qualifications and and
+    # subscripts are intended to persist only until the very next
+    # instruction (usually, 'fetch').  They were formerly passed to that
+    # next instruction in scope 0, so pick up any left there by a previous
+    # call.
     scope0 = scopes[0]
-    computationStack = []
-    source = [0, -1, -1]
+    pending = None
+    if "qualifications" in scope0 or "subscripts" in scope0 or \
+            "subscripts2" in scope0:
+        pending = (scope0.pop("qualifications", []), \
+                   scope0.pop("subscripts", []), \
+                   scope0.pop("subscripts2", []))
+    vm = {
+        "PALMAT": PALMAT,
+        "cloneOf": PALMAT.get("cloneOf"),
+        "scopes": scopes,
+        "loaded": {},
+        "stack": [],
+        "source": [0, -1, -1],
+        "qualifications": [],
+        "subscripts": [],
+        "subscripts2": [],
+        "fullSubscripts": [],
+        "pending": pending,
+        "indent": indent,
+        # Some values needed for RTL functions.
+        "timeOrigin": time.time_ns(),   # For RUNTIME
+        "errorGroup": 0,                # For ERRGRP
+        "errorNum": 0                   # For ERRNUM
+        }
+    transfer(vm, pcScope, pcOffset)
+    computationStack = vm["stack"]
+    code = vm["code"]
+    instructionIndex = vm["index"]
+    scopeNumber = vm["scopeNumber"]
+    modified = False
     # Execute the PALMAT instructions, one by one.
-    while instructionIndex < len(scope["instructions"]):
-        identifiers = scope["identifiers"]
-        instructions = scope["instructions"]
-        instruction = instructions[instructionIndex]
-        if "source" in instruction:
-            source = instruction["source"]
-        # As originally designed, both structure qualifications and and 
-        # subscripts are intended to persist only until the very next 
-        # instruction (usually, 'fetch').  But what if there are both?
-        # We need to do something here to account for the possibility that 
-        # both subscripts and structure qualifications are present; but for 
+    while instructionIndex < len(code):
+        opcode, operand, source, instruction = code[instructionIndex]
+        if source is not None:
+            vm["source"] = source
+        # We need to do something here to account for the possibility that
+        # both subscripts and structure qualifications are present; but for
         # now, I'm just pretending that at most one of those two is present.
-        qualifications = []
-        if "qualifications" in scope0:
-            qualifications = scope0["qualifications"]
-            scope0.pop("qualifications")
-        fullSubscripts = []
-        if "subscripts" in scope0:
-            fullSubscripts.extend(scope0["subscripts"])
-        if "subscripts2" in scope0:
-            fullSubscripts.extend(scope0["subscripts2"])
-        if len(fullSubscripts) > 0 and "fetch" not in instruction and \
-                "fetchp" not in instruction and "shaping" not in instruction \
-                and "unravel" not in instruction:
-            printError(PALMAT, source, instruction, 
-                "Implementation error, subscript (%s) without variable in instruction" \
-                % scope0["subscripts"])
-            return None
-        if "subscripts" in scope0:
-            subscripts = scope0.pop("subscripts")
-        else:
-            subscripts = []
-        if "subscripts2" in scope0:
-            subscripts2 = scope0.pop("subscripts2")
-        else:
-            subscripts2 = []
-        if trace:
-            print("\tTRACE:  ", computationStack, \
-                  " (%d,%d):" % (scopeNumber, instructionIndex), instruction)
-        instructionIndex += 1
-        stackSize = len(computationStack)
-        if "debug" in instruction:
-            pass
-        elif "empty" in instruction:
-            computationStack.append(None)
-        elif "fill" in instruction:
-            computationStack.append({"fill"})
-        elif "string" in instruction:
-            computationStack.append(instruction["string"])
-        elif "boolean" in instruction:
-            computationStack.append(instruction["boolean"])
-        elif "number" in instruction:
-            try:
-                value = int(instruction["number"])
-            except:
-                value = stringifiedToFloat(instruction["number"])
-            computationStack.append(value)
-        elif "vector" in instruction:
-            computationStack.append(instruction["vector"])
-        elif "matrix" in instruction:
-            computationStack.append(instruction["matrix"])
-        elif "array" in instruction:
-            computationStack.append(instruction["array"])
-        #elif "bitarray" in instruction:
-        #    computationStack.append(parseBitArray(instruction["bitarray"])[0])
-        elif "+><" in instruction:
-            si, identifier = instruction["+><"]
-            identifier = "^" + identifier + "^"
-            if stackSize < 2:
-                printError(PALMAT, source, instruction, \
-                        "Implementation error, not enough operands for '+><'.")
-                return None
-            operand1 = computationStack.pop()
-            negativeIncrement = (operand1 < 0)
-            operand2 = computationStack[-1]
-            attributes = PALMAT["scopes"][si]["identifiers"][identifier]
-            if attributes == None:
-                printError(PALMAT, source, instruction, \
-                    "Implementation error, variable (%s) not found." \
-                      % identifier[1:-1])
-                return None
-            if "integer" not in attributes and "scalar" not in attributes:
-                printError(PALMAT, source, instruction, \
-                           "Implementation error in '+><': Not a number.")
-                return None
-            if "value" not in attributes:
-                printError(PALMAT, source, instruction, \
-                    "Implementation error in '+><': Uninitialized variable.")
-                return None
-            operand1 += attributes["value"]
-            if "integer" in attributes:
-                attributes["value"] = hround(operand1)
-            else:
-                attributes["value"] = operand1
-            if negativeIncrement:
-                computationStack[-1] = convertToBitArray(operand1 < operand2)
-            else:
-                computationStack[-1] = convertToBitArray(operand1 > operand2)
-        elif "sentinel" in instruction:
-            computationStack.append({"sentinel"})
-        elif "operator" in instruction:
-            operator = instruction["operator"]
-            if False:
-                pass
-            elif operator == "#":
-                if stackSize < 2:
-                    printError(PALMAT, source, instruction, \
-                        ("\tImplementation error, not enough operands " + \
-                        "for operator \"%s\"") % operator)
-                    return None
-                operand1 = hround(computationStack.pop())
-                # Recall that if a single item is being repeated, it is present
-                # as itself, but if a group of items are being repeated then
-                # that group appears on the computation stack in the form of 
-                # a single item because the group is wrapped in [(...)].  That
-                # particular wrapping is chosen because it's distinguishable 
-                # from VECTOR, MATRIX, and ARRAY.
-                if computationStack[-1] == {'sentinel'}:
-                    computationStack.pop()
-                    operands2 = [None]
-                else:
-                    operands2 = []
-                    while True:
-                        value = computationStack.pop()
-                        if value == {'sentinel'}:
-                            break
-                        flatten(value, operands2)
-                while operand1 > 0:
-                    # I want to insert all the elements in operands2 into
-                    # computation stack.  If I use the list .extend method
-                    # for this, I find they end up in reversed order, so I
-                    # want to do the insertion at the beginning rather than
-                    # at the end.  I want to do this in place, without 
-                    # creating a new computationStack object.
-                    #computationStack.extend(operands2)
-                    #computationStack[0:0] = operands2
-                    computationStack.extend(reversed(operands2))
-                    operand1 -= 1
-            elif operator == "dotted":
-                # Structure qualifications.  These are the strings "A", "B", "C"
-                # in structure refrences like A.B.C.X.
-                q = []
-                while True:
-                    value = computationStack.pop()
-                    if value == {"sentinel"}:
-                        break
-                    q[0:0] = [value] # Insert the qualification at position 0.
-                scope0["qualifications"] = q
-            elif operator == "subscripts":
-                subscripts = []
-                subscripts2 = []
-                s = subscripts
-                while True:
-                    value = computationStack.pop()
-                    if value == {"sentinel"}:
+        if pending is not None:
+            vm["pending"] = None
+            qualifications, subscripts, subscripts2 = pending
+            pending = None
+            vm["qualifications"] = qualifications
+            vm["subscripts"] = subscripts
+            vm["subscripts2"] = subscripts2
+            vm["fullSubscripts"] = subscripts + subscripts2
+            modified = True
+            if len(vm["fullSubscripts"]) > 0:
+                for key in subscriptConsumers:
+                    if key in instruction:
                         break
-                    if value == {"semicolon"}:
-                        s = subscripts2
-                        continue
-                    s.append(value)
-                if len(subscripts + subscripts2) < 1:
-                    printError(PALMAT, source, instruction, \
-                               "Subscript operator without subscripts.")
-                    return None
-                scope0["subscripts"] = subscripts
-                scope0["subscripts2"] = subscripts2
-            elif operator in ["U-", "NOT"]: # Unary operators.
-                if stackSize < 1:
-                    printError(PALMAT, source, instruction, \
-                        ("\tImplementation error, not enough operands " + \
-                        "for operator \"%s\"") % operator)
-                    return None
-                operand = computationStack[-1]
-                #arrayDim, v = getArrayDimensions(operand)
-                #isi,iss,isv,ism = checkArithmeticalDatatype(v)
-                #isn = isi or iss
-                if operator == "U-":
-                    result = arrayableUnaryRTL(PALMAT, "Negation", operand, \
-                                               source, instruction)
-                    if isNaN(result):
-                        return None
-                elif operator == "NOT":
-                    if not isBitArray(operand):
-                        printError(PALMAT, source, instruction, \
-                                   "Not bit array: " + operand)
-                        return None
-                    value, length = parseBitArray(operand)
-                    result = formBitArray(~value, length)
                 else:
-                    printError(PALMAT, source, instruction, \
-                            ("Implementation error, unary operator (%s) " + \
-                           "not yet implemented") % operator)
-                    return None
-                computationStack[-1] = result
-            elif operator in ["+", "-", "", "/", "**", ".", "*", "C||", "OR", 
-                              "AND", "==", "!=", "<", ">", "<=", ">=", "B||",
-                              "ORNOT"]: 
-                # binary operators.
-                if stackSize < 2:
-                    printError(PALMAT, source, instruction, \
-                        ("Implementation error, not enough operands " + \
-                        "for operator \"%s\"") % operator)
-                    return None
-                result = None
-                operand1 = computationStack[-1]
-                operand2 = computationStack[-2]
-                computationStack.pop()
-                computationStack[-1] = None
-                if operator in ["==", "!=", "<", ">", "<=", ">="] and \
-                        (not isCompletelyInitialized(operand1) or \
-                         not isCompletelyInitialized(operand2)):
-                    printError(PALMAT, source, instruction, \
-                        "Cannot compare uninitialized values")
-                    return None
-                # Common arithmetical operators ... both arrayed and
-                # non-arrayed operations.
-                if operator in binaryRTL:
-                    result = arrayableBinaryRTL(PALMAT, operator, operand1, \
-                                                operand2, \
-                                                source, instruction)
-                    if isNaN(result):
-                        return None
-                else:
-                    if operator == "C||": # string concatenation.
-                        result = operand1 + operand2
-                    elif operator in ["AND", "OR", "ORNOT", "B|N" ]:
-                        if not isBitArray(operand1):
-                            printError(PALMAT, source, instruction, \
-                                       "Not bit array: " + str(operand1))
-                            return None
-                        if not isBitArray(operand2):
-                            printError(PALMAT, source, instruction, \
-                                       "Not bit array: " + str(operand2))
-                            return None
-                        value1, length1 = parseBitArray(operand1)
-                        value2, length2 = parseBitArray(operand2)
-                        if operator == "OR":
-                            numbits = min(length1, length2)
-                            result = formBitArray(value1 | value2, numbits)
-                        elif operator == "AND":
-                            numbits = min(length1, length2)
-                            result = formBitArray(value1 & value2, numbits)
-                        elif operator == "ORNOT":
-                            numbits = min(length1, length2)
-                            result = formBitArray(value1 | ~value2, numbits)
-                        elif operator == "B||":
-                            numbits = length1 + length2
-                            result = formBitArray((value1 << length2) | value2,\
-                                                   numbits)
-                    elif operator == "==":
-                        result = \
-                            convertToBitArray(isEqualTo(operand1, operand2))
-                    elif operator == "!=":
-                        result = \
-                            convertToBitArray(not isEqualTo(operand1, operand2))
-                    elif operator == "<":
-                        result = convertToBitArray(operand1 < operand2)
-                    elif operator == ">":
-                        result = convertToBitArray(operand1 > operand2)
-                    elif operator == "<=":
-                        result = convertToBitArray(operand1 <= operand2)
-                    elif operator == ">=":
-                        result = convertToBitArray(operand1 >= operand2)
-                    elif operator == ".":
-                        if isv1 and isv2 \
-                                and len(operand1) == len(operand2):
-                            result = 0
-                            for i in range(len(operand1)):
-                                result += operand1[i] * operand2[i]
-                    elif operator == "*":
-                        if isv1 and isv2 \
-                                and len(operand1) == 3 and len(operand2) == 3:
-                            result = [
-                                operand1[1]*operand2[2]-operand1[2]*operand2[1],
-                                operand1[2]*operand2[0]-operand1[0]*operand2[2],
-                                operand1[0]*operand2[1]-operand1[1]*operand2[0]                                
-                                ]
-                        else:
-                            printError(PALMAT, source, instruction, \
-                                "Operands of * must be initialized 3-vectors.")
-                            return None
-                    else:
-                        printError(PALMAT, source, instruction, \
-                            ("Implementation error, binary operator \"%s\" " + \
-                            "not yet implemented") % operator)
-                        return None
-                    if result == None:
-                        printError(PALMAT, source, instruction, \
-                                   "Uninitialized values in expression.")
-                        return None
-                computationStack[-1] = result
-            else:
-                printError(PALMAT, source, instruction, \
-                           "Unknown operator \"%s\"" % operator)
-        elif "fetch" in instruction or "unravel" in instruction \
-                or "fetchp" in instruction or \
-                "store" in instruction or "storepop" in instruction or \
-                "substore" in instruction or "substorepop" in instruction:
-            erroredUp = False
-            fetch = False
-            fetchp = False
-            pop = False
-            unravel = False
-            lhsSubscripts = False
-            stackPos = 1
-            if "fetch" in instruction:
-                si, identifier = instruction["fetch"]
-                fetch = True
-            elif "unravel" in instruction:
-                si, identifier = instruction["unravel"]
-                fetch = True
-                unravel = True
-            elif "fetchp" in instruction:
-                si, identifier = instruction["fetchp"]
-                fetchp = True
-            elif "store" in instruction:
-                si, identifier = instruction["store"]
-            elif "storepop" in instruction:
-                si, identifier = instruction["storepop"]
-                pop = True
-            elif "substore" in instruction:
-                si, identifier = instruction["substore"]
-                lhsSubscripts = True
-            elif "substorepop" in instruction:
-                si, identifier = instruction["substorepop"]
-                pop = True
-                lhsSubscripts = True
-            lhsSubscriptList = []
-            if lhsSubscripts:
-                subscript = computationStack.pop()
-                while subscript != {"sentinel"}:
-                    if subscript != {"semicolon"}:
-                        lhsSubscriptList.append(subscript)
-                    subscript = computationStack.pop()
-            dummyScope = scope
-            while si == -1:
-                '''
-                If si == -1, then the variable being assigned is itself a
-                local alias in a procedure call.  So we have to seek upstream
-                to find the variable to which it's actually referring.
-                
-                The reason we're in a "while si" rather than an "if si" is that
-                we may have *nested* procedure calls, so once we find the 
-                upstream variable to which our alias refers, it may itself be
-                an alias for another variable upstream of the calling code
-                (which may be a scope that's not necessarily an ancestor of 
-                the procedure's scope), and so on. 
-                '''
-                while "assignments" not in dummyScope:
-                    if dummyScope["parent"] == None:
-                        printError(PALMAT, source, instruction, \
-                                   "Cannot find identifier " + identifier)
-                        return None
-                    dummyScope = PALMAT["scopes"][dummyScope["parent"]]
-                if identifier not in dummyScope["assignments"]:
-                    printError(PALMAT, source, instruction, \
-                        ("Identifier \"%s\" " + \
-                        "not found") % identifier[1:-1])
+                    printError(PALMAT, vm["source"], instruction,
+                        "Implementation error, subscript (%s) without variable in instruction" \
+                        % subscripts)
                     return None
-                si, identifier = dummyScope["assignments"][identifier]
-                if si == -1:
-                    if "return" not in dummyScope:
-                        printError(PALMAT, source, instruction, \
-                            "Cannot trace nested assignments (%s in %s)" % \
-                            (identifier, dummyScope["name"]))
-                        return None
-                    dummyScope = PALMAT["scopes"][dummyScope["return"][0]]
-            identifier = "^" + identifier + "^"
-            try:
-                attributes = getAttributes(PALMAT, si, qualifications, identifier)
-                if attributes == None:
-                    raise Exception("Problem fetching attributes")
-            except:
-                printError(PALMAT, source, instruction, \
-                           "Undiagnosed problem with PALMAT instruction")
-                print("\t\tnum scopes =", len(PALMAT["scopes"]))
-                print("\t\ttype of si =", type(si))
-                print("\t\tscope number =", si, " identifier =", identifier)
-                print("\t\tidentifiers =", PALMAT["scopes"][si]["identifiers"])
-                print("\t\tqualifications =", qualifications)
-                return None
-            erroredUp = True
-            if fetch:
-                #print("!!", attributes)
-                if "constant" in attributes:
-                    value = sliceIt(attributes["constant"], fullSubscripts)
-                else:
-                    value = sliceIt(attributes["value"], fullSubscripts)
-                if isNaN(value):
-                    printError(PALMAT, source, instruction, \
-                        "Slicing error %s%s." % (identifier, str(fullSubscripts)))
-                    return None
-                if unravel:
-                    onto = []
-                    flatten(value, onto)
-                    computationStack.extend(reversed(onto))
-                else:
-                    computationStack.append(value)
-            elif fetchp:
-                computationStack.append( [si, identifier, 'p'] )
-            else: # store
-                if len(computationStack) < stackPos:
-                    printError(PALMAT, source, instruction, \
-                               "Implementation error, stack too short for " +
-                               "STOREXXX instruction")
-                    return None
-                value = copy.deepcopy(computationStack[-stackPos])
-                if pop:
-                    computationStack.pop(-stackPos)
-                if "constant" in attributes:
-                    printError(PALMAT, source, instruction, \
-                               "Cannot change value of constant %s." \
-                               % identifier[1:-1])
-                    return None
-                if True:
-                    if "array" in attributes and "parameter" in attributes \
-                            and len(attributes["array"]) == 1 and \
-                            isArrayQuick(value) and \
-                            len(getArrayDimensions(value)[0]) == 1 and \
-                            (attributes["array"][0] == "*" \
-                             or "flex" in attributes):
-                        attributes["value"] = value
-                        attributes["array"], dummy = getArrayDimensions(value)
-                        attributes["flex"] = True
-                    # This is my new, possibly-improved method.
-                    elif not saveValueToVariable(PALMAT, source, value, \
-                                               identifier[1:-1], \
-                                               attributes, \
-                                               lhsSubscriptList):
-                        return None
-                else:
-                    # This my original, incomplete, imperfect method.
-                    # Apply conversions to the data as necessary, if the datatype
-                    # found on the computation stack was not precisely what the
-                    # variable being assigned expects.
-                    dimensions = []
-                    if value == None:
-                        pass
-                    elif isinstance(value, str):
-                        if "character" not in attributes:
-                            printError(PALMAT, source, instruction, \
-                                       "Cannot store string in non-CHARACTER " +
-                                       "variable %s." % identifier[1:-1])
-                            return None
-                        maxlen = attributes["character"]
-                        value = value[:maxlen]
-                    elif isinstance(value, (float, int)):
-                        if "integer" in attributes:
-                            value = hround(value)
-                        elif "scalar" in attributes or \
-                                ("vector" in attributes and len(lhsSubscriptList) == 1) or \
-                                ("matrix" in attributes and len(lhsSubscriptList) == 2):
-                            value = float(value)
-                        elif "bit" in attributes:
-                            value = hround(value) & ((1 << attributes["bit"])-1)
-                        elif "character" in attributes:
-                            # TBD
-                            printError(PALMAT, source, instruction, \
-                                "Storing number in CHARACTER not yet implemented.")
-                            value = "?"
-                    elif isBitArray(value) and "bit" in attributes:
-                        value = formBitArray(parseBitArray(value)[0], \
-                                             attributes["bit"])
-                    elif isVector(value, False) and "vector" in attributes \
-                            and not lhsSubscripts:
-                        numRows = len(value)
-                        dimensions = [numRows]
-                        if numRows != attributes["vector"]:
-                            printError(PALMAT, source, instruction, \
-                                    "Vector length mismatch in store operation: " \
-                                    + identifier[1:-1])
-                            return None
-                    elif isMatrix(value, False) and "matrix" in attributes \
-                            and not lhsSubscripts:
-                        dimensions = [len(value), len(value[0])]
-                        if dimensions != attributes["matrix"]:
-                            printError(PALMAT, source, instruction, \
-                                "Matrix geometry mismatch in store operation: " + \
-                                identifier[1:-1])
-                            return None
-                    elif "array" in attributes:
-                        dimensions = attributes["array"]
-                        if not lhsSubscripts and \
-                                not isArrayGeometry(value, dimensions):
-                            printError(PALMAT, source, instruction, \
-                                    "Array geometry wrong in store operation: " \
-                                    + identifier[1:-1])
-                            return None
-                    else:
-                        printError(PALMAT, source, instructions, \
-                                   "Mismatched datatypes in instruction: %s vs %s" \
-                                   % (str(instruction), str(value)))
-                        return None
-                    if lhsSubscriptList == []:
-                        if "bit" in attributes and not isBitArray(value):
-                            value = formBitArray(value, attributes["bit"])
-                        elif "character" in attributes and \
-                                "array" not in attributes and \
-                                "vector" not in attributes and \
-                                "matrix" not in attributes:
-                            value = str(value)[:attributes["character"]]
-                        attributes["value"] = value
-                    else:
-                        if "array" in attributes:
-                            sdimensions = attributes["array"]
-                        elif "vector" in attributes:
-                            sdimensions = [attributes["vector"]]
-                        elif "matrix" in attributes:
-                            sdimensions = attributes["matrix"]
-                        else:
-                            sdimensions = []
-                        if dimensions != sdimensions[len(lhsSubscriptList):]:
-                            printError(PALMAT, source, instruction, \
-                                       "Dimensionality mismatch in assignment.")
-                            return None
-                        if len(lhsSubscriptList) != len(sdimensions):
-                            printError(PALMAT, source, instruction, \
-                                    "Dimensionality of value and variable differ.")
-                            return None
-                        for i in range(len(dimensions)):
-                            if lhsSubscriptList[i] < 1 or \
-                                    lhsSubscriptList[i] > dimensions[i]:
-                                printError(PALMAT, source, instruction, \
-                                           "Subscript out of range in assignment")
-                                return None
-                        # Recall that in python, the following manipulations of 
-                        # "row" operate on pointers.  So the final "row" we end up 
-                        # with is actually a pointer to a stored row existing 
-                        # already in the VECTOR, MATRIX, or ARRAY variable.
-                        # Recall also that HAL/S indexes from 1 while Python indexes
-                        # from 0.  Recall finally that even uninitialized composite
-                        # data in our HAL/S scopes have the proper dimensionality,
-                        # but with unused elements set to None, so the sought row
-                        # does actually exist.
-                        row = attributes["value"]
-                        for i in range(len(dimensions)-1):
-                            row = row[lhsSubscriptList[i]-1]
-                        row[lhsSubscriptList[-1]-1] = value
-            if not erroredUp:
-                printError(PALMAT, source, instruction, \
-                    "Identifier (%s) not in any accessible scope" \
-                    % identifier[1:-1])
-                return None
-        elif "pop" in instruction:
-            value = instruction["pop"]
-            if value <= stackSize:
-                while value > 0:
-                    computationStack.pop()
-                    value -= 1
-            else:
-                printError(PALMAT, source, instruction, \
-                    "Implementation error, too many POPs: %d vs %d" \
-                    % (value, stackSize))
+        elif modified:
+            vm["qualifications"] = []
+            vm["subscripts"] = []
+            vm["subscripts2"] = []
+            vm["fullSubscripts"] = []
+            modified = False
+        if trace:
+            print("\tTRACE:  ", computationStack, \
+                  " (%d,%d):" % (scopeNumber, instructionIndex), \
+                  instruction)
+        instructionIndex += 1
+        # The most-common trivial instructions are handled inline, rather
+        # than by the handlers, just to save the function call.
+        if opcode == opPush:
+            computationStack.append(operand)
+        elif opcode < opDotted:
+            if handlers[opcode](vm, operand, instruction) is False:
                 return None
-        elif "read" in instruction:
-            lun = instruction["read"]
-            if lun == '5':
-                # If this instruction is within a subroutine, then we can 
-                # only regress in the computation stack until finding the 
-                # return address, because we want to use that later (for 
-                # returning!) rather than using it now for printing.
-                start = 0
-                for i in range(len(computationStack)-1, -1, -1):
-                    entry = computationStack[i]
-                    if isinstance(entry, list) and len(entry) == 3 and \
-                            isinstance(entry[0], int) and \
-                            isinstance(entry[1], str) and \
-                            entry[2] == 'p':
-                        continue
-                    start = i + 1
-                    break
-                if start < len(computationStack):
-                    semicolon = False
-                    for value in computationStack[start:]:
-                        if semicolon:
-                            break
-                        # In reality, we could have subscripted VECTOR, MATRIX,
-                        # or ARRAY variables here. For now, I'm just ignoring 
-                        # that possibility and implementing unsubscripted
-                        # variables.
-                        # Recall that "pointers" to variables, which is what
-                        # should be on the computation stack at this point,
-                        # are of the form [index, identifier, 'p'].
-                        si = value[0]
-                        identifier = value[1]
-                        attributes = \
-                            PALMAT["scopes"][si]["identifiers"][identifier]
-                        if "vector" in attributes:
-                            rowLength = attributes["vector"]
-                            for i in range(rowLength):
-                                value = readItemLUN5(PALMAT, source)
-                                if value == ";":
-                                    semicolon = True
-                                    break
-                                if value == "":
-                                    continue
-                                attributes["value"][i] = float(value)
-                        elif "matrix" in attributes:
-                            numRows, numCols = attributes["matrix"]
-                            for i in range(numRows):
-                                if semicolon:
-                                    break
-                                for j in range(numCols):
-                                    value = readItemLUN5(source)
-                                    if value == ";":
-                                        semicolon = True
-                                        break
-                                    if value == "":
-                                        continue
-                                    attributes["value"][i][j] = float(value)
-                        elif "integer" in attributes:
-                            value = readItemLUN5(source)
-                            if value == ";":
-                                semicolon = True
-                            elif value == "":
-                                attributes["value"] == None
-                            else:
-                                attributes["value"] = int(value)
-                        elif "scalar" in attributes:
-                            value = readItemLUN5(source)
-                            if value == ";":
-                                semicolon = True
-                            elif value == "":
-                                attributes["value"] == None
-                            else:
-                                attributes["value"] = float(value)
-                        elif "bit" in attributes:
-                            value = readItemLUN5(PALMAT, source)
-                            bitLength = attributes["bit"]
-                            if value == ";":
-                                semicolon = True
-                            elif value == "":
-                                attributes["value"] == [(None, bitLength)]
-                            else:
-                                value = int(value) & ((1 << bitLength) - 1)
-                                attributes["value"] = [(value, bitLength)]
-                while len(computationStack) > start:
-                    computationStack.pop()
-        elif "write" in instruction:
-            lun = instruction["write"]
-            if lun == '6':
-                print("%*s" % (indent, ""), end="")
-                for value in computationStack:
-                    if value == None:
-                        print(" None ", end="")
-                    elif isArrayQuick(value):
-                        printArray(value)
-                    elif isBitArray(value):
-                        print(" " + bin(parseBitArray(value)[0])[2:], end="")
-                    elif isinstance(value, (int, float, list)):
-                        printVectorOrMatrix(value)
-                    elif isinstance(value, str):
-                        print(value.replace("''", "'"), end="")
-                    else:
-                        print(value, end="")
-                computationStack.clear()
-                print()
-        elif "iocontrol" in instruction:
-            # We just ignore all i/o controls in WRITE for now.
-            if len(computationStack) > 0:
-                computationStack.pop()
-        elif "shaping" in instruction:
-            shapingFunction = instruction["shaping"]
-            if shapingFunction == "sliceAT":
-                sliceLength = hround(computationStack.pop())
-                sliceStart = hround(computationStack[-1])
-                computationStack[-1] = [sliceLength, sliceStart]
-            elif shapingFunction == "sliceTO":
-                sliceStart = hround(computationStack.pop())
-                sliceEnd = hround(computationStack[-1])
-                computationStack[-1] = (sliceStart, sliceEnd)
-            elif shapingFunction in ["integer", "scalar", "vector", "matrix",
-                                   "doubleinteger", "doublescalar",
-                                   "doublevector", "doublematrix"]:
-                dimensions = subscripts + subscripts2
-                if len(dimensions) == 0:
-                    if shapingFunction in ["vector", "doublevector"]:
-                        dimensions.append(3)
-                    elif shapingFunction in ["matrix", "doublematrix"]:
-                        dimensions.append(3)
-                        dimensions.append(3)
-                # We now have the dimensionality, so let's create a Python
-                # object to hold the data.  If the dimension list is empty,
-                # there are a number of special cases (presumably originally
-                # intended as convenience features for the code) that we need
-                # to consider.
-                if len(dimensions) == 0:
-                        # The shaping function has no subscripts, and the 
-                        # shaping function is integer or scalar, single or 
-                        # double precision, though in this Python implementation
-                        # single and double precision are treated as identical.
-                        object = []
-                        operand = computationStack.pop()
-                        if computationStack[-1] == {"sentinel"}:
-                            # If we're here, it's because there's a single
-                            # argument to the shaping function, currently 
-                            # stored in operand.
-                            computationStack[-1] = \
-                                toIntegerOrScalar(operand, \
-                                                  shapingFunction in \
-                                                  ["integer", "doubleinteger"])
-                        else:
-                            # If we're here, then there are multiple arguments
-                            # to the shaping functions, none of which we've yet
-                            # pulled from the stack and we're supposed to 
-                            # produce a variable-length ARRAY by unraveling all
-                            # of the arguments.
-                            fill = False # TBD ... *do* something with fill!
-                            while operand != {"sentinel"}:
-                                if operand == {"fill"}:
-                                    fill = True
-                                    operand = computationStack.pop()
-                                    continue
-                                flatten(operand, object)
-                                operand = computationStack.pop()
-                            if shapingFunction in ["integer", "doubleinteger"]:
-                                for i in range(len(object)):
-                                    if object[i] != None:
-                                        object[i] = int(object[i])
-                            elif shapingFunction in ["scalar", "doublescalar"]:
-                                for i in range(len(object)):
-                                    if object[i] != None:
-                                        object[i] = float(object[i])
-                            computationStack.append(object + ["a"])
-                        continue
-                '''
-                So if we've gotten to here, then the object we're trying to
-                construct has dimensionality; i.e., it's one of VECTOR, 
-                MATRIX, ARRAY INTEGER|SCALAR, ARRAY VECTOR, or ARRAY MATRIX.  
-                The function assignCompositeSubscripted()
-                in the module saveValueToVariable is ideal for initializing
-                such an object starting from an unraveled set of data, except
-                for the fact that it requires an object of the correct 
-                dimensionality but with uninitialized elements as input.
-                Fortunately, the function uninitializedComposite() in the 
-                palmatAux module can be used to construct the uninitialized
-                object.
-                '''
-                if shapingFunction in ["vector", "doublevector",
-                                       "matrix", "doublematrix"]:
-                    datatype = "scalar"
-                    subscripts2 = dimensions
-                    subscripts = []
-                elif shapingFunction in ["integer", "doubleinteger"]:
-                    datatype = "integer"
-                elif shapingFunction in ["scalar", "doublescalar"]:
-                    datatype = "scalar"
-                else:
-                    printError(PALMAT, source, instruction, \
-                               "Unimplemented shaping function.")
-                    return None
-                composite = uninitializedComposite(subscripts, subscripts2)
-                unraveled = []
-                while True:
-                    value = computationStack.pop()
-                    if value == {'sentinel'}:
-                        break
-                    flatten(value, unraveled)
-                subscriptedLHS = []
-                for i in subscripts + subscripts2:
-                    subscriptedLHS.append(list(range(1, i + 1)))
-                if not assignCompositeSubscripted(None, composite, \
-                                                  subscriptedLHS, \
-                               datatype, -1, unraveled):
-                    printError(PALMAT, source, instruction, \
-                               "Cannot convert or too few values")
-                    return None
-                computationStack.append(composite)
-                continue
+        elif opcode <= opIftrue and opcode >= opGoto and operand[1] != None:
+            # A jump whose target has already been resolved by xeqJump().
+            # The bit-array test is parseBitArray() inlined.
+            if opcode == opGoto:
+                taken = True
+            elif opcode == opIftrue:
+                taken = (computationStack.pop()[0] & 1) != 0
             else:
-                printError(PALMAT, source, instruction, \
-                    "Implementation error, unknown shaping function: " + \
-                    shapingFunction)
-                return None
-        elif "modern" in instruction:
-            # These are like RTL built-in functions, but are invented by me for
-            # the "modern" compiler/interpreter.  They do things to make 
-            # debugging the compiler or performing validation testing on it
-            # easier.  Note that in distinction to real RTL built-in functions,
-            # in HAL/S their names are always lower-case, so they hopefully 
-            # won't collide with any actual HAL/S code.  We'll see eventually,
-            # I suppose.
-            modern = instruction["modern"]
-            if modern == "INITIALIZED":
-                if stackSize < 1:
-                    printError(PALMAT, source, instruction, \
-                            "Not enough arguments on stack.")
-                    return None
-                if isCompletelyInitialized(computationStack[-1]):
-                    computationStack[-1] = hTRUE
-                else:
-                    computationStack[-1] = hFALSE
-            elif modern == "TYPEOF":
-                if stackSize < 1:
-                    printError(PALMAT, source, instruction, \
-                               "Not enough arguments on stack.")
-                    return None
-                operand = computationStack[-1]
-                if not isinstance(operand, str):
-                    printError(PALMAT, source, instruction, \
-                               "Argument must be a string.")
-                    return None
-                result = [""]*20
-                i, mangled = flexFindIdentifier(operand, PALMAT, scopeNumber)
-                if i == -1:
-                    a = None
-                else:
-                    i, a = findIdentifier(mangled, PALMAT, i)
-                if a == None:
-                    a = {}
-                    result[0] = "MISSING"
-                elif "bit" in a:
-                    result[0] = "BIT"
-                    result[1] = str(a["bit"])
-                elif "character" in a:
-                    result[0] = "CHARACTER"
-                    result[1] = str(a["character"])
-                elif "vector" in a:
-                    result[0] = "VECTOR"
-                    result[1] = str(a["vector"])
-                elif "matrix" in a:
-                    result[0] = "MATRIX"
-                    result[1] = str(a["matrix"][0])
-                    result[2] = str(a["matrix"][1])
-                elif "scalar" in a:
-                    result[0] = "SCALAR"
-                elif "integer" in a:
-                    result[0] = "INTEGER"
-                elif "structure" in a:
-                    result[0] = "STRUCTURE"
-                elif "label" in a:
-                    result[0] = "LABEL"
+                taken = (computationStack.pop()[0] & 1) == 0
+            if taken:
+                target = operand[1]
+                if target[0] == scopeNumber:
+                    instructionIndex = target[1]
                 else:
-                    result[0] = "?"
-                if "constant" in a:
-                    if result[0] == "BIT":
-                        value, length = parseBitArray(a["constant"])
-                        result[3] = "%d, %d" % (value, length)
-                    elif result[0] in ["VECTOR", "MATRIX"]:
-                        result[3] = str(a["constant"])
-                        result[3] = presentify(a['constant'])
-                    else:
-                        result[3] = str(a["constant"])
-                if "initial" in a:
-                    if result[0] == "BIT":
-                        value, length = parseBitArray(a["initial"])
-                        result[4] = "%d, %d" % (value, length)
-                    elif result[0] in ["VECTOR", "MATRIX"]:
-                        result[4] = str(a["initial"])
-                        result[4] = presentify(a['initial'])
-                    else:
-                        result[4] = str(a["initial"])
-                if "double" in a:
-                    result[5] = "DOUBLE"
-                if "array" in a:
-                    dimensions = a["array"]
-                    i = 15
-                    for d in dimensions:
-                        if i > 20:
-                            break
-                        result[i] = str(d)
-                        i += 1
-                computationStack[-1] = result + ["a"]
-            elif modern == "TYPEOFV":
-                # Same as TYPEOF, except analyzes the value atop the 
-                # computation stack, rather than an identifier.
-                if stackSize < 1:
-                    printError(PALMAT, source, instruction, \
-                               "Not enough arguments on stack")
-                    return None
-                operand = computationStack[-1]
-                result = [""]*20
-                if isinstance(operand, list) and len(operand) == 3 and \
-                        operand[-1] == 'p':
-                    result[0] = "POINTER"
-                elif isinstance(operand, list) and operand[-1:] == ['a']:
-                    dummy = operand
-                    dimensions = []
-                    while isinstance(dummy, list) and dummy[-1:] == ['a']:
-                        dimensions.append(len(dummy)-1)
-                        dummy = dummy[0]
-                    if isArrayGeometry(operand, dimensions):
-                        i = 15
-                        for d in dimensions:
-                            result[i] = str(d)
-                            i += 1
-                            if i > 20:
-                                break
-                        operand = dummy
-                    else:
-                        result[0] = "?"
-                if operand == None:
-                    result[0] = "NONE"
-                elif isinstance(operand, int):
-                    result[0] = "INTEGER"
-                elif isinstance(operand, float):
-                    result[0] = "SCALAR"
-                elif isinstance(operand, str):
-                    result[0] = "CHARACTER"
-                    result[1] = str(len(operand))
-                elif isBitArray(operand):
-                    result[0] = "BIT"
-                    dummy, result[1] = parseBitArray(operand)
-                elif isVector(operand, False):
-                    result[0] = "VECTOR"
-                    result[1] = str(len(operand))
-                elif isMatrix(operand, False):
-                    result[0] = "MATRIX"
-                    result[1] = str(len(operand))
-                    result[2] = str(len(operand[0]))
-                elif isinstance(operand, dict):
-                    result[0] = "STRUCTURE"
-                elif operand == {"sentinel"}:
-                    result[0] = "SENTINEL"
-                elif operand == {"fill"}:
-                    result[0] = "*"
-                elif result[0] == "":
-                    result[0] = "?"
-                computationStack[-1] = result + ["a"]
-        elif "function" in instruction:
-            function = instruction["function"]
-            # First check all of the no-argument functions.
-            if function in builtIns[0]:
-                if function == "RANDOM":
-                    # Note that this returns a number in the range [0, 1),
-                    # and therefore cannot return exactly 1.  The HAL/S
-                    # documentation isn't entirely clear whether values
-                    # that are *exactly* 0 or 1 should be returned.
-                    computationStack.append(random.random())
-                elif function == "RANDOMG":
-                    computationStack.append(random.gauss(0.0, 1.0))
-                elif function == "RUNTIME":
-                    computationStack.append(1.0e-9 * \
-                                            (time.time_ns() - timeOrigin))
-                elif function == "CLOCKTIME":
-                    rightNow = datetime.datetime.now(datetime.timezone.utc)
-                    timeOfDay = 3600 * rightNow.hour + \
-                                60 * rightNow.minute + rightNow.second + \
-                                rightNow.microsecond * 1E-6
-                    computationStack.append(timeOfDay)
-                elif function == "DATE":
-                    rightNow = datetime.datetime.now(datetime.timezone.utc)
-                    d = 10000 * rightNow.year + 100 * rightNow.month + \
-                        rightNow.day
-                    computationStack.append(d)
-                elif function == "ERRGRP":
-                    computationStack.append(errorGroup)
-                elif function == "ERRNUM":
-                    computationStack.append(errorNum)
-                else:
-                    printError(PALMAT, source, instruction, \
-                            "HAL/S built-in function " + function + \
-                            " not yet implemented")
-                    return None
-            # Now all of the one-argument functions.
-            elif function in builtIns[1]:
-                if stackSize < 1:
-                    printError(PALMAT, source, instruction, \
-                        "Not enough arguments on stack for function " + \
-                        function)
-                    return None
-                operand = computationStack[-1]
-                if function in unaryRTL: # See unaryFunctions.py module.
-                    result = arrayableUnaryRTL(PALMAT, function, \
-                                               operand, \
-                                               source, instruction)
-                    if isNaN(result):
-                        return None
-                    computationStack[-1] = result
-                elif function in accumulableFunctions: # See accumulableFunctions.py
-                    result = accumulate(PALMAT, operand, function, source, \
-                                        instruction)
-                    if isNaN(result):
-                        return None
-                    computationStack[-1] = result
-                elif function == "SIZE":
-                    if isArrayQuick(operand):
-                        dimensions, value = getArrayDimensions(operand)
-                        if len(dimensions) == 1:
-                            computationStack[-1] = dimensions[0]
-                        else:
-                            printError(PALMAT, source, instruction, \
-                                "Array for SIZE must be one-dimensional.")
-                            return None
-                    else:
-                        printError(PALMAT, source, instruction, \
-                                   "SIZE function requires an array")
-                        return None
-                elif function == "LENGTH":
-                    operand = str(operand)
-                    computationStack[-1] = len(operand)
-                elif function == "TRIM":
-                    operand = str(operand)
-                    computationStack[-1] = operand.strip()
-                else:
-                    printError(PALMAT, source, instruction, \
-                               "HAL/S built-in function " + function + \
-                               "not yet implemented")
-                    return None
-            # Now all of the two-argument functions.
-            elif function in builtIns[2]:
-                if stackSize < 2:
-                    printError(PALMAT, source, instruction, \
-                               "Not enough arguments on stack for function " + \
-                               function)
-                    return None
-                operand1 = computationStack.pop()
-                operand2 = computationStack[-1]
-                if function in binaryRTL:
-                    result = arrayableBinaryRTL(PALMAT, function, operand1, \
-                                                operand2, \
-                                                source, instruction)
-                    if isNaN(result):
-                        return None
-                    computationStack[-1] = result
-                elif function == "XOR":
-                    if not isBitArray(operand1):
-                        printError(PALMAT, source, instruction, \
-                                   "Not bit array: " + str(operand1))
-                        return None
-                    if not isBitArray(operand2):
-                        printError(PALMAT, source, instruction, \
-                                   "Not bit array: " + str(operand2))
-                        return None
-                    value1, length1 = parseBitArray(operand1)
-                    value2, length2 = parseBitArray(operand2)
-                    numbits = max(length1, length2)
-                    computationStack[-1] = formBitArray(value1^value2, numbits)
-                elif function == "SHL":
-                    operand1 = hround(operand1)
-                    operand2 = hround(operand2)
-                    computationStack[-1] = operand1 << operand2
-                elif function == "SHR":
-                    operand1 = hround(operand1)
-                    operand2 = hround(operand2)
-                    computationStack[-1] = operand1 >> operand2
-                elif function == "INDEX":
-                    # In Python, the character positions within the string are
-                    # indexed from 0 (with -1 being "not present"), while in 
-                    # HAL/S indexing is from 1 (with 0 being "not present").
-                    operand1 = str(operand1)
-                    operand2 = str(operand2)
-                    computationStack[-1] = 1 + operand1.find(operand2)
-                elif function == "LJUST":
-                    operand1 = str(operand1)
-                    operand2 = hround(operand2)
-                    if operand2 < len(operand1):
-                        computationStack[-1] = operand1[:operand2]
-                        # This is also supposed to signal an error, which
-                        # I have no idea about right now, so I'll have to come
-                        # back to it later.
-                        # TBD
-                    else:
-                        computationStack[-1] = "%*s" % (-operand2, operand1)
-                elif function == "RJUST":
-                    operand1 = str(operand1)
-                    operand2 = hround(operand2)
-                    if operand2 < len(operand1):
-                        computationStack[-1] = operand1[:operand2]
-                        # This is also supposed to signal an error, which
-                        # I have no idea about right now, so I'll have to come
-                        # back to it later.
-                        # TBD
-                    else:
-                        computationStack[-1] = "%*s" % (operand2, operand1)
-                else:
-                    printError(PALMAT, source, instruction, \
-                               "HAL/S built-in function " + function + \
-                               " not yet implemented")
-                    return None
-            # Now all of the three-argument functions.
-            elif function in builtIns[3]:
-                if stackSize < 3:
-                    printError(PALMAT, source, instruction, \
-                               "Not enough arguments on stack for function " \
-                               + function)
-                    return None
-                operand1 = computationStack.pop()
-                operand2 = computationStack.pop()
-                operand3 = computationStack[-1]
-                if function == "MIDVAL":
-                    result = trinaryOperation(PALMAT, simpleMIDVAL, operand1, \
-                                              operand2, operand3)
-                    if isNaN(result):
-                        printError(PALMAT, source, instruction, \
-                                   "Incompatible operands for MIDVAL function")
-                        return None
-                    computationStack[-1] = result
-                else:
-                    printError(PALMAT, source, instruction, \
-                               "HAL/S built-in function " + function \
-                               + "not yet implemented")
-                    return None
-            else:
-                printError(PALMAT, source, instruction, \
-                           "Implementation error, function " + function)
-                return None
-        elif "goto" in instruction:
-            scopeNumber, instructionIndex = \
-                    jump(PALMAT, source, scopeNumber, instruction, "goto")
-            scope = scopes[scopeNumber]
-        elif "calloffset" in instruction:
-            identifier = instruction["calloffset"]
-            if identifier not in identifiers:
-                printError(PALMAT, source, instruction, \
-                           "Implementation error, identifier %s not found" \
-                           % identifier)
-                return None
-            scope["returnoffset"] = instructionIndex;
-            instructionIndex = identifiers[identifier]["label"][1]
-        elif "returnoffset" in instruction:
-            i = instruction["returnoffset"]
-            if i == -1:
-                i = scopeNumber
-                while i != None and "returnoffset" not in scopes[i]:
-                    i = scopes[i]["parent"]
-                if i == None:
-                    printError(PALMAT, source, instruction, \
-                               "Implementation error, cannot find returnoffset.")
-                    return None
-            scope = scopes[i]
-            if "returnoffset" in scope:
-                instructionIndex = scope.pop("returnoffset")
-                scopeNumber = i
-            else:
-                printError(PALMAT, source, instruction, \
-                           "Implementation error, returnoffset not in scope.")
-                for key in sorted(scope):
-                    print("\t%s:" % key, scope[key])
-                return None
-        elif "case" in instruction:
-            if len(computationStack) < 1:
-                printError(PALMAT, source, instruction, \
-                           "Computation stack too short in CASE.")
-                return None
-            prefix = instruction["case"]
-            caseNumber = computationStack.pop()
-            if isinstance(caseNumber, float):
-                caseNumber = hround(caseNumber)
-            if not isinstance(caseNumber, int):
-                printError(PALMAT, source, instruction, "Non-numeric CASE key.")
-                return None
-            if caseNumber >= 1:
-                identifier = "^%s%d^" % (prefix, caseNumber)
-                if identifier not in identifiers:
-                    identifier = "^" + prefix + "else^"
-            else:
-                identifier = "^" + prefix + "else^"
-            if identifier not in identifiers:
-                identifier = "^" + prefix + "exit^"
-            if identifier not in identifiers:
-                printError(PALMAT, source, instruction, \
-                    "Implementation error, no accessible labels in CASE")
-                return None
-            instructionIndex = identifiers[identifier]["label"][1]
-        elif "iffalse" in instruction:
-            value, dummy = parseBitArray(computationStack.pop())
-            if (value & 1) == 0:
-                scopeNumber, instructionIndex = \
-                    jump(PALMAT, source, scopeNumber, instruction, "iffalse")
-                scope = scopes[scopeNumber]
-        elif "iftrue" in instruction:
-            value, dummy = parseBitArray(computationStack.pop())
-            if (value & 1) != 0:
-                scopeNumber, instructionIndex = \
-                    jump(PALMAT, source, scopeNumber, instruction, "iftrue")
-                scope = scopes[scopeNumber]
-        elif "noop" in instruction:
-            pass # Nothing to do!
-        elif "run" in instruction:
-            si, identifier = instruction["run"]
-            identifier = "^" + identifier + "^"
-            attributes = PALMAT["scopes"][si]["identifiers"][identifier]
-            if attributes == None:
-                printError(PALMAT, source, instruction, \
-                           "Target of RUN not found: " + identifier)
-                return None
-            if "program" not in attributes:
-                printError(PALMAT, source, instruction, \
-                           "RUN target is not a PROGRAM: " + identifier)
-                return None
-            scopeNumber = attributes["scope"]
-            instructionIndex = 0;
-            scope = scopes[scopeNumber]
-        elif "call" in instruction:
-            si, identifier = instruction["call"]
-            identifier = "^" + identifier + "^"
-            attributes = PALMAT["scopes"][si]["identifiers"][identifier]
-            if attributes == None:
-                printError(PALMAT, source, instruction, \
-                           "Target of CALL not found: " + identifier)
-                return None
-            if "function" not in attributes and "procedure" not in attributes:
-                printError(PALMAT, source, instruction, \
-                           "CALL to neither a FUNCTION nor PROCEDURE: " \
-                           + identifier)
-                return None
-            si = attributes["scope"]
-            s = scopes[si]
-            if "return" in s:
-                printError(PALMAT, source, identifier, \
-                           "Recursion in subroutine %s not allowed." \
-                           % identifier[1:-1])
-                return None
-            # The return address.
-            returnAddress = (scopeNumber, instructionIndex)
-            #computationStack.append((scopeNumber, instructionIndex))
-            # Transfer control.
-            scopeNumber = si
-            instructionIndex = 0
-            scope = s
-            if "assignments" in instruction:
-                scope["assignments"] = copy.deepcopy(instruction["assignments"])
-            scope["return"] = returnAddress
-        elif "return" in instruction:
-            enclosure = scope
-            while enclosure != None:
-                if "return" in enclosure:
-                    scopeNumber, instructionIndex = enclosure["return"]
-                    enclosure.pop("return")
-                    if "assignments" in enclosure:
-                        enclosure.pop("assignments")
-                    break
-                enclosure = PALMAT["scopes"][enclosure["parent"]]
-            if enclosure == None:
-                printError(PALMAT, source, instruction, \
-                           "Implementation error, no return address")
-                return None
-            #scopeNumber, instructionIndex = computationStack.pop(-stackPos)
-            scope = scopes[scopeNumber]
-        elif "halt" in instruction:
-            # Ends emulation.
-            #printError(PALMAT, source, None, "Normal program termination")
-            return None
-        elif "automatics" in instruction:
-            for identifier in identifiers:
-                attributes = identifiers[identifier]
-                if "initial" in attributes and "automatic" in attributes:
-                    attributes["value"] = copy.deepcopy(attributes["initial"])
-        elif "partition" in instruction:
-            computationStack.append({"semicolon"})
+                    transfer(vm, target[0], target[1])
+                    code = vm["code"]
+                    instructionIndex = vm["index"]
+                    scopeNumber = vm["scopeNumber"]
         else:
-            printError(PALMAT, source, instruction, \
-                       "Implementation error, unknown PALMAT: " + instruction)
-            return None
+            vm["index"] = instructionIndex
+            if handlers[opcode](vm, operand, instruction) is False:
+                return None
+            code = vm["code"]
+            instructionIndex = vm["index"]
+            scopeNumber = vm["scopeNumber"]
+            pending = vm["pending"]
     if trace:
         print("\tTRACE:  ", computationStack, \
               " (%d,%d):" % (scopeNumber, instructionIndex), "(end)")
+    if vm["pending"] != None:
+        qualifications, subscripts, subscripts2 = vm["pending"]
+        if len(qualifications) > 0:
+            scope0["qualifications"] = qualifications
+        if len(subscripts) > 0 or len(subscripts2) > 0:
+            scope0["subscripts"] = subscripts
+            scope0["subscripts2"] = subscripts2
     return computationStack
@@ -969,8 +969,10 @@ def generatePALMAT(ast, PALMAT, state={ "history":[], "scopeIndex":0 },
             # This is the instruction that jumps to the scope containing the
             # DO-loop associated with the label.  It should be of the form
             # {'goto': (index, entryLabel), ...}, and we can use that to find
-            # the scope actually containing the DO-loop.
-            dummy = jumpDoInstruction["goto"]
+            # the scope actually containing the DO-loop.  (Unless linkPALMAT()
+            # has already replaced it by the address of the entryLabel.)
+            dummy = jumpDoInstruction.get("symbolicLabel", \
+                                          jumpDoInstruction["goto"])
             doScopeIndex = \
                 PALMAT["scopes"][dummy[0]]["identifiers"][dummy[1]]["label"][0]
             doScope = PALMAT["scopes"][doScopeIndex]
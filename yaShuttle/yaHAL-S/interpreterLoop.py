@@ -9,6 +9,7 @@ Requirements:   READLINE module
 History:        2022-12-16 RSB  Split off the nascent form from 
                                 yaHAL-S-FC.py.
                 2023-02-18 RSB  Added the optimizePALMAT() pass.
+                2026-10-17 RSB  Added the linkPALMAT() pass.
 """
 
 #-------------------------------------------------------------------------
@@ -63,6 +64,7 @@ from p_Functions import removeIdentifier, removeAllIdentifiers, substate, \
 from executePALMAT import executePALMAT
 from replaceBy import bareIdentifierPattern
 from optimizePALMAT import optimizePALMAT
+from linkPALMAT import linkPALMAT
 
 # The following makes the buffer for user input persistent, or at least tries
 # to.  It works for me anyway.
@@ -343,6 +345,9 @@ def interpreterLoop(shouldColorize=False, \
                         print("\tFailure!")
                     else:
                         PALMAT = newPALMAT
+                        # Relinking reattaches the jump targets to the
+                        # labels, which isn't preserved in the file.
+                        linkPALMAT(PALMAT)
                         print("\tSuccess!")
                     continue
                 elif firstWord == "DATA":
@@ -706,6 +711,7 @@ def interpreterLoop(shouldColorize=False, \
                          strict, trace0)
         if optimize:
             optimizePALMAT(PALMAT)
+        linkPALMAT(PALMAT)
         if len(substate["warnings"]):
             for warning in substate["warnings"]:
                 print("\tWarning:", warning)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright:      None - the author (Ron Burkey) declares this software to
+                be in the Public Domain, with no rights reserved.
+Filename:       linkPALMAT.py
+Purpose:        Resolves symbolic jump targets in PALMAT, after code
+                generation and optimization but before execution.
+History:        2026-10-17 RSB  Created.
+
+The code generator emits goto, iffalse, and iftrue instructions whose targets
+are symbolic, of the form (scopeIndex, "^label^"), where the label's actual
+address is an attribute of the identifier "^label^" in scope scopeIndex.  The
+emulator used to resolve those the first time each jump was actually taken
+(see jump() in executePALMAT.py), which meant a couple of dictionary lookups
+by name at runtime, and meant that code which was never executed was never
+checked.
+
+linkPALMAT() instead does all of that resolution up front, in the same way
+jump() did it:  the symbolic target is moved to the instruction's
+"symbolicLabel" field, and the instruction's target is replaced by the
+label's [scopeIndex, offset] address.  Note that the address is the very same
+list object which is stored in the label's attributes, rather than a copy,
+so that if optimizePALMAT() is subsequently run again and shifts the labels
+around (as happens in the interpreter, each time new code is added), the
+already-linked jumps remain correct.
+
+Linking is idempotent, and is meant to be repeated after each optimization.
+Jumps to labels which don't exist (yet) are simply left symbolic, and will be
+diagnosed by jump() if they're ever taken.
+
+As for identifiers, rather than labels, those are bound to their actual
+attributes by loadScope() (see loadPALMAT.py) when the emulator starts,
+since each instantiation of a PALMAT has its own copies of them.
+"""
+
+from palmatAux import jumpInstructions
+
+# Link the jumps in a single list of instructions.  Returns the number of
+# jumps whose targets could not be resolved.
+def linkInstructions(PALMAT, instructions):
+    scopes = PALMAT["scopes"]
+    unresolved = 0
+    for instruction in instructions:
+        for instructionName in jumpInstructions:
+            if instructionName in instruction:
+                break
+        else:
+            continue
+        if "symbolicLabel" in instruction:
+            si, s = instruction["symbolicLabel"]
+        else:
+            si, s = instruction[instructionName]
+            if not isinstance(s, str):
+                # Already an address, perhaps from a PALMAT file.
+                continue
+        attributes = scopes[si]["identifiers"].get(s)
+        if attributes == None or "label" not in attributes:
+            unresolved += 1
+            continue
+        instruction["symbolicLabel"] = (si, s)
+        instruction[instructionName] = attributes["label"]
+    return unresolved
+
+# This is the top-level linking function.  Linking is done in place on the
+# provided PALMAT structure.  Returns the number of unresolved jumps.
+def linkPALMAT(PALMAT):
+    unresolved = 0
+    for scope in PALMAT["scopes"]:
+        unresolved += linkInstructions(PALMAT, scope["instructions"])
+    return unresolved
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright:      None - the author (Ron Burkey) declares this software to
+                be in the Public Domain, with no rights reserved.
+Filename:       loadPALMAT.py
+Purpose:        Lowers the PALMAT instructions of a scope into the compact
+                "bytecode" form actually executed by executePALMAT.py.
+History:        2026-10-17 RSB  Split off from executePALMAT.py.
+                2026-10-17 RSB  Identifiers, CASE labels, and linked jump
+                                targets are now bound at load time.
+                2026-10-17 RSB  Made binding of identifiers optional.
+
+PALMAT instructions, as generated by the compiler (and as saved in PALMAT
+files), are Python dictionaries having a single key which identifies the
+instruction, plus some optional keys like "source" and "label".  That's nice
+for reading and debugging, but it's a terrible way to execute them, since
+executePALMAT() formerly had to determine which instruction it was looking at
+by testing the dictionary for each of the possible keys in turn ... something
+like 40 of them for the instructions near the end of the list.
+
+Instead, the loadScope() function below converts (once) a scope's entire list
+of instructions into a parallel list of tuples of the form
+
+    (opcode, operand, source, instruction)
+
+where opcode is a small integer used by executePALMAT() as an index into its
+table of instruction handlers, operand is whatever the instruction's handler
+needs already extracted from the instruction and pre-digested (numeric
+literals converted to numbers, identifiers mangled, operators and built-in
+functions sorted into groups, and so on), source is the instruction's "source"
+field or None, and instruction is the original instruction dictionary, which
+is retained only for error messages and tracing.
+
+The tests below are made in exactly the same order as the original chain of
+tests in executePALMAT(), so that an instruction with (say) both a "debug" key
+and some other key is treated the same way as before.
+
+Since loadScope() is run separately for each instantiation of a PALMAT,
+it also binds the identifiers referenced by instructions directly to their
+attributes in that instantiation, so that the emulator doesn't have to look
+them up by name.  Similarly for the labels used by "calloffset" and "case".
+The targets of jumps are taken from the instructions as already resolved by
+linkPALMAT() (see linkPALMAT.py); jumps which weren't linked are still
+resolved the first time they're taken, via jump() in executePALMAT.py.
+"""
+
+from palmatAux import stringifiedToFloat
+
+'''
+Categorization of the HAL/S built-in functions by the number of arguments
+they take.
+'''
+builtIns = [
+    # No arguments
+    ["CLOCKTIME", "DATE", "ERRGRP", "ERRNUM", "PRIO", "RANDOM", "RANDOMG",
+     "RUNTIME"],
+    # One argument
+    ["ABS", "CEILING", "FLOOR", "ODD", "ROUND", "SIGN", "SIGNUM", "TRUNCATE",
+     "ARCCOS", "ARCCOSH", "ARCSIN", "ARCSINH", "ARCTAN", "ARCTANH", "COS",
+     "COSH", "EXP", "LOG", "SIN", "SINH", "SQRT", "TAN", "TANH",
+     "ABVAL", "DET", "INVERSE", "TRACE", "TRANSPOSE", "UNIT",
+     "MAX", "MIN", "PROD", "SUM", "LENGTH", "TRIM", "NEXTIME", "SIZE"],
+    # Two arguments
+    ["DIV", "MOD", "REMAINDER", "ARCTAN2", "XOR", "INDEX", "LJUST", "RJUST",
+     "SHL", "SHR"],
+    # Three arguments
+    ["MIDVAL"]
+]
+
+unaryOperators = ("U-", "NOT")
+binaryOperators = ("+", "-", "", "/", "**", ".", "*", "C||", "OR", "AND",
+                   "==", "!=", "<", ">", "<=", ">=", "B||", "ORNOT")
+shapingFunctions = ("integer", "scalar", "vector", "matrix", "doubleinteger",
+                    "doublescalar", "doublevector", "doublematrix")
+
+# The opcodes.  These are indices into the handlers[] table of
+# executePALMAT.py.  The instructions from opDotted onward are "special", in
+# that they may transfer control or may leave structure qualifications or
+# subscripts for the following instruction, so executePALMAT() must refresh
+# its notion of the machine state after executing them.
+(opDebug, opEmpty, opFill, opPush, opStringifiedNumber, opIncrementAndTest,
+ opSentinel, opRepeat, opUnary, opBinary, opUnknownOperator, opFetch,
+ opUnravel, opFetchp, opStore, opStorepop, opSubstore, opSubstorepop, opPop,
+ opRead, opWrite, opIocontrol, opSliceAT, opSliceTO, opShape,
+ opUnknownShaping, opInitialized, opTypeof, opTypeofv, opFunction0,
+ opFunction1, opFunction2, opFunction3, opUnknownFunction, opAutomatics,
+ opPartition, opUnknown,
+ opDotted, opSubscripts, opGoto, opIffalse, opIftrue, opCalloffset,
+ opReturnoffset, opCase, opRun, opCall, opReturn, opHalt) = range(49)
+numOpcodes = 49
+
+# Identifiers in instructions are given in the form (scopeIndex, identifier),
+# whereas they're stored in the scopes' "identifiers" dictionaries in the
+# mangled form "^identifier^".  The operand we make from that is
+# (scopeIndex, identifier, mangledIdentifier, attributes), where attributes
+# is None if scopeIndex is -1 (i.e., for an alias in a procedure call, which
+# can only be resolved at runtime), if the identifier doesn't exist, or if
+# scopes is None (i.e., if identifiers aren't being bound).
+def identifierOperand(scopes, instructionOperand):
+    si, identifier = instructionOperand
+    mangled = "^" + identifier + "^"
+    attributes = None
+    if si != -1 and scopes != None:
+        attributes = scopes[si]["identifiers"].get(mangled)
+    return (si, identifier, mangled, attributes)
+
+# The operand for "goto", "iffalse", and "iftrue" is a list of the form
+# [instructionName, target], where target is the (scopeIndex, offset) of the
+# jump target if the instruction has been linked, or else None for now.
+def jumpOperand(instruction, instructionName):
+    target = instruction[instructionName]
+    if isinstance(target[1], str):
+        return [instructionName, None]
+    return [instructionName, tuple(target)]
+
+# Returns the offset of a label in an identifier list, or None.
+def labelOffset(identifiers, identifier):
+    attributes = identifiers.get(identifier)
+    if attributes == None or "label" not in attributes:
+        return None
+    return attributes["label"][1]
+
+# The operand for "case" is (prefix, targets, default), where targets[n] is
+# the offset of the label for case n (or else None), and default is that of
+# the ELSE or else the exit label (or else None), as in the original tests
+# made by executePALMAT() at runtime.
+def caseOperand(identifiers, prefix):
+    targets = [None]
+    while True:
+        offset = labelOffset(identifiers, "^%s%d^" % (prefix, len(targets)))
+        if offset == None:
+            break
+        targets.append(offset)
+    default = labelOffset(identifiers, "^" + prefix + "else^")
+    if default == None:
+        default = labelOffset(identifiers, "^" + prefix + "exit^")
+    return (prefix, tuple(targets), default)
+
+# Lower a single instruction to (opcode, operand).  The scopes are those of
+# the PALMAT being executed (or None to leave variables unbound), and 
+# identifiers are those of the scope containing the instruction.
+def loadInstruction(scopes, identifiers, instruction):
+    if "debug" in instruction:
+        return opDebug, None
+    elif "empty" in instruction:
+        return opEmpty, None
+    elif "fill" in instruction:
+        return opFill, None
+    elif "string" in instruction:
+        return opPush, instruction["string"]
+    elif "boolean" in instruction:
+        return opPush, instruction["boolean"]
+    elif "number" in instruction:
+        try:
+            value = int(instruction["number"])
+        except:
+            try:
+                value = stringifiedToFloat(instruction["number"])
+            except:
+                # Malformed, so leave it to fail if and when it's executed.
+                return opStringifiedNumber, instruction["number"]
+        return opPush, value
+    elif "vector" in instruction:
+        return opPush, instruction["vector"]
+    elif "matrix" in instruction:
+        return opPush, instruction["matrix"]
+    elif "array" in instruction:
+        return opPush, instruction["array"]
+    elif "+><" in instruction:
+        return opIncrementAndTest, \
+            identifierOperand(scopes, instruction["+><"])
+    elif "sentinel" in instruction:
+        return opSentinel, None
+    elif "operator" in instruction:
+        operator = instruction["operator"]
+        if operator == "#":
+            return opRepeat, operator
+        elif operator == "dotted":
+            return opDotted, operator
+        elif operator == "subscripts":
+            return opSubscripts, operator
+        elif operator in unaryOperators:
+            return opUnary, operator
+        elif operator in binaryOperators:
+            return opBinary, operator
+        return opUnknownOperator, operator
+    elif "fetch" in instruction:
+        return opFetch, identifierOperand(scopes, instruction["fetch"])
+    elif "unravel" in instruction:
+        return opUnravel, identifierOperand(scopes, instruction["unravel"])
+    elif "fetchp" in instruction:
+        return opFetchp, identifierOperand(scopes, instruction["fetchp"])
+    elif "store" in instruction:
+        return opStore, identifierOperand(scopes, instruction["store"])
+    elif "storepop" in instruction:
+        return opStorepop, identifierOperand(scopes, instruction["storepop"])
+    elif "substore" in instruction:
+        return opSubstore, identifierOperand(scopes, instruction["substore"])
+    elif "substorepop" in instruction:
+        return opSubstorepop, \
+            identifierOperand(scopes, instruction["substorepop"])
+    elif "pop" in instruction:
+        return opPop, instruction["pop"]
+    elif "read" in instruction:
+        return opRead, instruction["read"]
+    elif "write" in instruction:
+        return opWrite, instruction["write"]
+    elif "iocontrol" in instruction:
+        return opIocontrol, None
+    elif "shaping" in instruction:
+        shapingFunction = instruction["shaping"]
+        if shapingFunction == "sliceAT":
+            return opSliceAT, shapingFunction
+        elif shapingFunction == "sliceTO":
+            return opSliceTO, shapingFunction
+        elif shapingFunction in shapingFunctions:
+            return opShape, shapingFunction
+        return opUnknownShaping, shapingFunction
+    elif "modern" in instruction:
+        modern = instruction["modern"]
+        if modern == "INITIALIZED":
+            return opInitialized, modern
+        elif modern == "TYPEOF":
+            return opTypeof, modern
+        elif modern == "TYPEOFV":
+            return opTypeofv, modern
+        # Unknown "modern" functions have always been silently ignored.
+        return opDebug, modern
+    elif "function" in instruction:
+        function = instruction["function"]
+        if function in builtIns[0]:
+            return opFunction0, function
+        elif function in builtIns[1]:
+            return opFunction1, function
+        elif function in builtIns[2]:
+            return opFunction2, function
+        elif function in builtIns[3]:
+            return opFunction3, function
+        return opUnknownFunction, function
+    elif "goto" in instruction:
+        return opGoto, jumpOperand(instruction, "goto")
+    elif "calloffset" in instruction:
+        identifier = instruction["calloffset"]
+        return opCalloffset, (identifier, labelOffset(identifiers, identifier))
+    elif "returnoffset" in instruction:
+        return opReturnoffset, instruction["returnoffset"]
+    elif "case" in instruction:
+        return opCase, caseOperand(identifiers, instruction["case"])
+    elif "iffalse" in instruction:
+        return opIffalse, jumpOperand(instruction, "iffalse")
+    elif "iftrue" in instruction:
+        return opIftrue, jumpOperand(instruction, "iftrue")
+    elif "noop" in instruction:
+        return opDebug, None
+    elif "run" in instruction:
+        return opRun, identifierOperand(scopes, instruction["run"])
+    elif "call" in instruction:
+        return opCall, identifierOperand(scopes, instruction["call"])
+    elif "return" in instruction:
+        return opReturn, None
+    elif "halt" in instruction:
+        return opHalt, None
+    elif "automatics" in instruction:
+        return opAutomatics, None
+    elif "partition" in instruction:
+        return opPartition, None
+    return opUnknown, None
+
+# Lower all of the instructions of the scope scopes[scopeNumber].  If 
+# bindIdentifiers is False, the variables referenced by instructions are left
+# to be looked up by name at runtime, because their attributes may change.
+def loadScope(scopes, scopeNumber, bindIdentifiers=True):
+    scope = scopes[scopeNumber]
+    identifiers = scope["identifiers"]
+    if bindIdentifiers:
+        identifierScopes = scopes
+    else:
+        identifierScopes = None
+    code = []
+    for instruction in scope["instructions"]:
+        opcode, operand = loadInstruction(identifierScopes, identifiers, \
+                                          instruction)
+        code.append((opcode, operand, instruction.get("source"), instruction))
+    return code
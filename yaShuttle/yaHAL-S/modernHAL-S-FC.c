@@ -9,6 +9,7 @@
   Reference:    http://www.ibibio.org/apollo
   Mods:         2022-12-12 RSB  Adapted from a makefile auto-generated by
                                 BNF Converter.
+                2026-10-17 RSB  Added --server.
 */
 
 #include <stdio.h>
@@ -25,6 +26,53 @@ void usage(void) {
   printf("The available OPTIONS are:\n");
   printf("\t--help            Print this message and quit.\n");
   printf("\t--trace           Enable parser tracing.\n");
+  printf("\t--server          Parse any number of compilation units from\n");
+  printf("\t                  stdin, as described in modernHAL-S-FC.c.\n");
+}
+
+/*
+  In --server mode, each compilation unit is sent to stdin as a line
+  containing its length in bytes, followed by exactly that many bytes of
+  source code.  The abstract syntax (if the parse succeeded) is printed on
+  stdout and error messages on stderr, just as for a single compilation, but
+  then each of stdout and stderr has a line consisting of END_OF_PARSE 
+  appended to it, so that the caller knows when it has everything.  This
+  continues until stdin is closed.  The point of this is that a caller like 
+  yaHAL-S-FC.py's interpreter, which compiles a single statement at a time,
+  needn't start a new process for every statement.
+  
+  Note that BNF Converter provides no way to free abstract syntax trees, so
+  the memory used by the server grows with each compilation unit.
+*/
+#define END_OF_PARSE "\x04"
+
+int server(void)
+{
+  COMPILATION parse_tree;
+  long length;
+  char *source;
+
+  while (1 == scanf("%ld", &length) && getchar() == '\n' && length >= 0)
+    {
+      source = malloc(length + 1);
+      if (source == NULL)
+        return 1;
+      if (fread(source, 1, length, stdin) != length)
+        {
+          free(source);
+          return 1;
+        }
+      source[length] = 0;
+      parse_tree = psCOMPILATION(source);
+      free(source);
+      if (parse_tree)
+        printf("%s\n", showCOMPILATION(parse_tree));
+      printf("%s\n", END_OF_PARSE);
+      fflush(stdout);
+      fprintf(stderr, "%s\n", END_OF_PARSE);
+      fflush(stderr);
+    }
+  return 0;
 }
 
 int main(int argc, char ** argv)
@@ -48,6 +96,10 @@ int main(int argc, char ** argv)
           extern int HAL_Sdebug;
           HAL_Sdebug = 1;
         }
+      else if (!strcmp(argv[i], "--server"))
+        {
+          return server();
+        }
       else if (argv[i][0] == '-')
         {
           printf("Unrecognized option %s.\n\n", argv[i]);
@@ -15,6 +15,8 @@ History:        2023-01-10 RSB  Split off from PALMAT.py.
                                 so that if other modules use these functions,
                                 they'll be insulated from future changes to the
                                 format (of which I don't expect any).
+                2026-10-17 RSB  Added optional NumPy support for large MATRIX
+                                and ARRAY arithmetic, and copyVectorOrMatrix().
 """
 
 import json
@@ -24,6 +26,16 @@ import math
 from math import nan as NaN
 from decimal import Decimal, ROUND_HALF_UP
 
+# NumPy is optional.  If it's present, it's used (see toNumpy() below) to 
+# speed up the products of large MATRIX values and the accumulation of large
+# ARRAYs; if not, the pure-Python code for those is used instead.
+numpyPresent = True
+numpyMinimumSize = 64
+try:
+    import numpy
+except ModuleNotFoundError:
+    numpyPresent = False
+
 # The following patterns are used the same way as "\\b" would be used in a 
 # regex at the start and end of a pattern to indicate a word boundary.  The 
 # difference is that (effectively) they add "." to the list of "word
@@ -445,6 +457,91 @@ def flatten(object, onto):
     else:
         onto.append(object)
 
+'''
+Conversions between our internal representation of VECTOR, MATRIX, and 
+ARRAY values (nested Python lists, with a trailing "a" at each level of an
+ARRAY) and NumPy arrays.  The values stored in variables, in the computation
+stack, and in PALMAT files always remain in our own representation, since 
+that's what everything else (such as saveValueToVariable(), sliceIt(), WRITE,
+and JSON) understands; NumPy arrays are used only transiently, within the 
+computations which are faster with them.
+
+toNumpy() returns a NumPy array of float64, or None if NumPy isn't present 
+or the value can't be so converted.  The latter is deliberately strict:  the
+value must be a VECTOR, MATRIX, or ARRAY thereof whose elements are all 
+initialized and are all floats, since INTEGER or uninitialized elements have
+to be treated differently than NumPy would treat them, and are therefore
+left to the pure-Python code.  Nor are values with fewer than 
+numpyMinimumSize elements (an 8x8 MATRIX) converted, since for those the
+conversions cost more than NumPy saves.
+'''
+def toNumpy(value):
+    if not numpyPresent or not isinstance(value, list):
+        return None
+    shape = numpyShape(value)
+    size = 1
+    for n in shape:
+        size *= n
+    if size < numpyMinimumSize:
+        return None
+    onto = []
+    flattenNumeric(value, onto)
+    if len(onto) != size:
+        return None
+    for e in onto:
+        if type(e) is not float:
+            return None
+    return numpy.array(onto).reshape(shape)
+
+# Flattens the elements of a VECTOR, MATRIX, or ARRAY thereof onto a list.
+# Anything else (bit strings, character strings, None) is appended as-is.
+def flattenNumeric(value, onto):
+    if isArrayQuick(value):
+        for e in value[:-1]:
+            flattenNumeric(e, onto)
+    elif isinstance(value, list) and len(value) > 0 and \
+            not isinstance(value[-1], str):
+        for e in value:
+            flattenNumeric(e, onto)
+    else:
+        onto.append(value)
+
+# The NumPy shape corresponding to a VECTOR, MATRIX, or ARRAY thereof.
+def numpyShape(value):
+    shape = []
+    while isinstance(value, list) and len(value) > 0:
+        if isArrayQuick(value):
+            shape.append(len(value) - 1)
+        else:
+            shape.append(len(value))
+        value = value[0]
+    return tuple(shape)
+
+# Returns a copy of value if it's a VECTOR or MATRIX (not an ARRAY) whose
+# elements are all initialized SCALARs, or else None.  This is much faster 
+# than copy.deepcopy() or sliceIt() for the small VECTOR and MATRIX values
+# (3-vectors, 3x3 matrices) that most HAL/S code manipulates.
+def copyVectorOrMatrix(value):
+    if type(value) is not list or len(value) < 2:
+        return None
+    if type(value[0]) is list:
+        numCols = len(value[0])
+        if numCols < 2:
+            return None
+        copied = []
+        for row in value:
+            if type(row) is not list or len(row) != numCols:
+                return None
+            for e in row:
+                if type(e) is not float or e != e:
+                    return None
+            copied.append(row[:])
+        return copied
+    for e in value:
+        if type(e) is not float or e != e:
+            return None
+    return value[:]
+
 # This is used when a problem with a block is sufficiently severe that 
 # it has to be removed.  That necessitates removing its parent, grandparent,
 # and so on that have already been allocated, up to but not including the root.  
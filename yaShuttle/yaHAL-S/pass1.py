@@ -8,6 +8,13 @@ Purpose:        This is for yaHAL-S-FC.py.  It tries to parse the abstract
                 syntax tree output by the HAL/S compiler front-end into a 
                 usable form.
 History:        2022-12-12 RSB  Created.
+                2026-10-17 RSB  Compilations are now normally passed to a
+                                persistent compiler front-end process, 
+                                rather than to a new process via a temporary
+                                file.  The server's stderr is drained by a
+                                thread of its own, so that a unit with lots
+                                of diagnostics can't deadlock the two
+                                processes.
 
 Parsing the abstract syntax tree output by the Printer.c autogenerated by
 BNF Converter is actually quite hard, and may be impossible.  That's because
@@ -33,6 +40,9 @@ import subprocess
 import re
 import platform
 import os
+import atexit
+import threading
+import queue
 
 tmpFile = "yaHAL-S-FC.tmp"
 # Determine the path to the preprocessor script, since that's where auxiliary
@@ -44,7 +54,8 @@ path = re.sub("[^/\\\\]*$", "", os.path.realpath(sys.argv[0]))
 # really tested much except the one I run on my own computer.  The compiler 
 # executables must be in the PATH.
 parms = {
-    "compiler": path + "modernHAL-S-FC" 
+    "compiler": path + "modernHAL-S-FC",
+    "server": True
 }
 if platform.system() == "Windows":
     parms["compiler"] += ".exe"
@@ -164,10 +175,102 @@ def makeTree(abstractSyntax, index=0):
             sys.exit(1)
         index += 1
 
+# The compiler front end can be run in a --server mode (see 
+# modernHAL-S-FC.c), in which case it stays alive and accepts any number of
+# compilation units on its stdin, rather than having to be run anew (and 
+# reading a temporary file) for every compilation.  That makes a big 
+# difference for the interpreter, which compiles each statement separately.
+# The server is started the first time it's needed, and restarted if the 
+# compiler or wine setting changes.  If it cannot be run in that mode (for
+# example, if the compiler executable predates --server), we fall back to 
+# running the compiler for each compilation, as always.  The --trace option
+# also falls back to that, since tracing wants to see the full stderr of the
+# front end.
+endOfParse = "\x04"
+server = { "process": None, "command": None, "unavailable": [],
+           "stderr": None }
+
+def stopServer():
+    process = server["process"]
+    server["process"] = None
+    server["command"] = None
+    if process != None:
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except:
+            process.kill()
+atexit.register(stopServer)
+
+# Reads lines from a stream of the server, up to the endOfParse marker.  
+# Returns the list of lines, or None if the server died.
+def readServer(stream):
+    lines = []
+    while True:
+        line = stream.readline()
+        if line == b"":
+            return None
+        line = line.decode("utf-8").rstrip("\r\n")
+        if line == endOfParse:
+            return lines
+        lines.append(line)
+
+# The server's stderr is read continuously by a separate thread, which queues
+# the lines for each compilation (or None when the server dies).  Otherwise,
+# reading all of stdout before any of stderr would deadlock as soon as a
+# compilation wrote more to stderr than fits in the pipe.
+def readServerErrors(stream, errorQueue):
+    while True:
+        lines = readServer(stream)
+        errorQueue.put(lines)
+        if lines == None:
+            return
+
+# Compiles a list of source lines using the server.  Returns a pair of 
+# lists of lines (stdout, stderr), or else None if the server isn't usable.
+def serverParse(compilerAndParameters, sourceList):
+    command = tuple(compilerAndParameters)
+    if command in server["unavailable"]:
+        return None
+    if server["command"] != command:
+        stopServer()
+        try:
+            server["process"] = subprocess.Popen(
+                compilerAndParameters + ["--server"], stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except:
+            server["unavailable"].append(command)
+            return None
+        server["command"] = command
+        server["stderr"] = queue.Queue()
+        threading.Thread(target=readServerErrors, daemon=True,
+                         args=(server["process"].stderr, 
+                               server["stderr"])).start()
+    process = server["process"]
+    source = "".join(sourceList).encode("utf-8")
+    try:
+        process.stdin.write(b"%d\n" % len(source))
+        process.stdin.write(source)
+        process.stdin.flush()
+    except:
+        pass
+    stdout = readServer(process.stdout)
+    stderr = None
+    if stdout != None:
+        stderr = server["stderr"].get()
+    if stderr == None:
+        # Either the compiler doesn't know about --server or else the server
+        # has died.  Either way, don't try again.
+        stopServer()
+        server["unavailable"].append(command)
+        return None
+    return stdout, stderr
+
 # Invoke compiler front end.  The source code to be compiled is a list of 
-# strings that will be written to the temporary file (tmpFile), but if the list 
-# is empty, it's assumed that the temporary file is already populated.  Returns
-# a pair
+# strings, which is normally passed directly to the compiler front-end's 
+# server (see above), but otherwise is written to the temporary file 
+# (tmpFile).  If the list is empty, it's assumed that the temporary file is
+# already populated.  Returns a pair
 #       boolean, list
 # where the boolean if True/False on failure/success and the list is the 
 # dictionary in an actionable form of the abstract syntax tree.  Yes this is
@@ -191,21 +294,29 @@ def tokenizeAndParse(sourceList=[], trace=False, wine=False):
             print("Could not read HAL_S.y; _SYMB_n may not be translated.")
     captured["stderr"] = []
     try:
-        if len(sourceList) > 0:
-            f = open(tmpFile, "w")
-            f.writelines(sourceList)
-            f.close()
         if wine:
             compilerAndParameters = ["wine", parms["compiler"]+".exe"]
         else:
             compilerAndParameters = [parms["compiler"]]
-        if trace:
-            compilerAndParameters.append("--trace")
-        compilerAndParameters.append(tmpFile)
-        #print(compilerAndParameters)
-        run =subprocess.run(compilerAndParameters, capture_output=True)
-        if len(run.stderr) > 0:
+        served = None
+        if parms["server"] and not trace and len(sourceList) > 0:
+            served = serverParse(compilerAndParameters, sourceList)
+        if served != None:
+            output, stderr = served
+            stderr = "\n".join(stderr).strip()
+        else:
+            if len(sourceList) > 0:
+                f = open(tmpFile, "w")
+                f.writelines(sourceList)
+                f.close()
+            if trace:
+                compilerAndParameters.append("--trace")
+            compilerAndParameters.append(tmpFile)
+            #print(compilerAndParameters)
+            run =subprocess.run(compilerAndParameters, capture_output=True)
+            output = run.stdout.decode("utf-8").strip().split("\n")
             stderr = run.stderr.decode("utf-8").strip()
+        if len(stderr) > 0:
             while True:
                 match = re.search("\\b_SYMB_[0-9]+\\b", stderr)
                 if match == None:
@@ -217,14 +328,12 @@ def tokenizeAndParse(sourceList=[], trace=False, wine=False):
                             stderr[match.span()[1]+1:]
             captured["stderr"] = stderr.split("\n")
             
-        if len(run.stdout) > 0:
-            output = run.stdout.decode("utf-8").strip().split("\n")
-            for line in output:
-                if "(" != line[:1]:
-                    #print(line, file=sys.stderr)
-                    continue
-                else:
-                    return makeTree(line)[:2]
+        for line in output:
+            if "(" != line[:1]:
+                #print(line, file=sys.stderr)
+                continue
+            else:
+                return makeTree(line)[:2]
     except:
         pass
     return False, []
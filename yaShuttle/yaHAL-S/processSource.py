@@ -11,6 +11,8 @@ Purpose:        This is part of a preprocessor for the "modern" HAL/S compiler
                 automatically when appropriate, so it's also appropriate to
                 call this the compiler.
 History:        2022-12-16 RSB  Split off from yaHAL-S-FC.py.
+                2026-10-17 RSB  Preprocessed source is passed directly to
+                                tokenizeAndParse() rather than to a file.
                                 
 Here are some features of HAL/S I don't think the compiler (if based on a
 context-free grammar with free formatting) could handle without preprocessing:
@@ -42,7 +44,7 @@ import sys
 import unEMS
 import replaceBy
 import reorganizer
-from pass1 import tokenizeAndParse, tmpFile, astPrint, captured
+from pass1 import tokenizeAndParse, astPrint, captured
 from generatePALMAT import generatePALMAT
 from palmatAux import constructPALMAT
 
@@ -129,18 +131,17 @@ def processSource(PALMAT, halsSource, metadata, noCompile=False, lbnf=False,
     replaceBy.replaceBy(halsSource, metadata, macros, trace0)
 
     # Output the modified source.  If --no-compile, then simply output to
-    # stdout. If not --no-compile, then output to a file called yaHAL_S.tmp.
-    if noCompile:
-        f = sys.stdout
-    else:
-        f = open(tmpFile, "w")
+    # stdout. If not --no-compile, then it's passed on to the compiler by
+    # tokenizeAndParse() below.
+    compilerSource = []
     for i in range(len(halsSource)):
         if len(halsSource[i]) > 0 and halsSource[i][:1] != " ":
-            print(" /*" + halsSource[i] + "*/", file=f)
+            compilerSource.append(" /*" + halsSource[i] + "*/\n")
         else:
-            print(reorganizer.untranslate(halsSource[i]), file=f)
-    if not noCompile:
-        f.close()
+            compilerSource.append(reorganizer.untranslate(halsSource[i]) + \
+                                  "\n")
+    if noCompile:
+        sys.stdout.writelines(compilerSource)
 
     # Print final summary of preprocessing.
     #print("Files:")
@@ -160,7 +161,7 @@ def processSource(PALMAT, halsSource, metadata, noCompile=False, lbnf=False,
     if noCompile:
         return True, {}
         
-    success, ast = tokenizeAndParse([], trace1, wine)
+    success, ast = tokenizeAndParse(compilerSource, trace1, wine)
     for error in captured["stderr"]:
         fields = error.split(":", 2)
         if len(fields) > 2 and fields[0].strip() == "error":
@@ -17,6 +17,7 @@ History:    2023-02-18 RSB  Began.  This is essentially a complete, improved
                             the older code, such as partition slices and more
                             automatic type conversion.  Still does not handle
                             STRUCTUREs, but hopefully they can be added.
+            2026-10-17 RSB  Faster assignment of VECTOR and MATRIX values.
 """
 
 from palmatAux import *
@@ -465,8 +466,15 @@ def saveValueToVariable(PALMAT, source, value, identifier, attributes, \
         geometry, if any, and vector/matrix geometry, if any).  It's more 
         complex than the simple-to-simple assignment we just did, because the 
         leaf elements being assigned may require conversions of different types.
-        We use a recursive function to descend to all of the leaves.
+        We use a recursive function to descend to all of the leaves ... 
+        except in the commonest case, a VECTOR or MATRIX of SCALARs, which 
+        need no conversions at all.
         '''
+        if datatype == "scalar" and not isArray:
+            composite = copyVectorOrMatrix(value)
+            if composite is not None:
+                attributes["value"] = composite
+                return True
         composite = copy.deepcopy(value)
         if convertComposite(composite, datatype, datalength) == False:
             printError(PALMAT, source, "", \
@@ -27,6 +27,7 @@ History:        2022-11-07 RSB  Created.
                 2022-12-10 RSB  Added --no-compile.
                 2022-12-11 RSB  The next evolution of yaHAL-preprocessor.py.
                 2022-12-16 RSB  Began implementing interpreter.
+                2026-10-17 RSB  Added --no-server.
                                 
 Here are some features of HAL/S I don't think the compiler (if based on a
 context-free grammar with free formatting) could handle without preprocessing:
@@ -63,6 +64,7 @@ from processSource import processSource
 from palmatAux import constructPALMAT, astSourceFile
 from pass1 import parms
 from optimizePALMAT import optimizePALMAT
+from linkPALMAT import linkPALMAT
 
 #Parse the command-line arguments.
 tabSize = 8
@@ -108,6 +110,9 @@ for param in sys.argv[1:]:
         --lbnf, --bnf   Display the abstract syntax trees (AST) in LBNF or
                         in BNF.  Default is not to display the ASTs.
         --trace         Enable tracing for compiler front-end parser.
+        --no-server     Run the compiler front-end anew for each compilation,
+                        via a temporary file, rather than keeping a single 
+                        instance of it running in --server mode.
         --interactive   Normally, the HAL/S source-code comes from a file or
                         files specified on the command line.  However, in 
                         interactive mode, HAL/S statements are entered from
@@ -158,6 +163,8 @@ for param in sys.argv[1:]:
         parms["compiler"] = param[11:]
     elif param == "--trace":
         trace = True
+    elif param == "--no-server":
+        parms["server"] = False
     elif param == "--no-library":
         print("Note: The --no-library option is no longer of use.")
     elif param[:10] == "--library=":
@@ -185,6 +192,7 @@ if not interactive:
     PALMAT["sourceFiles"] = files
     processSource(PALMAT, halsSource, metadata, noCompile, lbnf, bnf, trace)
     optimizePALMAT(PALMAT)
+    linkPALMAT(PALMAT)
 else:
     from interpreterLoop import interpreterLoop
     interpreterLoop(colorize, not noexec, lbnf, bnf, ansiWrapper)